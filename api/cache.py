@@ -0,0 +1,198 @@
+"""
+Versioned cache of the public results.
+
+Rendered leaderboards and archer profiles are cached under the id of their
+Round, Competition or Archer plus a version counter of that object. A
+write bumps the counters of what it touches, see the receivers below, so
+readers move on to a new key at once and the old entries simply expire.
+Nothing is deleted or scanned on a write.
+
+A counter is bumped when the write happens and again after its
+transaction commits. The first bump stops this process from serving the
+old entry. The second makes sure that a reader who rendered the results
+while the transaction was still open does not leave them in the cache.
+
+The cache is the alias named by RESULTS_CACHE. LocMemCache is kept per
+process; with several workers, point the alias at a shared backend
+(Redis, Memcached) so that a write made by one worker invalidates the
+entries of all of them. production.py does so when REDIS_URL is set,
+and the api.E001 check refuses several workers without it.
+"""
+import json
+import time
+
+from django.conf import settings
+from django.core.cache import caches
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from django.http import HttpResponse
+
+from modeling.brackets import bracket_changed
+from modeling.leaderboard import leaderboard_changed
+from modeling.models import (
+    Archer,
+    Competition,
+    CompetitionLeaderboardEntry,
+    CompetitionMembership,
+    LeaderboardEntry,
+    Round,
+    RoundMembership,
+    Score,
+    Team,
+    TeamMembership,
+)
+from utils.db_utils import primary_reads
+
+ROUND = 'round'
+COMPETITION = 'competition'
+ARCHER = 'archer'
+
+
+def results_cache():
+    return caches[getattr(settings, 'RESULTS_CACHE', 'default')]
+
+
+def version_key(kind, pk):
+    return f"results:{kind}:{pk}:version"
+
+
+def get_version(kind, pk):
+    cache = results_cache()
+    key = version_key(kind, pk)
+    version = cache.get(key)
+    if version is None:
+        # A counter that was evicted starts again above every earlier value
+        cache.add(key, time.time_ns(), timeout=None)
+        version = cache.get(key, time.time_ns())
+    return version
+
+
+def _bump(kind, ids):
+    cache = results_cache()
+    for pk in ids:
+        try:
+            cache.incr(version_key(kind, pk))
+        except ValueError:
+            # No counter, so nothing was cached under it either
+            pass
+
+
+def bump(kind, ids):
+    ids = set(ids) - {None}
+    if ids:
+        _bump(kind, ids)
+        transaction.on_commit(lambda: _bump(kind, ids))
+
+
+def cached_json(kind, pk, build, variant=''):
+    """JSON response of ``build()``, cached until ``pk`` of ``kind`` changes."""
+    cache = results_cache()
+    key = f"results:{kind}:{pk}:{get_version(kind, pk)}:{variant}"
+    body = cache.get(key)
+    if body is None:
+        # A lagging replica would keep old results in the cache until the next write
+        with primary_reads():
+            body = json.dumps(build(), cls=DjangoJSONEncoder)
+        cache.set(key, body, getattr(settings, 'RESULTS_CACHE_TIMEOUT', 300))
+    return HttpResponse(body, content_type='application/json')
+
+
+def results_changed(round_ids=(), archer_ids=(), competition_ids=()):
+    round_ids = set(round_ids) - {None}
+    competition_ids = set(competition_ids)
+    if round_ids:
+        competition_ids.update(
+            CompetitionMembership.objects
+            .filter(round_id__in=round_ids)
+            .values_list('competition_id', flat=True)
+        )
+    bump(ROUND, round_ids)
+    bump(COMPETITION, competition_ids)
+    bump(ARCHER, archer_ids)
+
+
+@receiver(post_save, sender=Score)
+@receiver(post_delete, sender=Score)
+def score_changed(sender, instance, **kwargs):
+    membership = (
+        RoundMembership.objects
+        .filter(pk=instance.round_archer_id)
+        .values_list('round_id', 'archer_id')
+        .first()
+    )
+    if membership is not None:
+        results_changed([membership[0]], [membership[1]])
+
+
+@receiver(post_save, sender=RoundMembership)
+@receiver(post_delete, sender=RoundMembership)
+def round_membership_changed(sender, instance, **kwargs):
+    results_changed([instance.round_id], [instance.archer_id])
+
+
+@receiver(post_save, sender=Round)
+def round_changed(sender, instance, created, **kwargs):
+    # Name, date, sheet or face show on the leaderboards and personal bests
+    if not created:
+        results_changed(
+            [instance.pk],
+            LeaderboardEntry.objects.filter(round=instance).values_list('archer_id', flat=True),
+        )
+
+
+@receiver(post_save, sender=Competition)
+def competition_changed(sender, instance, created, **kwargs):
+    if not created:
+        bump(COMPETITION, [instance.pk])
+
+
+@receiver(post_save, sender=Archer)
+def archer_changed(sender, instance, created, **kwargs):
+    # Leaderboards showing the old name expire with RESULTS_CACHE_TIMEOUT
+    if not created:
+        bump(ARCHER, [instance.pk])
+
+
+def archer_results_changed(archer_ids):
+    """Bump every round and competition with a result of the given archers."""
+    results_changed(
+        LeaderboardEntry.objects.filter(archer_id__in=archer_ids).values_list('round_id', flat=True),
+        competition_ids=CompetitionLeaderboardEntry.objects
+        .filter(archer_id__in=archer_ids)
+        .values_list('competition_id', flat=True),
+    )
+
+
+@receiver(post_save, sender=TeamMembership)
+@receiver(post_delete, sender=TeamMembership)
+def team_membership_changed(sender, instance, **kwargs):
+    # The team results of the rounds of the archer
+    archer_results_changed([instance.archer_id])
+
+
+@receiver(post_save, sender=Team)
+def team_changed(sender, instance, created, **kwargs):
+    if not created:
+        archer_results_changed(
+            TeamMembership.objects.filter(team=instance).values_list('archer_id', flat=True)
+        )
+
+
+@receiver(leaderboard_changed)
+def leaderboard_entries_changed(sender, changed, removed, **kwargs):
+    # Covers the bulk writes (end entry, imports) that send no model signals
+    archer_ids = {entry.archer_id for entry in changed} | {archer_id for _, archer_id in removed}
+    parent_ids = {
+        entry.round_id if sender is LeaderboardEntry else entry.competition_id for entry in changed
+    } | {parent_id for parent_id, _ in removed}
+    if sender is LeaderboardEntry:
+        results_changed(round_ids=parent_ids, archer_ids=archer_ids)
+    elif sender is CompetitionLeaderboardEntry:
+        results_changed(competition_ids=parent_ids, archer_ids=archer_ids)
+
+
+@receiver(bracket_changed)
+def bracket_entries_changed(sender, competition_id, **kwargs):
+    bump(COMPETITION, [competition_id])
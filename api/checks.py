@@ -0,0 +1,38 @@
+"""
+System checks of the backends shared by the server workers.
+
+The results cache and the live broker must reach every worker: with a
+per-process backend a write only invalidates the cache of the worker that
+made it, and displays connected to another worker never get the delta.
+SERVER_WORKERS is the number of worker processes, set by gunicorn.conf.py.
+"""
+from django.conf import settings
+from django.core.checks import Error, Tags, register
+from django.utils.module_loading import import_string
+
+from .live import InProcessBroker
+
+PER_PROCESS_CACHES = ('django.core.cache.backends.locmem.LocMemCache',)
+
+
+@register(Tags.caches)
+def check_shared_backends(app_configs, **kwargs):
+    workers = getattr(settings, 'SERVER_WORKERS', 1)
+    if workers <= 1:
+        return []
+    errors = []
+    alias = getattr(settings, 'RESULTS_CACHE', 'default')
+    if settings.CACHES.get(alias, {}).get('BACKEND') in PER_PROCESS_CACHES:
+        errors.append(Error(
+            f"The results cache '{alias}' is kept per process, but the server runs {workers} workers.",
+            hint="Set REDIS_URL, or configure a shared cache backend.",
+            id='api.E001',
+        ))
+    backend = getattr(settings, 'LIVE_BROKER', {}).get('BACKEND', 'api.live.InProcessBroker')
+    if issubclass(import_string(backend), InProcessBroker):
+        errors.append(Error(
+            f"The live broker is kept per process, but the server runs {workers} workers.",
+            hint="Set REDIS_URL, or use api.live.RedisBroker in LIVE_BROKER.",
+            id='api.E002',
+        ))
+    return errors
@@ -0,0 +1,170 @@
+"""
+Push channels for live leaderboards.
+
+A broker fans messages out per channel ("round:<id>", "competition:<id>").
+InProcessBroker keeps subscribers in memory and is enough for a single
+worker and for tests; RedisBroker shares messages between workers. The
+backend is chosen with the LIVE_BROKER setting::
+
+    LIVE_BROKER = {
+        "BACKEND": "api.live.RedisBroker",
+        "OPTIONS": {"url": "redis://localhost:6379/0"},
+    }
+"""
+import asyncio
+import json
+import threading
+
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from django.core.signals import setting_changed
+from django.dispatch import receiver
+from django.utils.module_loading import import_string
+
+from modeling.leaderboard import leaderboard_changed
+from modeling.models import CompetitionLeaderboardEntry, LeaderboardEntry
+
+HEARTBEAT_SECONDS = 15
+
+
+def round_channel(round_id):
+    return f"round:{round_id}"
+
+
+def competition_channel(competition_id):
+    return f"competition:{competition_id}"
+
+
+class BaseBroker:
+
+    def __init__(self, **options):
+        self.options = options
+
+    def publish(self, channel, message):
+        raise NotImplementedError
+
+    async def subscribe(self, channel, heartbeat=HEARTBEAT_SECONDS):
+        """Yield messages of ``channel``, or None after ``heartbeat`` idle seconds."""
+        raise NotImplementedError
+        yield
+
+
+class InProcessBroker(BaseBroker):
+
+    def __init__(self, max_queued=100, **options):
+        super().__init__(**options)
+        self.max_queued = max_queued
+        self.subscribers = {}
+        self.lock = threading.Lock()
+
+    def publish(self, channel, message):
+        with self.lock:
+            subscribers = list(self.subscribers.get(channel, ()))
+        for loop, queue in subscribers:
+            try:
+                loop.call_soon_threadsafe(self._put, queue, message)
+            except RuntimeError:
+                # The subscriber's event loop has been closed
+                pass
+
+    @staticmethod
+    def _put(queue, message):
+        # A display that does not keep up misses deltas rather than growing memory
+        if not queue.full():
+            queue.put_nowait(message)
+
+    async def subscribe(self, channel, heartbeat=HEARTBEAT_SECONDS):
+        subscriber = (asyncio.get_running_loop(), asyncio.Queue(self.max_queued))
+        with self.lock:
+            self.subscribers.setdefault(channel, set()).add(subscriber)
+        try:
+            while True:
+                try:
+                    yield await asyncio.wait_for(subscriber[1].get(), heartbeat)
+                except asyncio.TimeoutError:
+                    yield None
+        finally:
+            with self.lock:
+                self.subscribers[channel].discard(subscriber)
+                if not self.subscribers[channel]:
+                    del self.subscribers[channel]
+
+
+class RedisBroker(BaseBroker):
+
+    def __init__(self, url="redis://localhost:6379/0", prefix="scoring:", **options):
+        super().__init__(**options)
+        try:
+            import redis
+            import redis.asyncio
+        except ImportError:
+            raise ImproperlyConfigured("RedisBroker requires the 'redis' package.")
+        self.redis = redis
+        self.url = url
+        self.prefix = prefix
+        self.client = redis.Redis.from_url(url)
+
+    def publish(self, channel, message):
+        self.client.publish(self.prefix + channel, json.dumps(message))
+
+    async def subscribe(self, channel, heartbeat=HEARTBEAT_SECONDS):
+        client = self.redis.asyncio.Redis.from_url(self.url)
+        pubsub = client.pubsub()
+        await pubsub.subscribe(self.prefix + channel)
+        try:
+            while True:
+                message = await pubsub.get_message(ignore_subscribe_messages=True, timeout=heartbeat)
+                yield json.loads(message['data']) if message else None
+        finally:
+            await pubsub.unsubscribe()
+            await client.aclose()
+
+
+_broker = None
+
+
+def get_broker():
+    global _broker
+    if _broker is None:
+        config = getattr(settings, 'LIVE_BROKER', {})
+        broker_class = import_string(config.get('BACKEND', 'api.live.InProcessBroker'))
+        _broker = broker_class(**config.get('OPTIONS', {}))
+    return _broker
+
+
+@receiver(setting_changed)
+def reset_broker(setting, **kwargs):
+    global _broker
+    if setting == 'LIVE_BROKER':
+        _broker = None
+
+
+def entry_json(entry):
+    return {
+        'archer_id': str(entry.archer_id),
+        'archer': str(entry.archer),
+        'total': entry.total,
+        'tens': entry.tens,
+        'xs': entry.xs,
+        'arrows': entry.arrows,
+    }
+
+
+@receiver(leaderboard_changed)
+def publish_leaderboard_delta(sender, changed, removed, **kwargs):
+    if sender is LeaderboardEntry:
+        parent, channel = 'round_id', round_channel
+    elif sender is CompetitionLeaderboardEntry:
+        parent, channel = 'competition_id', competition_channel
+    else:
+        return
+    # One query for the archer names of the whole delta
+    changed = sender.objects.filter(pk__in=[e.pk for e in changed]).select_related('archer')
+    deltas = {}
+    for entry in changed:
+        deltas.setdefault(getattr(entry, parent), {'changed': [], 'removed': []})['changed'].append(entry_json(entry))
+    for parent_id, archer_id in removed:
+        deltas.setdefault(parent_id, {'changed': [], 'removed': []})['removed'].append(str(archer_id))
+    broker = get_broker()
+    for parent_id, delta in deltas.items():
+        broker.publish(channel(parent_id), delta)
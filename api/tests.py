@@ -1,3 +1,279 @@
-from django.test import TestCase
+import asyncio
+import json
+from unittest import mock
 
-# Create your tests here.
+from django.core.cache import cache
+from django.db import connection
+from django.test import SimpleTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+
+from modeling import brackets
+from modeling.leaderboard import round_leaderboard
+from modeling.models import (
+    Competition,
+    CompetitionMembership,
+    End,
+    Match,
+    Round,
+    RoundMembership,
+    Score,
+    Team,
+    TeamMembership,
+)
+from modeling.scoring import record_end
+from modeling.tests import ModelingTestCase
+
+from .checks import check_shared_backends
+from .live import InProcessBroker, get_broker, round_channel
+
+
+class SubmitEndsTests(ModelingTestCase):
+    """
+    Tests for the batched end entry endpoint used by tablets on the shooting line.
+    """
+
+    url = '/api/scores/ends/'
+
+    def setUp(self):
+        self.client.force_login(self.user)
+
+    def post(self, ends):
+        return self.client.post(self.url, json.dumps({'ends': ends}), content_type='application/json')
+
+    def memberships(self, count, start=1):
+        return [self.create_score(number).round_archer for number in range(start, start + count)]
+
+    def test_batch_creates_ends_and_updates_totals(self):
+        first, second = self.memberships(2)
+        response = self.post([
+            {'round_archer': str(first.pk), 'end': 1, 'arrows': ['X', '10', '9']},
+            {'round_archer': str(second.pk), 'end': 1, 'arrows': "9 9 M"},
+            {'round_archer': str(first.pk), 'end': 2, 'arrows': ['8', '8', '8']},
+        ])
+        self.assertEqual(response.status_code, 200)
+        scores = {s['round_archer']: s for s in response.json()['scores']}
+        self.assertEqual(scores[str(first.pk)]['score'], 53)
+        self.assertEqual(scores[str(second.pk)]['number_of_arrows'], 3)
+        self.assertEqual(End.objects.count(), 3)
+        self.assertEqual(round_leaderboard(self.round).first().total, 53)
+
+    def test_resubmitted_end_replaces_previous_arrows(self):
+        membership, = self.memberships(1)
+        self.post([{'round_archer': str(membership.pk), 'end': 1, 'arrows': ['X', 'X', 'X']}])
+        self.post([{'round_archer': str(membership.pk), 'end': 1, 'arrows': ['7', '7', '7']}])
+        score = Score.objects.get(round_archer=membership)
+        self.assertEqual((score.score, score.tens, score.xs, score.number_of_arrows), (21, 0, 0, 3))
+
+    def test_invalid_entry_rejects_whole_batch(self):
+        membership, = self.memberships(1)
+        response = self.post([
+            {'round_archer': str(membership.pk), 'end': 1, 'arrows': ['X', '10', '9']},
+            {'round_archer': str(membership.pk), 'end': 2, 'arrows': ['X', '10', '9', '9']},
+        ])
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.json()['errors'][0]['index'], 1)
+        self.assertFalse(End.objects.exists())
+
+    def test_malformed_arrows_and_end_are_rejected(self):
+        membership, = self.memberships(1)
+        response = self.post([
+            {'round_archer': str(membership.pk), 'end': 1, 'arrows': 5},
+            {'round_archer': str(membership.pk), 'end': 2, 'arrows': None},
+            {'round_archer': str(membership.pk), 'end': True, 'arrows': ['X', '10', '9']},
+        ])
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual([error['index'] for error in response.json()['errors']], [0, 1, 2])
+        self.assertFalse(End.objects.exists())
+
+    def test_query_count_does_not_grow_with_batch_size(self):
+        def count_queries(memberships, end):
+            with CaptureQueriesContext(connection) as queries:
+                response = self.post([
+                    {'round_archer': str(m.pk), 'end': end, 'arrows': ['X', '9', '8']}
+                    for m in memberships
+                ])
+            self.assertEqual(response.status_code, 200)
+            return len(queries)
+
+        self.assertEqual(
+            count_queries(self.memberships(2), 1),
+            count_queries(self.memberships(20, start=3), 1),
+        )
+
+    def test_requires_permission(self):
+        self.client.logout()
+        self.assertEqual(self.post([]).status_code, 403)
+
+
+class InProcessBrokerTests(SimpleTestCase):
+
+    def test_publish_reaches_subscribers_of_the_channel(self):
+        broker = InProcessBroker()
+
+        async def listen():
+            stream = broker.subscribe('round:1', heartbeat=1)
+            other = broker.subscribe('round:2', heartbeat=0.01)
+            receive = asyncio.ensure_future(stream.__anext__())
+            await asyncio.sleep(0)
+            broker.publish('round:1', {'changed': []})
+            message = await receive
+            idle = await other.__anext__()
+            await stream.aclose()
+            await other.aclose()
+            return message, idle
+
+        self.assertEqual(asyncio.run(listen()), ({'changed': []}, None))
+        self.assertEqual(broker.subscribers, {})
+
+
+class LiveLeaderboardTests(ModelingTestCase):
+    """
+    Tests for the leaderboard snapshot and the deltas pushed on score changes.
+    """
+
+    def test_score_change_publishes_delta_after_commit(self):
+        score = self.create_score(1)
+        with mock.patch.object(get_broker(), 'publish') as publish:
+            with self.captureOnCommitCallbacks(execute=True):
+                record_end(score, 1, ['X', '10', '9'])
+        channel, message = publish.call_args.args
+        self.assertEqual(channel, round_channel(self.round.pk))
+        self.assertEqual(message['changed'][0]['total'], 29)
+
+    def test_round_leaderboard_snapshot(self):
+        record_end(self.create_score(1), 1, ['X', '10', '9'])
+        record_end(self.create_score(2), 1, ['X', 'X', 'X'])
+        response = self.client.get(f'/api/rounds/{self.round.pk}/leaderboard/?limit=1')
+        entries = response.json()['entries']
+        self.assertEqual([(e['rank'], e['total']) for e in entries], [(1, 30)])
+
+    async def test_stream_sends_published_delta(self):
+        response = await self.async_client.get(f'/api/rounds/{self.round.pk}/stream/')
+        self.assertEqual(response['Content-Type'], 'text/event-stream')
+        content = response.streaming_content
+        self.assertEqual(await content.__anext__(), b": connected\n\n")
+        receive = asyncio.ensure_future(content.__anext__())
+        await asyncio.sleep(0)
+        get_broker().publish(round_channel(self.round.pk), {'changed': [], 'removed': ['a']})
+        self.assertIn(b'"removed": ["a"]', await receive)
+        await content.aclose()
+
+    def test_stream_needs_asgi(self):
+        # The test client is a WSGI request; streaming it would never end
+        for url in (f'/api/rounds/{self.round.pk}/stream/', f'/api/competitions/{self.round.pk}/stream/'):
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, 501)
+            self.assertFalse(response.streaming)
+
+
+class CachedResultsTests(ModelingTestCase):
+    """
+    Tests for the versioned cache of leaderboards and archer profiles.
+    """
+
+    def setUp(self):
+        cache.clear()
+
+    def leaderboard(self):
+        return [(e['archer'], e['total']) for e in self.client.get(f'/api/rounds/{self.round.pk}/leaderboard/').json()['entries']]
+
+    def test_leaderboard_is_cached_until_a_score_changes(self):
+        score = self.create_score(1)
+        score.score = 250
+        score.save()
+        self.assertEqual(self.leaderboard(), [("Last1 First1 ", 250)])
+        with self.assertNumQueries(0):
+            self.assertEqual(self.leaderboard(), [("Last1 First1 ", 250)])
+
+        score.score = 260
+        score.save()
+        self.assertEqual(self.leaderboard(), [("Last1 First1 ", 260)])
+        RoundMembership.objects.create(round=self.round, archer=self.create_archer(2))
+        with CaptureQueriesContext(connection) as queries:
+            self.leaderboard()
+        self.assertTrue(queries)
+
+    def test_bulk_end_entry_invalidates_after_commit(self):
+        score = self.create_score(1)
+        self.assertEqual(self.leaderboard(), [("Last1 First1 ", 0)])
+        with self.captureOnCommitCallbacks(execute=True):
+            record_end(score, 1, ['X', '10', '9'])
+        self.assertEqual(self.leaderboard(), [("Last1 First1 ", 29)])
+
+    def test_other_rounds_stay_cached(self):
+        other = Round.objects.create(name="Indoor 18 meter Round 2")
+        url = f'/api/rounds/{other.pk}/leaderboard/'
+        self.client.get(url)
+        score = self.create_score(1)
+        score.score = 250
+        score.save()
+        with self.assertNumQueries(0):
+            self.client.get(url)
+
+    def test_archer_profile(self):
+        score = self.create_score(1)
+        score.score = 250
+        score.save()
+        url = f'/api/archers/{score.round_archer.archer_id}/'
+        bests = self.client.get(url).json()['personal_bests']
+        self.assertEqual([(b['round'], b['total'], b['season']) for b in bests], [(self.round.name, 250, None)])
+        with self.assertNumQueries(0):
+            self.client.get(url)
+        score.score = 270
+        score.save()
+        self.assertEqual(self.client.get(url).json()['personal_bests'][0]['total'], 270)
+        self.assertEqual(self.client.get('/api/archers/00000000-0000-0000-0000-000000000000/').status_code, 404)
+
+    def test_team_results_follow_team_changes(self):
+        team = Team.objects.create(name="Club A")
+        for number, total in ((1, 250), (2, 260)):
+            score = self.create_score(number)
+            score.score = total
+            score.save()
+            TeamMembership.objects.create(team=team, archer=score.round_archer.archer)
+        url = f'/api/rounds/{self.round.pk}/teams/'
+        self.assertEqual(self.client.get(url, {'size': 'x'}).status_code, 400)
+        self.assertEqual(
+            [(t['rank'], t['team'], t['total']) for t in self.client.get(url, {'size': 2}).json()['teams']],
+            [(1, "Club A", 510)],
+        )
+        with self.assertNumQueries(0):
+            self.client.get(url, {'size': 2})
+        TeamMembership.objects.filter(archer__union_number=1).delete()
+        self.assertEqual(self.client.get(url, {'size': 2}).json()['teams'][0]['complete'], False)
+        team.name = "Club B"
+        team.save()
+        self.assertEqual(self.client.get(url, {'size': 2}).json()['teams'][0]['team'], "Club B")
+
+    def test_bracket_follows_match_results(self):
+        competition = Competition.objects.create(name="Indoor Championship")
+        CompetitionMembership.objects.create(competition=competition, round=self.round)
+        for number in (1, 2):
+            self.create_score(number)
+        with self.captureOnCommitCallbacks(execute=True):
+            brackets.create_bracket(competition)
+        url = f'/api/competitions/{competition.pk}/bracket/'
+        final, = self.client.get(url).json()['matches']
+        self.assertEqual((final['stage'], final['winner']), ("Final", None))
+        with self.captureOnCommitCallbacks(execute=True):
+            brackets.record_match(Match.objects.get(slot=1), [(28, 27), (29, 27), (30, 28)])
+        final, = self.client.get(url).json()['matches']
+        self.assertEqual((final['sets'], final['set_points']), ([[28, 27], [29, 27], [30, 28]], [6, 0]))
+        self.assertEqual(final['winner'], final['archer_a'])
+
+
+class SharedBackendCheckTests(SimpleTestCase):
+
+    def test_one_worker_may_use_process_backends(self):
+        with override_settings(SERVER_WORKERS=1):
+            self.assertEqual(check_shared_backends(None), [])
+
+    def test_several_workers_need_shared_backends(self):
+        with override_settings(SERVER_WORKERS=3):
+            self.assertEqual([error.id for error in check_shared_backends(None)], ['api.E001', 'api.E002'])
+        with override_settings(
+            SERVER_WORKERS=3,
+            CACHES={'default': {'BACKEND': 'django.core.cache.backends.redis.RedisCache', 'LOCATION': 'redis://cache'}},
+            LIVE_BROKER={'BACKEND': 'api.live.RedisBroker', 'OPTIONS': {'url': 'redis://cache'}},
+        ):
+            self.assertEqual(check_shared_backends(None), [])
@@ -0,0 +1,25 @@
+from django.urls import path
+
+from .views import (
+    archer_profile,
+    competition_bracket,
+    competition_leaderboard,
+    competition_stream,
+    competition_teams,
+    round_leaderboard,
+    round_stream,
+    round_teams,
+    submit_ends,
+)
+
+urlpatterns = [
+    path('scores/ends/', submit_ends, name='api_submit_ends'),
+    path('rounds/<uuid:pk>/leaderboard/', round_leaderboard, name='api_round_leaderboard'),
+    path('rounds/<uuid:pk>/teams/', round_teams, name='api_round_teams'),
+    path('rounds/<uuid:pk>/stream/', round_stream, name='api_round_stream'),
+    path('competitions/<uuid:pk>/leaderboard/', competition_leaderboard, name='api_competition_leaderboard'),
+    path('competitions/<uuid:pk>/teams/', competition_teams, name='api_competition_teams'),
+    path('competitions/<uuid:pk>/bracket/', competition_bracket, name='api_competition_bracket'),
+    path('competitions/<uuid:pk>/stream/', competition_stream, name='api_competition_stream'),
+    path('archers/<uuid:pk>/', archer_profile, name='api_archer_profile'),
+]
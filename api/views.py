@@ -1,3 +1,269 @@
-from django.shortcuts import render
+import json
+import uuid
 
-# Create your views here.
+from django.core.handlers.asgi import ASGIRequest
+from django.http import JsonResponse, StreamingHttpResponse
+from django.shortcuts import get_object_or_404
+from django.views.decorators.http import require_GET, require_POST
+
+from modeling import brackets, leaderboard, personal_bests, teams
+from modeling.models import Archer, Competition, Round
+from modeling.scoring import EndEntryError, pack_arrows, parse_arrows, record_ends
+
+from . import cache
+from .cache import cached_json
+from .live import competition_channel, entry_json, get_broker, round_channel
+
+
+def score_json(score):
+    return {
+        'round_archer': str(score.round_archer_id),
+        'score': score.score,
+        'tens': score.tens,
+        'xs': score.xs,
+        'number_of_arrows': score.number_of_arrows,
+    }
+
+
+@require_POST
+def submit_ends(request):
+    """
+    Record a batch of ends for many archers in one request.
+
+    Body: {"ends": [{"round_archer": "<uuid>", "end": 1, "arrows": ["X", "10", "9"]}, ...]}
+    The arrows may also be given as a scoresheet line such as "X 10 9".
+    """
+    if not request.user.has_perm('modeling.add_end'):
+        return JsonResponse({'error': "Permission denied"}, status=403)
+    try:
+        payload = json.loads(request.body)
+        items = payload['ends']
+        if not isinstance(items, list):
+            raise TypeError
+    except (ValueError, KeyError, TypeError):
+        return JsonResponse({'error': "Expected a JSON object with a list of ends"}, status=400)
+
+    entries, errors = [], []
+    for index, item in enumerate(items):
+        try:
+            if not isinstance(item, dict):
+                raise ValueError("expected an object")
+            number, arrows = item['end'], item['arrows']
+            if isinstance(number, bool) or not isinstance(number, int):
+                raise ValueError(f"end must be a number, not {number!r}")
+            if isinstance(arrows, str):
+                arrows = parse_arrows(arrows)
+            elif isinstance(arrows, list):
+                arrows = pack_arrows(arrows)
+            else:
+                raise ValueError(f"arrows must be a list or a line such as 'X 10 9', not {arrows!r}")
+            entries.append((item['round_archer'], number, arrows))
+        except (KeyError, TypeError, ValueError) as e:
+            errors.append({'index': index, 'error': f"Invalid end: {e}"})
+            entries.append((None, None, b''))
+    if errors:
+        return JsonResponse({'errors': errors}, status=400)
+
+    try:
+        scores = record_ends(entries, author=request.user)
+    except EndEntryError as e:
+        return JsonResponse(
+            {'errors': [{'index': index, 'error': message} for index, message in e.errors]},
+            status=400,
+        )
+    return JsonResponse({'scores': [score_json(score) for score in scores.values()]})
+
+
+def leaderboard_json(entries):
+    return [
+        dict(entry_json(entry), rank=rank)
+        for rank, entry in leaderboard.ranked(entries)
+    ]
+
+
+def limit_param(request):
+    try:
+        return max(int(request.GET.get('limit', 0)), 0) or None
+    except ValueError:
+        return None
+
+
+@require_GET
+def round_leaderboard(request, pk):
+    limit = limit_param(request)
+
+    def build():
+        round = get_object_or_404(Round, pk=pk)
+        entries = leaderboard.round_leaderboard(round, limit)
+        return {'round': str(round), 'entries': leaderboard_json(entries)}
+
+    return cached_json(cache.ROUND, pk, build, variant=limit or '')
+
+
+@require_GET
+def competition_leaderboard(request, pk):
+    limit = limit_param(request)
+
+    def build():
+        competition = get_object_or_404(Competition, pk=pk)
+        entries = leaderboard.competition_leaderboard(competition, limit)
+        return {'competition': str(competition), 'entries': leaderboard_json(entries)}
+
+    return cached_json(cache.COMPETITION, pk, build, variant=limit or '')
+
+
+def team_params(request):
+    """(size, categories, per_category) from the query string; raises ValueError."""
+    size = int(request.GET.get('size', teams.TEAM_SIZE))
+    per_category = int(request.GET.get('per_category', 1))
+    categories = sorted(uuid.UUID(value) for value in request.GET.get('categories', '').split(',') if value)
+    if size < 1 or per_category < 1:
+        raise ValueError
+    return size, categories, per_category
+
+
+def teams_json(results):
+    return [
+        {
+            'rank': rank,
+            'team': result.team,
+            'total': result.total,
+            'tens': result.tens,
+            'xs': result.xs,
+            'arrows': result.arrows,
+            'archers': [str(archer_id) for archer_id in result.archer_ids],
+            'complete': result.complete,
+        }
+        for rank, result in teams.ranked(results)
+    ]
+
+
+def teams_response(request, kind, model, compute, pk):
+    try:
+        size, categories, per_category = team_params(request)
+    except ValueError:
+        return JsonResponse({'error': "Invalid size, categories or per_category"}, status=400)
+
+    def build():
+        parent = get_object_or_404(model, pk=pk)
+        results = compute(parent, size, categories, per_category)
+        return {kind: str(parent), 'teams': teams_json(results)}
+
+    variant = f"teams:{size}:{','.join(map(str, categories))}:{per_category}"
+    return cached_json(kind, pk, build, variant=variant)
+
+
+@require_GET
+def round_teams(request, pk):
+    """
+    Team results of a round: the best ``size`` (3) results of a team count,
+    or with ``categories=<id>,<id>`` the best ``per_category`` (1) of each.
+    """
+    return teams_response(request, cache.ROUND, Round, teams.round_teams, pk)
+
+
+@require_GET
+def competition_teams(request, pk):
+    return teams_response(request, cache.COMPETITION, Competition, teams.competition_teams, pk)
+
+
+def match_json(match):
+    return {
+        'slot': match.slot,
+        'stage': match.stage,
+        'archer_a': str(match.archer_a) if match.archer_a else None,
+        'seed_a': match.seed_a,
+        'archer_b': str(match.archer_b) if match.archer_b else None,
+        'seed_b': match.seed_b,
+        'sets': brackets.unpack_sets(match.sets),
+        'shoot_off': match.shoot_off,
+        'set_points': [match.set_points_a, match.set_points_b],
+        'winner': str(match.winner) if match.winner else None,
+    }
+
+
+@require_GET
+def competition_bracket(request, pk):
+    """Elimination matches of a competition, by slot: 1 is the final, 0 the bronze medal match."""
+
+    def build():
+        competition = get_object_or_404(Competition, pk=pk)
+        return {'competition': str(competition), 'matches': [match_json(m) for m in brackets.bracket(competition)]}
+
+    return cached_json(cache.COMPETITION, pk, build, variant='bracket')
+
+
+def personal_best_json(best):
+    return {
+        'scoringsheet': best.scoringsheet.name if best.scoringsheet else None,
+        'targetface': best.targetface.name if best.targetface else None,
+        'discipline': best.discipline.name if best.discipline else None,
+        'category': best.category.name if best.category else None,
+        'season': best.season,
+        'round': best.round.name,
+        'date': best.round.start_date,
+        'total': best.total,
+        'tens': best.tens,
+        'xs': best.xs,
+        'arrows': best.arrows,
+    }
+
+
+@require_GET
+def archer_profile(request, pk):
+    """Name and personal bests of an archer."""
+
+    def build():
+        archer = get_object_or_404(Archer, pk=pk, is_active=True)
+        return {
+            'archer': str(archer),
+            'personal_bests': [personal_best_json(best) for best in personal_bests.for_archer(archer)],
+        }
+
+    return cached_json(cache.ARCHER, pk, build)
+
+
+async def event_stream(channel):
+    yield ": connected\n\n"
+    async for message in get_broker().subscribe(channel):
+        if message is None:
+            # Keeps proxies from closing an idle connection
+            yield ": keepalive\n\n"
+        else:
+            yield f"event: leaderboard\ndata: {json.dumps(message)}\n\n"
+
+
+def asgi_required():
+    # Under WSGI Django consumes the whole async stream before sending a
+    # byte, and the endless stream would hold a worker thread forever
+    return JsonResponse(
+        {'error': "Live streams are only served by the ASGI server (SERVER_PROFILE=asgi)"},
+        status=501,
+    )
+
+
+def event_stream_response(channel):
+    response = StreamingHttpResponse(event_stream(channel), content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    response['X-Accel-Buffering'] = 'no'
+    return response
+
+
+@require_GET
+async def round_stream(request, pk):
+    """Server-Sent Events with the leaderboard deltas of a round."""
+    if not isinstance(request, ASGIRequest):
+        return asgi_required()
+    if not await Round.objects.filter(pk=pk).aexists():
+        return JsonResponse({'error': "Not found"}, status=404)
+    return event_stream_response(round_channel(pk))
+
+
+@require_GET
+async def competition_stream(request, pk):
+    """Server-Sent Events with the leaderboard deltas of a competition."""
+    if not isinstance(request, ASGIRequest):
+        return asgi_required()
+    if not await Competition.objects.filter(pk=pk).aexists():
+        return JsonResponse({'error': "Not found"}, status=404)
+    return event_stream_response(competition_channel(pk))
@@ -6,7 +6,6 @@ from .models import (
 )
 
 from wagtail.snippets.views.snippets import SnippetViewSet, SnippetViewSetGroup
-from wagtail.snippets.models import register_snippet
 from wagtail.admin.ui.tables import BooleanColumn
 from wagtail.admin.panels import MultiFieldPanel, FieldPanel, FieldRowPanel
 
@@ -20,10 +19,14 @@ def deactivate_bowtypes(modeladmin, request, queryset):
 
 class BowTypeMembershipInline(admin.TabularInline):
     model = BowTypeMembership
+    autocomplete_fields = ('archer',)
     extra = 1
     fields = ('archer',)
     can_delete = False
     show_change_link = True
+
+    def get_queryset(self, request):
+        return super().get_queryset(request).select_related('bowtype', 'archer')
     
 @admin.register(BowType)
 class BowTypeAdmin(admin.ModelAdmin):
@@ -63,6 +66,8 @@ def deactivate_bowtype_memberships(modeladmin, request, queryset):
 @admin.register(BowTypeMembership)
 class BowTypeMembershipAdmin(admin.ModelAdmin):
     actions=[activate_bowtype_memberships, deactivate_bowtype_memberships]
+    autocomplete_fields = ('archer',)
+    list_select_related = ('bowtype', 'archer',)
     list_display = ('bowtype', 'archer', 'is_active',)
     list_editable = ('is_active',)
     list_filter = ('is_active',)
@@ -82,7 +87,7 @@ class BowTypeMembershipAdmin(admin.ModelAdmin):
             'fields': ('is_active',),
         }),
     )
-    search_fields = ('bowtype__name', 'archer__name')
+    search_fields = ('bowtype__name', '^archer__last_name')
     
 # Wagtail Snippets
 
@@ -128,6 +133,9 @@ class BowTypeMembershipSnippetViewSet(SnippetViewSet):
     list_display = ('bowtype', 'archer', BooleanColumn('is_active'),)
     list_filter = ('is_active',)
 
+    def get_queryset(self, request):
+        return self.model._default_manager.select_related('bowtype', 'archer')
+
     panels = [
         FieldPanel('bowtype'),
         FieldPanel('archer'),
@@ -157,4 +165,3 @@ class MaterialSnippetViewSetGroup(SnippetViewSetGroup):
         BowTypeSnippetViewSet,
         BowTypeMembershipSnippetViewSet,
     )
-register_snippet(MaterialSnippetViewSetGroup)    
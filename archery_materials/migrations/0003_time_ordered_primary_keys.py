@@ -0,0 +1,124 @@
+# Generated by Django 5.2.18 on 2026-10-18 09:01
+
+import utils.uuid_utils
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('archery_materials', '0002_initial'),
+    ]
+
+    # The key default is evaluated in Python only, the columns do not change
+    operations = [
+        migrations.SeparateDatabaseAndState(
+            state_operations=[
+                migrations.AlterField(
+                    model_name='armguard',
+                    name='id',
+                    field=models.UUIDField(default=utils.uuid_utils.default_uuid, editable=False, primary_key=True, serialize=False),
+                ),
+                migrations.AlterField(
+                    model_name='arrowrest',
+                    name='id',
+                    field=models.UUIDField(default=utils.uuid_utils.default_uuid, editable=False, primary_key=True, serialize=False),
+                ),
+                migrations.AlterField(
+                    model_name='arrowresttype',
+                    name='id',
+                    field=models.UUIDField(default=utils.uuid_utils.default_uuid, editable=False, primary_key=True, serialize=False),
+                ),
+                migrations.AlterField(
+                    model_name='bow',
+                    name='id',
+                    field=models.UUIDField(default=utils.uuid_utils.default_uuid, editable=False, primary_key=True, serialize=False),
+                ),
+                migrations.AlterField(
+                    model_name='bowtype',
+                    name='id',
+                    field=models.UUIDField(default=utils.uuid_utils.default_uuid, editable=False, primary_key=True, serialize=False),
+                ),
+                migrations.AlterField(
+                    model_name='bowtypemembership',
+                    name='id',
+                    field=models.UUIDField(default=utils.uuid_utils.default_uuid, editable=False, primary_key=True, serialize=False),
+                ),
+                migrations.AlterField(
+                    model_name='chestguard',
+                    name='id',
+                    field=models.UUIDField(default=utils.uuid_utils.default_uuid, editable=False, primary_key=True, serialize=False),
+                ),
+                migrations.AlterField(
+                    model_name='clicker',
+                    name='id',
+                    field=models.UUIDField(default=utils.uuid_utils.default_uuid, editable=False, primary_key=True, serialize=False),
+                ),
+                migrations.AlterField(
+                    model_name='equipment',
+                    name='id',
+                    field=models.UUIDField(default=utils.uuid_utils.default_uuid, editable=False, primary_key=True, serialize=False),
+                ),
+                migrations.AlterField(
+                    model_name='fingertab',
+                    name='id',
+                    field=models.UUIDField(default=utils.uuid_utils.default_uuid, editable=False, primary_key=True, serialize=False),
+                ),
+                migrations.AlterField(
+                    model_name='limb',
+                    name='id',
+                    field=models.UUIDField(default=utils.uuid_utils.default_uuid, editable=False, primary_key=True, serialize=False),
+                ),
+                migrations.AlterField(
+                    model_name='limbtype',
+                    name='id',
+                    field=models.UUIDField(default=utils.uuid_utils.default_uuid, editable=False, primary_key=True, serialize=False),
+                ),
+                migrations.AlterField(
+                    model_name='nockingpoint',
+                    name='id',
+                    field=models.UUIDField(default=utils.uuid_utils.default_uuid, editable=False, primary_key=True, serialize=False),
+                ),
+                migrations.AlterField(
+                    model_name='plunger',
+                    name='id',
+                    field=models.UUIDField(default=utils.uuid_utils.default_uuid, editable=False, primary_key=True, serialize=False),
+                ),
+                migrations.AlterField(
+                    model_name='quiver',
+                    name='id',
+                    field=models.UUIDField(default=utils.uuid_utils.default_uuid, editable=False, primary_key=True, serialize=False),
+                ),
+                migrations.AlterField(
+                    model_name='quivertype',
+                    name='id',
+                    field=models.UUIDField(default=utils.uuid_utils.default_uuid, editable=False, primary_key=True, serialize=False),
+                ),
+                migrations.AlterField(
+                    model_name='riser',
+                    name='id',
+                    field=models.UUIDField(default=utils.uuid_utils.default_uuid, editable=False, primary_key=True, serialize=False),
+                ),
+                migrations.AlterField(
+                    model_name='risertype',
+                    name='id',
+                    field=models.UUIDField(default=utils.uuid_utils.default_uuid, editable=False, primary_key=True, serialize=False),
+                ),
+                migrations.AlterField(
+                    model_name='sight',
+                    name='id',
+                    field=models.UUIDField(default=utils.uuid_utils.default_uuid, editable=False, primary_key=True, serialize=False),
+                ),
+                migrations.AlterField(
+                    model_name='stabilizer',
+                    name='id',
+                    field=models.UUIDField(default=utils.uuid_utils.default_uuid, editable=False, primary_key=True, serialize=False),
+                ),
+                migrations.AlterField(
+                    model_name='stringmaterial',
+                    name='id',
+                    field=models.UUIDField(default=utils.uuid_utils.default_uuid, editable=False, primary_key=True, serialize=False),
+                ),
+            ],
+        ),
+    ]
@@ -1,4 +1,3 @@
-import uuid
 from django.db import models
 from django.utils import timezone
 from django_extensions.db.fields import AutoSlugField
@@ -10,9 +9,10 @@ from django.core.validators import MaxValueValidator, MinValueValidator
 from modeling.models import Archer
 
 from userauth.models import CustomUser 
+from utils.uuid_utils import default_uuid
 
 class ArcheryMaterialsBaseModel(models.Model):
-    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    id = models.UUIDField(primary_key=True, default=default_uuid, editable=False)
 
     created_at = models.DateTimeField(default=timezone.now, editable=False)
     modified_at = models.DateTimeField(auto_now=True)
@@ -1,3 +1,4 @@
+from wagtail.snippets.models import register_snippet
 from wagtail_modeladmin.options import ModelAdmin, modeladmin_register
 from wagtail.admin.panels import MultiFieldPanel, FieldPanel, FieldRowPanel
 
@@ -6,3 +7,7 @@ from .models import (
     BowTypeMembership,
 )
 
+from .admin import MaterialSnippetViewSetGroup
+
+# Registered here rather than in admin.py, see modeling.wagtail_hooks
+register_snippet(MaterialSnippetViewSetGroup)
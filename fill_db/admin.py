@@ -1,3 +1,22 @@
 from django.contrib import admin
 
-# Register your models here.
+from .models import FillCheckpoint, FillRun
+
+class FillCheckpointInline(admin.TabularInline):
+    model = FillCheckpoint
+    extra = 0
+    fields = ('shard', 'rows', 'completed_at')
+    readonly_fields = ('shard', 'rows', 'completed_at')
+    can_delete = False
+    show_change_link = False
+
+@admin.register(FillRun)
+class FillRunAdmin(admin.ModelAdmin):
+    inlines = [
+        FillCheckpointInline,
+    ]
+    list_display = ('run_id', 'created_at', 'finished_at',)
+    list_display_links = ('run_id',)
+    list_per_page = 20
+    readonly_fields = ('run_id', 'options', 'created_at', 'finished_at',)
+    search_fields = ('run_id',)
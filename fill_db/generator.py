@@ -0,0 +1,222 @@
+"""
+Synthetic data at scale for load tests.
+
+Everything is drawn from random.Random generators seeded by the caller, so
+the same flags give the same archers, memberships and scores. Rows are written with
+bulk_create, one transaction per batch. Slugs are set here rather than by
+AutoSlugField, see utils.slug_utils.
+"""
+import datetime
+from itertools import islice
+
+from django.db import transaction
+
+from modeling import leaderboard
+from modeling.models import (
+    Archer,
+    Club,
+    ClubMembership,
+    End,
+    Round,
+    RoundMembership,
+    Score,
+    ScoringSheet,
+)
+from modeling.scoring import ARROW_X, summarize
+from utils.slug_utils import given_slugs, suffixed_slug
+
+FIRST_NAMES = [
+    "Anna", "Bart", "Daan", "Emma", "Eva", "Fleur", "Hans", "Iris", "Jan", "Joost",
+    "Julia", "Kees", "Lars", "Lotte", "Luuk", "Maria", "Mark", "Noah", "Peter", "Piet",
+    "Roos", "Sanne", "Sem", "Sophie", "Thijs", "Tim", "Vera", "Willem", "Yara", "Zoe",
+]
+LAST_NAMES = [
+    "Bakker", "Bos", "Brouwer", "Dekker", "Dijkstra", "Hendriks", "Jansen", "Janssen", "Kok", "Koster",
+    "Meijer", "Mulder", "Peters", "Prins", "Smit", "Smits", "Van Dam", "Van Dijk", "Van Leeuwen", "Vanalles",
+    "Vermeulen", "Visser", "Vos", "De Boer", "De Bruijn", "De Graaf", "De Groot", "De Jong", "De Vries", "De Wit",
+]
+TOWNS = [
+    "Amsterdam", "Breda", "Den Bosch", "Eindhoven", "Groningen", "Nijmegen", "Rotterdam", "Tilburg", "Utrecht", "Veldhoven",
+]
+
+# Synthetic archers get union numbers from here on, clear of hand entered ones
+UNION_NUMBER_START = 1_000_000
+SYNTHETIC_CLUB_PREFIX = "Synthetic Club"
+SYNTHETIC_ROUND_PREFIX = "Synthetic Round"
+SYNTHETIC_SHEET = ("Indoor 18 meter", 3, 10)
+
+
+def chunked(iterable, size):
+    iterator = iter(iterable)
+    while chunk := list(islice(iterator, size)):
+        yield chunk
+
+
+def bulk_save(model, objects, batch_size):
+    """Insert ``objects`` in batches of ``batch_size``, one transaction per batch."""
+    count = 0
+    with given_slugs(model):
+        for chunk in chunked(objects, batch_size):
+            with transaction.atomic():
+                model.objects.bulk_create(chunk)
+            count += len(chunk)
+    return count
+
+
+def synthetic_data_exists():
+    return Archer.objects.filter(union_number__gte=UNION_NUMBER_START).exists()
+
+
+def synthetic_archer_ids():
+    return list(
+        Archer.objects
+        .filter(union_number__gte=UNION_NUMBER_START)
+        .order_by('union_number')
+        .values_list('pk', flat=True)
+    )
+
+
+def synthetic_club_ids():
+    return list(
+        Club.objects
+        .filter(name__startswith=SYNTHETIC_CLUB_PREFIX)
+        .order_by('name')
+        .values_list('pk', flat=True)
+    )
+
+
+def synthetic_round_ids():
+    return list(
+        Round.objects
+        .filter(name__startswith=SYNTHETIC_ROUND_PREFIX)
+        .order_by('name')
+        .values_list('pk', flat=True)
+    )
+
+
+def create_clubs(count, rng, author, batch_size):
+    clubs = [
+        Club(
+            author=author,
+            name=f"{SYNTHETIC_CLUB_PREFIX} {number:05d}",
+            town=rng.choice(TOWNS),
+            slug=suffixed_slug("club", suffix=number),
+        )
+        for number in range(1, count + 1)
+    ]
+    bulk_save(Club, clubs, batch_size)
+    return [club.pk for club in clubs]
+
+
+def create_archers(count, rng, author, batch_size):
+    """Create ``count`` archers; returns their ids in union number order."""
+    archers = []
+    for number in range(count):
+        last_name = rng.choice(LAST_NAMES)
+        union_number = UNION_NUMBER_START + number
+        archers.append(Archer(
+            author=author,
+            first_name=rng.choice(FIRST_NAMES),
+            last_name=last_name,
+            union_number=union_number,
+            slug=suffixed_slug(last_name, suffix=union_number),
+        ))
+    bulk_save(Archer, archers, batch_size)
+    return [archer.pk for archer in archers]
+
+
+def archer_skills(count, rng):
+    """Mean arrow value of each synthetic archer, in union number order."""
+    return [rng.uniform(5.5, 9.8) for _ in range(count)]
+
+
+def create_club_memberships(archer_ids, club_ids, rng, author, batch_size):
+    if not club_ids:
+        return 0
+    memberships = (
+        ClubMembership(
+            author=author,
+            club_id=rng.choice(club_ids),
+            archer_id=archer_id,
+            slug=suffixed_slug("club-member", suffix=number),
+        )
+        for number, archer_id in enumerate(archer_ids)
+    )
+    return bulk_save(ClubMembership, memberships, batch_size)
+
+
+def get_scoringsheet(author):
+    name, columns, rows = SYNTHETIC_SHEET
+    sheet = ScoringSheet.objects.filter(name=name, columns=columns, rows=rows).first()
+    return sheet or ScoringSheet.objects.create(author=author, name=name, columns=columns, rows=rows)
+
+
+def create_rounds(count, sheet, author, batch_size, start=datetime.date(2026, 1, 1)):
+    rounds = [
+        Round(
+            author=author,
+            name=f"{SYNTHETIC_ROUND_PREFIX} {number:05d}",
+            scoringsheet=sheet,
+            start_date=start + datetime.timedelta(weeks=number - 1),
+            start_time=datetime.time(20, 0),
+            slug=suffixed_slug("synthetic round", suffix=number),
+        )
+        for number in range(1, count + 1)
+    ]
+    bulk_save(Round, rounds, batch_size)
+    return [round.pk for round in rounds]
+
+
+def shoot_arrow(rng, skill):
+    value = min(10, max(0, round(rng.gauss(skill, 1.3))))
+    if value == 10 and rng.random() < 0.4:
+        return ARROW_X
+    return value
+
+
+def create_round_scores(round_id, archers, count, sheet, rng, author, batch_size, ends=False):
+    """Enter ``count`` archers drawn from ``archers`` into the round, each with one shot Score.
+
+    ``archers`` is a list of (archer id, skill). With ``ends``
+    every end is stored as well, otherwise only the Score totals.
+    """
+    memberships, scores, end_rows = [], [], []
+    for number, (archer_id, skill) in enumerate(rng.sample(archers, min(count, len(archers)))):
+        membership = RoundMembership(
+            author=author,
+            round_id=round_id,
+            archer_id=archer_id,
+            slug=suffixed_slug("round-member", suffix=f"{str(round_id)[:8]}-{number}"),
+        )
+        arrows = [
+            [shoot_arrow(rng, skill) for _ in range(sheet.columns)]
+            for _ in range(sheet.rows)
+        ]
+        total, tens, xs = summarize([code for end in arrows for code in end])
+        score = Score(
+            author=author,
+            round_archer=membership,
+            score=total,
+            tens=tens,
+            xs=xs,
+            number_of_arrows=sheet.rows * sheet.columns,
+        )
+        memberships.append(membership)
+        scores.append(score)
+        if ends:
+            for end_number, codes in enumerate(arrows, start=1):
+                end_total, end_tens, end_xs = summarize(codes)
+                end_rows.append(End(
+                    author=author,
+                    score=score,
+                    number=end_number,
+                    arrows=bytes(codes),
+                    total=end_total,
+                    tens=end_tens,
+                    xs=end_xs,
+                ))
+    bulk_save(RoundMembership, memberships, batch_size)
+    bulk_save(Score, scores, batch_size)
+    bulk_save(End, end_rows, batch_size)
+    leaderboard.refresh_round_entries([membership.pk for membership in memberships])
+    return len(scores)
@@ -1,8 +1,11 @@
 import random
+import time
 from decimal import Decimal
 from lorem_text import lorem
 
-from django.core.management.base import BaseCommand
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.utils import timezone
 # from django.contrib.auth.models import User
 # from users.models import User
 from userauth.models import CustomUser
@@ -33,8 +36,14 @@ from archery_materials.models import (
     BowTypeMembership,
 )
 
+from fill_db import generator, runner
+from fill_db.models import FillRun
+
 SCREEN_OUTPUT = True
 
+# Memberships of the sample data are drawn from at most this many rows
+SAMPLE_POOL = 100
+
 class Command(BaseCommand):
     user = None   
     
@@ -53,9 +62,25 @@ class Command(BaseCommand):
         if SCREEN_OUTPUT:
             self.stdout.write(self.style.SUCCESS('Superuser "admin" ensured.'))
         
-    help = 'Populate the database with sample data'
-    
-    def handle(self, *args, **kwargs):
+    help = 'Populate the database with sample data, and synthetic data at scale with the size options'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--archers', type=int, default=0, help='Number of synthetic archers')
+        parser.add_argument('--clubs', type=int, default=0, help='Number of synthetic clubs, every archer joins one')
+        parser.add_argument('--rounds', type=int, default=0, help='Number of synthetic rounds')
+        parser.add_argument('--scores-per-round', type=int, default=0, help='Archers with a score in every round')
+        parser.add_argument('--ends', action='store_true', help='Store the ends of the synthetic scores as well')
+        parser.add_argument('--seed', type=int, default=None, help='Seed for repeatable data')
+        parser.add_argument('--batch-size', type=int, default=2000)
+        parser.add_argument('--workers', type=int, default=1, help='Processes writing the round shards')
+        parser.add_argument('--run-id', default=None, help='Resume the run with this id, or name a new one')
+
+    def handle(self, *args, **options):
+        self.random = random.Random(options['seed'])
+        if options['seed'] is not None:
+            # lorem texts use the global generator
+            random.seed(options['seed'])
+
         # modeling app - begin
         self.create_sample_archers()
         self.create_sample_clubs()
@@ -77,6 +102,39 @@ class Command(BaseCommand):
         self.create_sample_bowtype_memberships()
         # archery_materials app - end      
 
+        if options['archers'] or options['clubs'] or options['rounds']:
+            self.create_synthetic_data(options)
+
+    def sample_pool(self, model):
+        return list(model.objects.order_by('pk')[:SAMPLE_POOL])
+
+    def create_synthetic_data(self, options):
+        run_id = options['run_id'] or timezone.now().strftime('%Y%m%d-%H%M%S-%f')
+        if generator.synthetic_data_exists() and not FillRun.objects.filter(run_id=run_id).exists():
+            raise CommandError("Synthetic archers already exist, resume their run with --run-id.")
+        run, created = runner.get_or_create_run(run_id, options)
+        if run.finished_at:
+            self.stdout.write(self.style.SUCCESS(f'Run {run.run_id} is already complete'))
+            return
+        self.stdout.write(self.style.SUCCESS(
+            f'{"Starting" if created else "Resuming"} run {run.run_id} with {run.options}'
+        ))
+        if options['workers'] > 1 and connection.vendor == 'sqlite':
+            self.stdout.write(self.style.WARNING('SQLite takes one writer at a time, the workers will wait on each other'))
+        start = time.perf_counter()
+        try:
+            runner.fill_run(
+                run, self.user, workers=options['workers'],
+                log=lambda message: self.stdout.write(self.style.SUCCESS(message)),
+            )
+        except runner.ShardError as e:
+            for shard, error in sorted(e.failed.items()):
+                self.stderr.write(f'{shard}: {error!r}')
+            raise CommandError(f'{e} Resume with --run-id {e.run_id}.')
+        self.stdout.write(self.style.SUCCESS(
+            f'Run {run.run_id} complete in {time.perf_counter() - start:.1f} s'
+        ))
+
     # modeling app - begin
 
     def create_sample_archers(self):
@@ -149,9 +207,11 @@ class Command(BaseCommand):
                     self.stdout.write(self.style.SUCCESS(f'Club "{club.name} created" '))
 
     def create_sample_club_memberships(self):
+        clubs = self.sample_pool(Club)
+        archers = self.sample_pool(Archer)
         for i in range (1,10):
-            _club = random.choice(Club.objects.all())
-            _archer = random.choice(Archer.objects.all())
+            _club = self.random.choice(clubs)
+            _archer = self.random.choice(archers)
             club_membership = ClubMembership.objects.filter(
                 archer=_archer,
                 club=_club,
@@ -226,9 +286,11 @@ class Command(BaseCommand):
                     self.stdout.write(self.style.SUCCESS(f'Discipline "{discipline.name} created"'))
 
     def create_sample_discipline_memberships(self):
+        disciplines = self.sample_pool(Discipline)
+        archers = self.sample_pool(Archer)
         for i in range(1, 10):
-            discipline = random.choice(Discipline.objects.all())
-            archer = random.choice(Archer.objects.all())
+            discipline = self.random.choice(disciplines)
+            archer = self.random.choice(archers)
             discipline_membership = DisciplineMembership.objects.filter(
                 archer=archer,
                 discipline=discipline,
@@ -278,9 +340,11 @@ class Command(BaseCommand):
                     self.stdout.write(self.style.SUCCESS(f'Category - {category.name} created'))
        
     def create_sample_category_memberships(self):
+        categories = self.sample_pool(Category)
+        archers = self.sample_pool(Archer)
         for i in range(1, 10):
-            category = random.choice(Category.objects.all())
-            archer = random.choice(Archer.objects.all())
+            category = self.random.choice(categories)
+            archer = self.random.choice(archers)
             category_membership = CategoryMembership.objects.filter(
                 archer=archer,
                 category=category,
@@ -330,9 +394,11 @@ class Command(BaseCommand):
                     self.stdout.write(self.style.SUCCESS(f'Team "{team.name} created"'))
                          
     def create_sample_team_memberships(self):
+        teams = self.sample_pool(Team)
+        archers = self.sample_pool(Archer)
         for i in range(1, 10):
-            team = random.choice(Team.objects.all())
-            archer = random.choice(Archer.objects.all())
+            team = self.random.choice(teams)
+            archer = self.random.choice(archers)
             team_membership = TeamMembership.objects.filter(
                 archer=archer,
                 team=team,
@@ -567,9 +633,11 @@ class Command(BaseCommand):
                     self.stdout.write(self.style.SUCCESS(f'BowType "{bowtype.name} created" '))
 
     def create_sample_bowtype_memberships(self):
+        bowtypes = self.sample_pool(BowType)
+        archers = self.sample_pool(Archer)
         for i in range (1,10):
-            bowtype = random.choice(BowType.objects.all())
-            archer = random.choice(Archer.objects.all())
+            bowtype = self.random.choice(bowtypes)
+            archer = self.random.choice(archers)
             bowtype_membership = BowTypeMembership.objects.filter(
                 archer=archer,
                 bowtype=bowtype,
@@ -0,0 +1,49 @@
+# Generated by Django 5.2.18 on 2026-10-18 09:13
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='FillRun',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('run_id', models.CharField(help_text='format: required, max-64', max_length=64, unique=True, verbose_name='Run id')),
+                ('options', models.JSONField(default=dict, help_text='format: sizes, seed and batch size of the run', verbose_name='Options')),
+                ('created_at', models.DateTimeField(default=django.utils.timezone.now, editable=False)),
+                ('finished_at', models.DateTimeField(blank=True, help_text='format: set when every shard is done', null=True, verbose_name='Finished at')),
+            ],
+            options={
+                'verbose_name': 'Fill Run',
+                'verbose_name_plural': 'Fill Runs',
+                'db_table': 'fill_db_runs',
+                'ordering': ['-created_at'],
+            },
+        ),
+        migrations.CreateModel(
+            name='FillCheckpoint',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('shard', models.CharField(help_text='format: required, e.g. archers or round:12', max_length=64, verbose_name='Shard')),
+                ('rows', models.PositiveIntegerField(default=0, help_text='format: rows written by the shard', verbose_name='Rows')),
+                ('completed_at', models.DateTimeField(default=django.utils.timezone.now, editable=False)),
+                ('run', models.ForeignKey(help_text='format: required', on_delete=django.db.models.deletion.CASCADE, related_name='checkpoints', to='fill_db.fillrun', verbose_name='Run')),
+            ],
+            options={
+                'verbose_name': 'Fill Checkpoint',
+                'verbose_name_plural': 'Fill Checkpoints',
+                'db_table': 'fill_db_checkpoints',
+                'ordering': ['completed_at'],
+                'constraints': [models.UniqueConstraint(fields=('run', 'shard'), name='unique_fill_checkpoint_shard')],
+            },
+        ),
+    ]
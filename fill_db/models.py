@@ -1,3 +1,76 @@
 from django.db import models
+from django.utils import timezone
+from django.utils.translation import gettext_lazy as _
 
-# Create your models here.
+class FillRun(models.Model):
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+
+    run_id = models.CharField(
+        max_length=64,
+        unique=True,
+        verbose_name=_("Run id"),
+        help_text=_("format: required, max-64"),
+    )
+    options = models.JSONField(
+        default=dict,
+        verbose_name=_("Options"),
+        help_text=_("format: sizes, seed and batch size of the run"),
+    )
+    created_at = models.DateTimeField(default=timezone.now, editable=False)
+    finished_at = models.DateTimeField(
+        null=True,
+        blank=True,
+        verbose_name=_("Finished at"),
+        help_text=_("format: set when every shard is done"),
+    )
+
+    class Meta:
+        db_table = 'fill_db_runs'
+        ordering = ['-created_at']
+        verbose_name = _("Fill Run")
+        verbose_name_plural = _("Fill Runs")
+
+    def __str__(self):
+        return self.run_id
+
+    def __unicode__(self):
+        return self.run_id
+
+class FillCheckpoint(models.Model):
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+
+    run = models.ForeignKey(
+        FillRun,
+        on_delete=models.CASCADE,
+        related_name='checkpoints',
+        verbose_name=_("Run"),
+        help_text=_("format: required"),
+    )
+    shard = models.CharField(
+        max_length=64,
+        verbose_name=_("Shard"),
+        help_text=_("format: required, e.g. archers or round:12"),
+    )
+    rows = models.PositiveIntegerField(
+        default=0,
+        verbose_name=_("Rows"),
+        help_text=_("format: rows written by the shard"),
+    )
+    completed_at = models.DateTimeField(default=timezone.now, editable=False)
+
+    class Meta:
+        db_table = 'fill_db_checkpoints'
+        ordering = ['completed_at']
+        verbose_name = _("Fill Checkpoint")
+        verbose_name_plural = _("Fill Checkpoints")
+        constraints = [
+            models.UniqueConstraint(fields=['run', 'shard'], name='unique_fill_checkpoint_shard'),
+        ]
+
+    def __str__(self):
+        return f"{self.run} - {self.shard}"
+
+    def __unicode__(self):
+        return f"{self.run} - {self.shard}"
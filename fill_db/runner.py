@@ -0,0 +1,166 @@
+"""
+Sharded, resumable runs of the synthetic data generator.
+
+A run is split into shards. Clubs, archers, club memberships and rounds
+are written by the main process. After that every round is a shard of its
+own (memberships, scores, ends and leaderboard), handed to a process pool.
+A shard commits its rows together with its FillCheckpoint, so a run that
+stopped halfway is resumed with the same run id and only the shards
+without checkpoint are done again.
+
+Each shard draws from its own random.Random seeded with the run seed and
+the shard name. The data does not depend on the number of workers or the
+order in which shards finish.
+"""
+import random
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from contextlib import contextmanager
+
+import django
+from django.db import connections, transaction
+from django.utils import timezone
+
+from userauth.models import CustomUser
+
+from . import generator
+from .models import FillCheckpoint, FillRun
+
+RUN_OPTIONS = ('archers', 'clubs', 'rounds', 'scores_per_round', 'ends', 'seed', 'batch_size')
+
+
+class ShardError(Exception):
+
+    def __init__(self, run_id, failed):
+        super().__init__(f"{len(failed)} shard(s) failed: {', '.join(sorted(failed))}")
+        self.run_id = run_id
+        self.failed = failed
+
+
+def shard_random(seed, shard):
+    return random.Random(f"{seed}:{shard}")
+
+
+def get_or_create_run(run_id, options):
+    """Return (run, created). A resumed run keeps the options it started with."""
+    run = FillRun.objects.filter(run_id=run_id).first()
+    if run is not None:
+        return run, False
+    run_options = {name: options[name] for name in RUN_OPTIONS}
+    if run_options['seed'] is None:
+        run_options['seed'] = random.randrange(2 ** 31)
+    return FillRun.objects.create(run_id=run_id, options=run_options), True
+
+
+@contextmanager
+def checkpoint(run_pk, shard):
+    """Commit the rows written in the block together with the checkpoint of ``shard``.
+
+    The block sets ``progress['rows']`` to the number of rows it wrote.
+    """
+    with transaction.atomic():
+        progress = {'rows': 0}
+        yield progress
+        FillCheckpoint.objects.create(run_id=run_pk, shard=shard, rows=progress['rows'])
+
+
+def fill_setup(run, author, log):
+    """Shards written by the main process; returns the (archer id, skill) list."""
+    options = run.options
+    seed, batch_size = options['seed'], options['batch_size']
+    done = set(run.checkpoints.values_list('shard', flat=True))
+
+    if 'clubs' not in done:
+        with checkpoint(run.pk, 'clubs') as progress:
+            progress['rows'] = len(generator.create_clubs(
+                options['clubs'], shard_random(seed, 'clubs'), author, batch_size,
+            ))
+        log(f"{progress['rows']} synthetic clubs created")
+    if 'archers' not in done:
+        with checkpoint(run.pk, 'archers') as progress:
+            progress['rows'] = len(generator.create_archers(
+                options['archers'], shard_random(seed, 'archers'), author, batch_size,
+            ))
+        log(f"{progress['rows']} synthetic archers created")
+    archer_ids = generator.synthetic_archer_ids()
+    if 'club-memberships' not in done:
+        with checkpoint(run.pk, 'club-memberships') as progress:
+            progress['rows'] = generator.create_club_memberships(
+                archer_ids, generator.synthetic_club_ids(),
+                shard_random(seed, 'club-memberships'), author, batch_size,
+            )
+        log(f"{progress['rows']} synthetic club memberships created")
+    if 'rounds' not in done:
+        with checkpoint(run.pk, 'rounds') as progress:
+            progress['rows'] = len(generator.create_rounds(
+                options['rounds'], generator.get_scoringsheet(author), author, batch_size,
+            ))
+        log(f"{progress['rows']} synthetic rounds created")
+
+    skills = generator.archer_skills(len(archer_ids), shard_random(seed, 'skills'))
+    return list(zip(archer_ids, skills))
+
+
+# Archers of the run, set once per worker process by init_worker
+_archers = None
+
+
+def init_worker(archers):
+    global _archers
+    # Needed when the pool spawns rather than forks its processes
+    django.setup()
+    _archers = archers
+
+
+def fill_round(run_pk, shard, round_id, options, author_id, archers=None):
+    """Round shard: memberships, scores, ends and leaderboard of one round."""
+    author = CustomUser(pk=author_id)
+    sheet = generator.get_scoringsheet(author)
+    with checkpoint(run_pk, shard) as progress:
+        progress['rows'] = generator.create_round_scores(
+            round_id, archers if archers is not None else _archers, options['scores_per_round'], sheet,
+            shard_random(options['seed'], shard), author, options['batch_size'], ends=options['ends'],
+        )
+    return shard, progress['rows']
+
+
+def fill_run(run, author, workers=1, log=print):
+    """Write every shard of ``run`` that has no checkpoint yet.
+
+    Raises ShardError listing the shards that failed; the others are kept.
+    """
+    archers = fill_setup(run, author, log)
+    done = set(run.checkpoints.values_list('shard', flat=True))
+    pending = [
+        (f"round:{number}", round_id)
+        for number, round_id in enumerate(generator.synthetic_round_ids(), start=1)
+        if f"round:{number}" not in done
+    ]
+    failed = {}
+    if workers <= 1:
+        for shard, round_id in pending:
+            try:
+                fill_round(run.pk, shard, round_id, run.options, author.pk, archers)
+            except Exception as e:
+                failed[shard] = e
+            else:
+                log(f"{shard} done")
+    else:
+        # Workers open their own connections, none may be inherited by a fork
+        connections.close_all()
+        with ProcessPoolExecutor(workers, initializer=init_worker, initargs=(archers,)) as pool:
+            futures = {
+                pool.submit(fill_round, run.pk, shard, round_id, run.options, author.pk): shard
+                for shard, round_id in pending
+            }
+            for future in as_completed(futures):
+                try:
+                    shard, rows = future.result()
+                except Exception as e:
+                    failed[futures[future]] = e
+                else:
+                    log(f"{shard} done, {rows} scores")
+    if failed:
+        raise ShardError(run.run_id, failed)
+    run.finished_at = timezone.now()
+    run.save(update_fields=['finished_at'])
+    return run
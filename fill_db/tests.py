@@ -1,3 +1,68 @@
-from django.test import TestCase
+from io import StringIO
+from unittest import mock
 
-# Create your tests here.
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.db.models import Sum
+
+from modeling.models import Archer, ClubMembership, End, LeaderboardEntry, Round, RoundMembership, Score
+from modeling.tests import ModelingTestCase
+
+from . import generator
+from .models import FillRun
+
+
+class FillDbTests(ModelingTestCase):
+
+    def fill(self, **options):
+        call_command('fill_db', seed=7, stdout=StringIO(), stderr=StringIO(), **options)
+
+    def test_synthetic_data_at_scale(self):
+        self.fill(archers=50, clubs=4, rounds=3, scores_per_round=20, ends=True)
+
+        synthetic = Archer.objects.filter(union_number__gte=generator.UNION_NUMBER_START)
+        self.assertEqual(synthetic.count(), 50)
+        self.assertEqual(ClubMembership.objects.filter(archer__in=synthetic).count(), 50)
+        rounds = Round.objects.filter(name__startswith=generator.SYNTHETIC_ROUND_PREFIX)
+        self.assertEqual(rounds.count(), 3)
+        scores = Score.objects.filter(round_archer__round__in=rounds)
+        self.assertEqual(scores.count(), 60)
+        self.assertEqual(LeaderboardEntry.objects.filter(round__in=rounds).count(), 60)
+
+        score = scores.first()
+        self.assertEqual(score.number_of_arrows, 30)
+        self.assertEqual(End.objects.filter(score=score).aggregate(total=Sum('total'))['total'], score.score)
+        # Slugs are taken as given instead of queried for uniqueness
+        self.assertEqual(synthetic.order_by('union_number').first().slug.split('-')[-1], str(generator.UNION_NUMBER_START))
+
+    def test_refuses_to_run_twice(self):
+        self.fill(archers=2)
+        with self.assertRaises(CommandError):
+            self.fill(archers=2)
+        with self.assertRaises(CommandError):
+            self.fill(archers=2, run_id='other')
+
+    def test_resume_after_failed_shard(self):
+        create_round_scores = generator.create_round_scores
+        calls = []
+
+        def fail_second_round(*args, **kwargs):
+            calls.append(args[0])
+            if len(calls) == 2:
+                raise RuntimeError("worker lost")
+            return create_round_scores(*args, **kwargs)
+
+        with mock.patch.object(generator, 'create_round_scores', fail_second_round):
+            with self.assertRaisesMessage(CommandError, 'round:2'):
+                self.fill(archers=20, clubs=2, rounds=3, scores_per_round=5, run_id='resume')
+        rounds = Round.objects.filter(name__startswith=generator.SYNTHETIC_ROUND_PREFIX)
+        self.assertEqual(Score.objects.filter(round_archer__round__in=rounds).count(), 10)
+
+        # Only the failed shard is done again, with the options of the first call
+        self.fill(run_id='resume', archers=1)
+        run = FillRun.objects.get(run_id='resume')
+        self.assertIsNotNone(run.finished_at)
+        self.assertEqual(run.checkpoints.count(), 7)
+        self.assertEqual(Archer.objects.filter(union_number__gte=generator.UNION_NUMBER_START).count(), 20)
+        self.assertEqual(Score.objects.filter(round_archer__round__in=rounds).count(), 15)
+        self.assertEqual(RoundMembership.objects.filter(round_id=calls[1]).count(), 5)
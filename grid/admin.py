@@ -1,38 +1,100 @@
+from functools import lru_cache
+
+from django import forms
 from django.contrib import admin
+from django.core.exceptions import ValidationError
+
+from modeling.models import ScoringSheet
+from modeling.scoring import decode_arrow, encode_arrow
+
+from .models import Grid
+
+def cell_name(row, column):
+    return f"x{column}y{row}"
+
+class GridAdminForm(forms.ModelForm):
+    # (rows, columns) of the cell fields, set by grid_form
+    shape = (0, 0)
+
+    class Meta:
+        model = Grid
+        fields = ('name', 'scoringsheet')
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        if self.instance.pk:
+            for row, codes in enumerate(self.instance.get_rows(), start=1):
+                for column, code in enumerate(codes, start=1):
+                    name = cell_name(row, column)
+                    if name in self.fields and code is not None:
+                        self.fields[name].initial = decode_arrow(code)
+
+    def clean(self):
+        data = super().clean()
+        rows, columns = self.shape
+        values = []
+        for row in range(1, rows + 1):
+            values.append([])
+            for column in range(1, columns + 1):
+                name = cell_name(row, column)
+                value = data.get(name, '')
+                values[-1].append(value)
+                if value:
+                    try:
+                        encode_arrow(value)
+                    except ValueError as e:
+                        self.add_error(name, str(e))
+        sheet = data.get('scoringsheet')
+        if sheet is not None and not self.errors:
+            # A new sheet keeps the cells that still fit
+            self.instance.scoringsheet = sheet
+            self.instance.set_rows([row[:sheet.columns] for row in values[:sheet.rows]])
+        return data
+
+@lru_cache
+def grid_form(rows, columns):
+    """GridAdminForm with a field per cell of a rows x columns sheet."""
+    cells = {
+        cell_name(row, column): forms.CharField(
+            required=False,
+            max_length=2,
+            label=str(column),
+            widget=forms.TextInput(attrs={'size': 2}),
+        )
+        for row in range(1, rows + 1)
+        for column in range(1, columns + 1)
+    }
+    return type(f"GridAdminForm{rows}x{columns}", (GridAdminForm,), {'shape': (rows, columns), **cells})
+
+@admin.register(Grid)
+class GridAdmin(admin.ModelAdmin):
+    list_display = ('__str__', 'scoringsheet', 'total', 'modified_at')
+    list_select_related = ('scoringsheet',)
+    list_per_page = 20
+
+    @admin.display(description="Total")
+    def total(self, obj):
+        return obj.totals()[0]
+
+    def get_shape(self, request, obj=None):
+        """Shape of the grid, or of the sheet in ?scoringsheet= when adding one."""
+        if obj is not None:
+            return obj.shape
+        try:
+            sheet = ScoringSheet.objects.filter(pk=request.GET.get('scoringsheet')).first()
+        except ValidationError:
+            sheet = None
+        return (sheet.rows, sheet.columns) if sheet else (0, 0)
+
+    def get_form(self, request, obj=None, **kwargs):
+        kwargs['form'] = grid_form(*self.get_shape(request, obj))
+        return super().get_form(request, obj, **kwargs)
 
-from .models import Grid_10x3, Grid_5x5
-
-@admin.register(Grid_10x3)
-class Grid_10x3Admin(admin.ModelAdmin):
-    fieldsets = (
-        ('Serie 1', {
-            'fields': (('x1y1', 'x2y1', 'x3y1'),),
-        }),
-        ('Serie 2', {
-            'fields': (('x1y2', 'x2y2', 'x3y2'),),
-        }),
-        ('Serie 3', {
-            'fields': (('x1y3', 'x2y3', 'x3y3'),),
-        }),
-        ('Serie 4', {
-            'fields': (('x1y4', 'x2y4', 'x3y4'),),
-        }),
-        ('Serie 5', {
-            'fields': (('x1y5', 'x2y5', 'x3y5'),),
-        }),
-        ('Serie 6', {
-            'fields': (('x1y6', 'x2y6', 'x3y6'),),
-        }),
-        ('Serie 7', {
-            'fields': (('x1y7', 'x2y7', 'x3y7'),),
-        }),
-        ('Serie 8', {
-            'fields': (('x1y8', 'x2y8', 'x3y8'),),
-        }),
-        ('Serie 9', {
-            'fields': (('x1y9', 'x2y9', 'x3y9'),),
-        }),
-        ('Serie 10', {
-            'fields': (('x1y10', 'x2y10', 'x3y10'),),
-        }),
-    )
+    def get_fieldsets(self, request, obj=None):
+        rows, columns = self.get_shape(request, obj)
+        return [
+            (None, {'fields': ('name', 'scoringsheet')}),
+        ] + [
+            (f"Serie {row}", {'fields': (tuple(cell_name(row, column) for column in range(1, columns + 1)),)})
+            for row in range(1, rows + 1)
+        ]
@@ -0,0 +1,42 @@
+# Generated by Django 5.2.18 on 2026-10-18 09:40
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('grid', '0001_initial'),
+        ('modeling', '0006_time_ordered_primary_keys'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Grid',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(blank=True, default='', help_text='format: not required, max-64', max_length=64, verbose_name='Name')),
+                ('cells', models.BinaryField(default=bytes, help_text='format: one byte per cell, row by row', max_length=400, verbose_name='Cells')),
+                ('created_at', models.DateTimeField(default=django.utils.timezone.now, editable=False)),
+                ('modified_at', models.DateTimeField(auto_now=True)),
+                ('scoringsheet', models.ForeignKey(help_text='format: required, sets the rows and columns', on_delete=django.db.models.deletion.PROTECT, related_name='grids', to='modeling.scoringsheet', verbose_name='Scoring sheet')),
+            ],
+            options={
+                'verbose_name': 'Grid',
+                'verbose_name_plural': 'Grids',
+                'db_table': 'grids',
+                'ordering': ['-created_at'],
+            },
+        ),
+        migrations.DeleteModel(
+            name='BaseCell',
+        ),
+        migrations.DeleteModel(
+            name='Grid_10x3',
+        ),
+        migrations.DeleteModel(
+            name='Grid_5x5',
+        ),
+    ]
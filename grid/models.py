@@ -1,95 +1,83 @@
 from django.db import models
+from django.utils import timezone
+from django.utils.translation import gettext_lazy as _
 
-class BaseCell(models.Model):
-    value = models.PositiveIntegerField(default=0, blank=False, null=False)
+from modeling.models import ScoringSheet
+from modeling.scoring import encode_arrow, summarize
 
-class Grid_10x3(models.Model):
+# Byte of a cell without an arrow; arrows are 0-11, see modeling.scoring
+CELL_EMPTY = 0xFF
+
+class Grid(models.Model):
+    """
+    A scoresheet of any shape. The shape comes from the ScoringSheet, the
+    cells are one byte each, row by row, in a single column, so a whole
+    sheet is read or written as one row.
+    """
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
 
-    # Serie 1
-    x1y1 = BaseCell()
-    x2y1 = BaseCell()
-    x3y1 = BaseCell()
-    # Serie 2
-    x1y2 = BaseCell()
-    x2y2 = BaseCell()
-    x3y2 = models.PositiveIntegerField()
-    # Serie 3
-    x1y3 = BaseCell()
-    x2y3 = BaseCell()
-    x3y3 = BaseCell()
-    # Serie 4
-    x1y4 = BaseCell()
-    x2y4 = BaseCell()
-    x3y4 = BaseCell()
-    # Serie 5
-    x1y5 = BaseCell()
-    x2y5 = BaseCell()
-    x3y5 = BaseCell()
-    # Serie 6
-    x1y6 = BaseCell()
-    x2y6 = BaseCell()
-    x3y6 = BaseCell()
-    # Serie 7
-    x1y7 = BaseCell()
-    x2y7 = BaseCell()
-    x3y7 = BaseCell()
-    # Serie 8
-    x1y8 = BaseCell()
-    x2y8 = BaseCell()
-    x3y8 = BaseCell()
-    # Serie 9
-    x1y9 = BaseCell()
-    x2y9 = BaseCell()
-    x3y9 = BaseCell()
-    # Serie 10
-    x1y10 = BaseCell()
-    x2y10 = BaseCell()
-    x3y10 = BaseCell()
+    name = models.CharField(
+        max_length=64,
+        blank=True,
+        default='',
+        verbose_name=_("Name"),
+        help_text=_("format: not required, max-64"),
+    )
+    scoringsheet = models.ForeignKey(
+        ScoringSheet,
+        on_delete=models.PROTECT,
+        related_name='grids',
+        verbose_name=_("Scoring sheet"),
+        help_text=_("format: required, sets the rows and columns"),
+    )
+    cells = models.BinaryField(
+        max_length=400,
+        default=bytes,
+        verbose_name=_("Cells"),
+        help_text=_("format: one byte per cell, row by row"),
+    )
+    created_at = models.DateTimeField(default=timezone.now, editable=False)
+    modified_at = models.DateTimeField(auto_now=True)
 
     class Meta:
-        db_table = "grid_10x3"
-        verbose_name = "10x3 Grid"
-        verbose_name_plural = "10x3 Grids"
+        db_table = "grids"
+        ordering = ['-created_at']
+        verbose_name = "Grid"
+        verbose_name_plural = "Grids"
 
-class Grid_5x5(models.Model):
-    def __init__(self, *args, **kwargs):
-        super().__init__(*args, **kwargs)
-        
-    # Serie 1
-    x1y1 = BaseCell()
-    x2y1 = BaseCell()
-    x3y1 = BaseCell()
-    x4y1 = BaseCell()
-    x5y1 = BaseCell()
-    # Serie 2
-    x1y2 = BaseCell()
-    x2y2 = BaseCell()
-    x3y2 = BaseCell()
-    x4y2 = BaseCell()
-    x5y2 = BaseCell()
-    # Serie 3
-    x1y3 = BaseCell()
-    x2y3 = BaseCell()
-    x3y3 = BaseCell()
-    x4y3 = BaseCell()
-    x5y3 = BaseCell()
-    # Serie 4
-    x1y4 = BaseCell()
-    x2y4 = BaseCell()
-    x3y4 = BaseCell()
-    x4y4 = BaseCell()
-    x5y4 = BaseCell()
-    # Serie 5
-    x1y5 = BaseCell()
-    x2y5 = BaseCell()
-    x3y5 = BaseCell()
-    x4y5 = BaseCell()
-    x5y5 = BaseCell()
+    def __str__(self):
+        return self.name or f"Grid {self.pk}"
 
-    class Meta:
-        db_table = "grid_5x5"
-        verbose_name = "5x5 Grid"
-        verbose_name_plural = "5x5 Grids"
+    def __unicode__(self):
+        return self.name or f"Grid {self.pk}"
+
+    @property
+    def shape(self):
+        return self.scoringsheet.rows, self.scoringsheet.columns
+
+    def get_rows(self):
+        """Arrow codes row by row, None for an empty cell."""
+        rows, columns = self.shape
+        cells = bytes(self.cells or b'').ljust(rows * columns, bytes([CELL_EMPTY]))
+        return [
+            [None if code == CELL_EMPTY else code for code in cells[row * columns:(row + 1) * columns]]
+            for row in range(rows)
+        ]
+
+    def set_rows(self, values):
+        """Replace every cell; ``values`` are rows of arrows as accepted by
+        encode_arrow, None or '' for an empty cell."""
+        rows, columns = self.shape
+        if len(values) > rows or any(len(row) > columns for row in values):
+            raise ValueError(f"More than {rows} rows of {columns} arrows")
+        cells = bytearray([CELL_EMPTY]) * (rows * columns)
+        for row, arrows in enumerate(values):
+            for column, value in enumerate(arrows):
+                if value not in (None, ''):
+                    cells[row * columns + column] = encode_arrow(value)
+        self.cells = bytes(cells)
 
+    def totals(self):
+        """(total, tens, xs) of the filled cells."""
+        return summarize([code for row in self.get_rows() for code in row if code is not None])
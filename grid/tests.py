@@ -1,3 +1,39 @@
-from django.test import TestCase
+from modeling.models import ScoringSheet
+from modeling.tests import ModelingTestCase
 
-# Create your tests here.
+from .models import CELL_EMPTY, Grid
+
+
+class GridTests(ModelingTestCase):
+
+    def test_cells_are_one_packed_column(self):
+        grid = Grid(scoringsheet=self.sheet)
+        grid.set_rows([['X', 10, 'M'], [], ['9']])
+        grid.save()
+        grid = Grid.objects.get(pk=grid.pk)
+        self.assertEqual(len(grid.cells), 30)
+        self.assertEqual(grid.get_rows()[:3], [[11, 10, 0], [None, None, None], [9, None, None]])
+        self.assertEqual(grid.totals(), (29, 2, 1))
+        with self.assertRaises(ValueError):
+            grid.set_rows([['X', 'X', 'X', 'X']])
+
+    def test_admin_form_follows_the_sheet(self):
+        self.client.force_login(self.user)
+        sheet = ScoringSheet.objects.create(name="Field", columns=4, rows=3)
+        response = self.client.get(f'/django-admin/grid/grid/add/?scoringsheet={sheet.pk}')
+        self.assertContains(response, 'name="x4y3"')
+        self.assertNotContains(response, 'name="x1y4"')
+
+        response = self.client.post(f'/django-admin/grid/grid/add/?scoringsheet={sheet.pk}', {
+            'name': "Practice", 'scoringsheet': sheet.pk, 'x1y1': 'X', 'x2y1': '9', 'x4y3': 'm',
+        })
+        self.assertEqual(response.status_code, 302)
+        grid = Grid.objects.get(name="Practice")
+        self.assertEqual(bytes(grid.cells), bytes([11, 9, CELL_EMPTY] + [CELL_EMPTY] * 8 + [0]))
+
+        response = self.client.post(f'/django-admin/grid/grid/{grid.pk}/change/', {
+            'name': "Practice", 'scoringsheet': sheet.pk, 'x1y1': '12',
+        })
+        self.assertContains(response, "Invalid arrow value")
+        self.assertContains(self.client.get(f'/django-admin/grid/grid/{grid.pk}/change/'), 'value="X"')
+        self.assertEqual(self.client.get('/django-admin/grid/grid/').status_code, 200)
@@ -0,0 +1,77 @@
+"""
+Gunicorn configuration of the production server, read from the working
+directory by a bare ``gunicorn``.
+
+    gunicorn                          # WSGI, threaded workers
+    SERVER_PROFILE=asgi gunicorn      # ASGI, uvicorn workers for the live streams
+
+The live leaderboard streams (/api/rounds/<id>/stream/) are only served
+by the ASGI profile; the WSGI profile answers them with 501.
+
+Every value can be overridden on the command line or with an environment
+variable:
+
+* WEB_CONCURRENCY: worker processes, default 2 x CPUs + 1 (WSGI) or one
+  per CPU (ASGI, every worker serves many connections on its event loop)
+  with REDIS_URL set, otherwise 1: the workers share the results cache and
+  the live broker through Redis. The system checks run before the server
+  starts and refuse several workers with per-process backends;
+* GUNICORN_THREADS: threads per WSGI worker, default 4;
+* GUNICORN_KEEPALIVE: seconds an idle client connection is kept open,
+  default 5; set it above the idle timeout of a load balancer in front;
+* PORT: default 8000.
+
+The application is imported once in the master (preload) and the workers
+are forked from it, sharing its memory and starting without the import
+time. Connections the master opened while loading are closed in every
+worker after the fork, so no two processes share a database socket.
+"""
+import multiprocessing
+import os
+
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "scoring.settings.production")
+
+profile = os.environ.get("SERVER_PROFILE", "wsgi")
+cpus = multiprocessing.cpu_count()
+shared_backends = bool(os.environ.get("REDIS_URL"))
+
+bind = f"0.0.0.0:{os.environ.get('PORT', '8000')}"
+preload_app = True
+keepalive = int(os.environ.get("GUNICORN_KEEPALIVE", 5))
+timeout = 30
+graceful_timeout = 30
+# Recycle workers now and then, spread out so they do not restart together
+max_requests = 2000
+max_requests_jitter = 200
+accesslog = "-"
+
+if profile == "asgi":
+    wsgi_app = "scoring.asgi:application"
+    worker_class = "uvicorn_worker.UvicornWorker"
+    workers = int(os.environ.get("WEB_CONCURRENCY", cpus if shared_backends else 1))
+    # Django closes connections around every request under ASGI, persistent
+    # connections would leak; use DATABASE_POOL_MAX_SIZE on PostgreSQL instead
+    os.environ.setdefault("DATABASE_CONN_MAX_AGE", "0")
+else:
+    wsgi_app = "scoring.wsgi:application"
+    worker_class = "gthread"
+    workers = int(os.environ.get("WEB_CONCURRENCY", cpus * 2 + 1 if shared_backends else 1))
+    threads = int(os.environ.get("GUNICORN_THREADS", 4))
+
+# Read by the settings, which the preloaded application imports next
+os.environ["SERVER_WORKERS"] = str(workers)
+
+
+def when_ready(server):
+    # gunicorn does not run the system checks, manage.py commands do
+    from django.core.management import call_command
+
+    call_command("check")
+
+
+def post_fork(server, worker):
+    from django.core.cache import caches
+    from django.db import connections
+
+    connections.close_all()
+    caches.close_all()
@@ -1,6 +1,15 @@
+import codecs
+
 from django.conf import settings
-from django.contrib import admin
+from django.contrib import admin, messages
 from django import forms
+from django.core.exceptions import PermissionDenied
+from django.db import transaction
+from django.db.models import Q
+from django.http import HttpResponseRedirect
+from django.template.loader import render_to_string
+from django.template.response import TemplateResponse
+from django.urls import path, reverse
 from .models import (
     Archer,
     AgeGroup,
@@ -9,9 +18,14 @@ from .models import (
     Club,
     ClubMembership,
     Competition,
+    CompetitionLeaderboardEntry,
     CompetitionMembership,
     Discipline,
     DisciplineMembership,
+    End,
+    LeaderboardEntry,
+    Match,
+    PersonalBest,
     Round,
     RoundMembership,
     TargetFaceNameChoice,
@@ -20,13 +34,24 @@ from .models import (
     TeamMembership,
     Score,
     ScoringSheet,
+    search_archers,
 )
 
-from wagtail.snippets.views.snippets import SnippetViewSet, SnippetViewSetGroup
-from wagtail.snippets.models import register_snippet
+from . import brackets, exports, imports, leaderboard, personal_bests
+from .scoring import format_arrows, parse_arrows
+
+from wagtail.snippets.views.snippets import InspectView, SnippetViewSet, SnippetViewSetGroup
 from wagtail.admin.ui.tables import BooleanColumn
 from wagtail.admin.panels import MultiFieldPanel, FieldPanel, FieldRowPanel
 
+def set_active(queryset, is_active, refresh):
+    """Update is_active of the selected rows, then ``refresh(ids)`` what the
+    leaderboards derive from them: update() sends no post_save signals."""
+    with transaction.atomic():
+        ids = list(queryset.values_list('pk', flat=True))
+        queryset.model.objects.filter(pk__in=ids).update(is_active=is_active)
+        refresh(ids)
+
 @admin.action(description="Activate selected Archers")
 def activate_archers(modeladmin, request, queryset):
     queryset.update(is_active=True)
@@ -35,6 +60,12 @@ def activate_archers(modeladmin, request, queryset):
 def deactivate_archers(modeladmin, request, queryset):
     queryset.update(is_active=False)
 
+class ArcherImportForm(forms.Form):
+    file = forms.FileField(
+        label="CSV file",
+        help_text="format: UTF-8, comma or semicolon separated, with a header line",
+    )
+
 @admin.register(Archer)
 class ArcherAdmin(admin.ModelAdmin):
     actions=[activate_archers, deactivate_archers]
@@ -60,8 +91,56 @@ class ArcherAdmin(admin.ModelAdmin):
             'classes': ['collapse'],
             'fields': ('is_active',),
         }),
+        ('Personal Bests', {
+            'fields': ('personal_bests',),
+        }),
     )
-    search_fields = ('last_name', 'first_name', 'info')
+    readonly_fields = ('personal_bests',)
+    # Searched by search_archers, which the name indexes serve
+    search_fields = ('last_name', 'first_name',)
+
+    @admin.display(description="Personal bests")
+    def personal_bests(self, obj):
+        if obj.pk is None:
+            return "-"
+        return render_to_string('modeling/personal_bests.html', {
+            'personal_bests': personal_bests.for_archer(obj),
+        })
+
+    def get_search_results(self, request, queryset, search_term):
+        # Every word is a name prefix or a union number
+        for term in search_term.split():
+            queryset = queryset.filter(pk__in=search_archers(term).values('pk'))
+        return queryset, False
+
+    def get_urls(self):
+        return [
+            path('import/', self.admin_site.admin_view(self.import_view), name='modeling_archer_import'),
+        ] + super().get_urls()
+
+    def import_view(self, request):
+        if not (self.has_add_permission(request) and self.has_change_permission(request)):
+            raise PermissionDenied
+        form = ArcherImportForm(request.POST or None, request.FILES or None)
+        result = None
+        if request.method == 'POST' and form.is_valid():
+            # Decoded line by line, the upload is never read into memory as a whole
+            lines = codecs.iterdecode(form.cleaned_data['file'], 'utf-8-sig')
+            try:
+                result = imports.import_archers(lines, author=request.user)
+            except (UnicodeDecodeError, imports.ImportFileError) as e:
+                form.add_error('file', str(e))
+            else:
+                self.message_user(request, str(result), messages.WARNING if result.errors else messages.SUCCESS)
+        context = {
+            **self.admin_site.each_context(request),
+            'opts': self.model._meta,
+            'title': "Import Archers",
+            'form': form,
+            'result': result,
+            'errors': result.errors[:100] if result else [],
+        }
+        return TemplateResponse(request, 'admin/modeling/archer/import_archers.html', context)
 
 @admin.action(description="Activate selected Age Groups")
 def activate_agegroups(modeladmin, request, queryset):
@@ -109,10 +188,14 @@ def deactivate_clubs(modeladmin, request, queryset):
 
 class ClubMembershipInline(admin.TabularInline):
     model = ClubMembership
+    autocomplete_fields = ('archer',)
     extra = 1
     fields = ('archer', 'start_date', 'end_date')
     can_delete = True
     show_change_link = True
+
+    def get_queryset(self, request):
+        return super().get_queryset(request).select_related('archer', 'club')
     
 @admin.register(Club)
 class ClubAdmin(admin.ModelAdmin):
@@ -165,6 +248,8 @@ def deactivate_clubmemberships(modeladmin, request, queryset):
 @admin.register(ClubMembership)
 class ClubMembershipAdmin(admin.ModelAdmin):
     actions=[activate_clubmemberships, deactivate_clubmemberships]
+    autocomplete_fields = ('archer',)
+    list_select_related = ('archer', 'club',)
     list_display = ('archer', 'club', 'start_date', 'end_date', 'is_active')
     list_editable = ('is_active',)
     list_filter = ('is_active', 'archer',)
@@ -189,7 +274,7 @@ class ClubMembershipAdmin(admin.ModelAdmin):
             'fields': ('is_active',),
         }),
     )
-    search_fields = ('archer__last_name', 'club__name')
+    search_fields = ('^archer__last_name', 'club__name')
 
 @admin.action(description="Activate selected Categories")
 def activate_categories(modeladmin, request, queryset):
@@ -201,11 +286,15 @@ def deactivate_categories(modeladmin, request, queryset):
 
 class CategoryMembershipInline(admin.TabularInline):
     model = CategoryMembership
+    autocomplete_fields = ('archer',)
     extra = 1
     fields = ('category', 'archer', 'agegroup')
     can_delete = True
     show_change_link = True
 
+    def get_queryset(self, request):
+        return super().get_queryset(request).select_related('category', 'archer')
+
 @admin.register(Category)
 class CategoryAdmin(admin.ModelAdmin):
     actions=[activate_categories, deactivate_categories]
@@ -247,6 +336,8 @@ def deactivate_category_memberships(modeladmin, request, queryset):
 @admin.register(CategoryMembership)
 class CategoryMembershipAdmin(admin.ModelAdmin):
     actions=[activate_category_memberships, deactivate_category_memberships]
+    autocomplete_fields = ('archer',)
+    list_select_related = ('category', 'archer', 'agegroup',)
     list_display = ('category', 'archer', 'agegroup', 'is_active',)
     list_editable = ('is_active',)
     list_filter = ('is_active', 'archer',)
@@ -271,7 +362,7 @@ class CategoryMembershipAdmin(admin.ModelAdmin):
             'fields': ('is_active',),
         }),
     )
-    search_fields = ('category__name', 'archer__name')
+    search_fields = ('category__name', '^archer__last_name')
 
 @admin.action(description="Activate selected Disciplines")
 def activate_disciplines(modeladmin, request, queryset):
@@ -283,10 +374,14 @@ def deactivate_disciplines(modeladmin, request, queryset):
 
 class DisciplineMembershipInline(admin.TabularInline):
     model = DisciplineMembership
+    autocomplete_fields = ('archer',)
     extra = 1
     fields = ('discipline', 'archer',)
     can_delete = True
     show_change_link = True
+
+    def get_queryset(self, request):
+        return super().get_queryset(request).select_related('discipline', 'archer')
     
 @admin.register(Discipline)
 class DisciplineAdmin(admin.ModelAdmin):
@@ -329,6 +424,8 @@ def deactivate_discipline_memberships(modeladmin, request, queryset):
 @admin.register(DisciplineMembership)
 class DisciplineMembershipAdmin(admin.ModelAdmin):
     actions=[activate_discipline_memberships, deactivate_discipline_memberships]
+    autocomplete_fields = ('archer',)
+    list_select_related = ('discipline', 'archer',)
     list_display = ('discipline', 'archer', 'is_active',)
     list_editable = ('is_active',)
     list_filter = ('discipline', 'archer', 'is_active',)
@@ -352,7 +449,7 @@ class DisciplineMembershipAdmin(admin.ModelAdmin):
             'fields': ('is_active',),
         }),
     )
-    search_fields = ('discipline__name', 'archer__last_name',)
+    search_fields = ('discipline__name', '^archer__last_name',)
     
 @admin.action(description="Activate selected Teams")
 def activate_teams(modeladmin, request, queryset):
@@ -365,11 +462,15 @@ def deactivate_teams(modeladmin, request, queryset):
 
 class TeamMembershipInline(admin.TabularInline):
     model = TeamMembership
+    autocomplete_fields = ('archer',)
     extra = 1
     fields = ('team', 'archer',)
     can_delete = True
     show_change_link = True
 
+    def get_queryset(self, request):
+        return super().get_queryset(request).select_related('team', 'archer')
+
 @admin.register(Team)
 class TeamAdmin(admin.ModelAdmin):
     actions=[activate_teams, deactivate_teams]
@@ -408,6 +509,8 @@ def deactivate_team_memberships(modeladmin, request, queryset):
 @admin.register(TeamMembership)
 class TeamMembershipAdmin(admin.ModelAdmin):
     actions=[activate_team_memberships, deactivate_team_memberships]
+    autocomplete_fields = ('archer',)
+    list_select_related = ('team', 'archer',)
     list_display = ('team', 'archer', 'is_active',)
     list_editable = ('is_active',)
     list_filter = ('is_active',)
@@ -427,7 +530,7 @@ class TeamMembershipAdmin(admin.ModelAdmin):
             'fields': ('is_active',),
         }),
     )
-    search_fields = ('team__name', 'archer__name')
+    search_fields = ('team__name', '^archer__last_name')
 
 @admin.action(description="Activate selected Scoring Sheets")
 def activate_scoring_sheets(modeladmin, request, queryset):
@@ -440,7 +543,7 @@ def deactivate_scoring_sheets(modeladmin, request, queryset):
 @admin.register(ScoringSheet)
 class ScoringSheetAdmin(admin.ModelAdmin):
     actions=[activate_scoring_sheets, deactivate_scoring_sheets]
-    list_display = ('name', 'columns', 'rows', 'is_active',)
+    list_display = ('name', 'columns', 'rows', 'distance', 'is_active',)
     list_editable = ('is_active',)
     list_filter = ('is_active',)
     list_display_links = ('name',)
@@ -448,7 +551,7 @@ class ScoringSheetAdmin(admin.ModelAdmin):
     ordering = ('name',)
     fieldsets = (
         (None, {
-            'fields': ('name', 'columns', 'rows', 'info',)
+            'fields': ('name', 'columns', 'rows', 'distance', 'info',)
         }),
         ('Extra Information', {
             'classes': ['collapse'],
@@ -578,27 +681,43 @@ def activate_selected_rounds(modeladmin, request, queryset):
 def deactivate_selected_rounds(modeladmin, request, queryset):
     queryset.update(is_active=False)
 
-# TODO: Scores_for_selected_rounds
 @admin.action(description="Scores for selected Rounds")
 def scores_for_selected_rounds(modeladmin, request, queryset):
-    # for obj in queryset:
-    #     print(obj.id)
-    round_memberships = RoundMembership.objects.all()
-    print(round_memberships)
+    for round in queryset:
+        leaderboard.rebuild_round(round)
+    ids = ','.join(str(pk) for pk in queryset.values_list('pk', flat=True))
+    url = reverse('admin:modeling_leaderboardentry_changelist')
+    return HttpResponseRedirect(f"{url}?round__id__in={ids}")
+
+@admin.action(description="Export results of selected Rounds (CSV)")
+def export_rounds_csv(modeladmin, request, queryset):
+    header, rows = exports.round_results(queryset)
+    return exports.csv_response(header, rows, exports.export_filename('round-results', 'csv'))
+
+@admin.action(description="Export results of selected Rounds (XLSX)")
+def export_rounds_xlsx(modeladmin, request, queryset):
+    header, rows = exports.round_results(queryset)
+    return exports.xlsx_response(header, rows, exports.export_filename('round-results', 'xlsx'))
 
 class RoundMembershipInline(admin.TabularInline):
     model = RoundMembership
+    autocomplete_fields = ('archer',)
     extra=1
-    fields = ('archer',)
+    fields = ('archer', 'discipline', 'category',)
     can_delete = True
     show_change_link = False
 
+    def get_queryset(self, request):
+        return super().get_queryset(request).select_related('round', 'archer')
+
 @admin.register(Round)
 class RoundAdmin(admin.ModelAdmin):
     actions = [
         activate_selected_rounds, 
         deactivate_selected_rounds,
         scores_for_selected_rounds,
+        export_rounds_csv,
+        export_rounds_xlsx,
     ]
     inlines = [
         RoundMembershipInline,
@@ -614,7 +733,7 @@ class RoundAdmin(admin.ModelAdmin):
     search_fields = ('name', 'info',)
     fieldsets = (
         (None, {
-            'fields': ('name', 'start_date', 'start_time', 'end_date', 'end_time', 'info',)
+            'fields': ('name', 'scoringsheet', 'targetface', 'start_date', 'start_time', 'end_date', 'end_time', 'info',)
         }),
         ('Extra Information', {
             'classes': ['collapse'],
@@ -628,15 +747,17 @@ class RoundAdmin(admin.ModelAdmin):
 
 @admin.action(description="Activate selected Round Memberships")
 def activate_round_memberships(modeladmin, request, queryset):
-    queryset.update(is_active=True)
+    set_active(queryset, True, leaderboard.refresh_round_entries)
 
 @admin.action(description="Deactivate selected Round Memberships")
 def deactivate_round_memberships(modeladmin, request, queryset):
-    queryset.update(is_active=False)
+    set_active(queryset, False, leaderboard.refresh_round_entries)
 
 @admin.register(RoundMembership)
 class RoundMembershipAdmin(admin.ModelAdmin):
     actions=[activate_round_memberships, deactivate_round_memberships]
+    autocomplete_fields = ('round', 'archer',)
+    list_select_related = ('round', 'archer',)
     list_display = ('round', 'archer', 'is_active',)
     list_editable = ('is_active',)
     list_filter = ('is_active',)
@@ -645,7 +766,7 @@ class RoundMembershipAdmin(admin.ModelAdmin):
     ordering = ('round', 'archer',)
     fieldsets = (
         (None, {
-            'fields': ('round', 'archer', 'info',)
+            'fields': ('round', 'archer', 'discipline', 'category', 'info',)
         }),
         ('Extra Information', {
             'classes': ['collapse'],
@@ -656,10 +777,81 @@ class RoundMembershipAdmin(admin.ModelAdmin):
             'fields': ('is_active',),
         }),
     )
-    search_fields = ('round__name', 'archer__name')
+    # Searched by search_archers and the round name
+    search_fields = ('archer__last_name', 'archer__first_name', 'round__name')
+
+    def get_queryset(self, request):
+        # The autocomplete of Score.round_archer renders archer and round of every result
+        return super().get_queryset(request).select_related('round', 'archer')
+
+    def get_search_results(self, request, queryset, search_term):
+        # Every word is a prefix of the archer's name, their union number or part of the round name
+        for term in search_term.split():
+            queryset = queryset.filter(
+                Q(archer__in=search_archers(term).values('pk'))
+                | Q(round__in=Round.objects.filter(name__icontains=term).values('pk'))
+            )
+        return queryset, False
+
+class EndAdminForm(forms.ModelForm):
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        if self.instance.pk:
+            self.fields['arrow_values'].initial = format_arrows(self.instance.arrows)
+
+    class Meta:
+        model = End
+        fields = ('number',)
+
+    arrow_values = forms.CharField(
+        label="Arrows",
+        max_length=80,
+        help_text="format: e.g. X 10 9, M for a miss",
+    )
+
+    def clean_arrow_values(self):
+        try:
+            return parse_arrows(self.cleaned_data['arrow_values'])
+        except ValueError as e:
+            raise forms.ValidationError(str(e))
+
+    def clean(self):
+        data = super().clean()
+        if 'arrow_values' in data:
+            self.instance.arrows = data['arrow_values']
+        return data
+
+class EndInline(admin.TabularInline):
+    model = End
+    form = EndAdminForm
+    extra = 1
+    fields = ('number', 'arrow_values', 'total', 'tens', 'xs',)
+    readonly_fields = ('total', 'tens', 'xs',)
+    can_delete = True
+    show_change_link = False
+
+def refresh_scores(score_ids):
+    leaderboard.refresh_round_entries(
+        Score.objects.filter(pk__in=score_ids).values_list('round_archer_id', flat=True)
+    )
+
+@admin.action(description="Activate selected Scores")
+def activate_scores(modeladmin, request, queryset):
+    set_active(queryset, True, refresh_scores)
+
+@admin.action(description="Deactivate selected Scores")
+def deactivate_scores(modeladmin, request, queryset):
+    set_active(queryset, False, refresh_scores)
 
 @admin.register(Score)
 class ScoreAdmin(admin.ModelAdmin):
+    actions=[activate_scores, deactivate_scores]
+    inlines = [
+        EndInline,
+    ]
+    autocomplete_fields = ('round_archer',)
+
     def round_name(self, obj):
         if obj.round_archer:
             return obj.round_archer.round.name
@@ -675,11 +867,15 @@ class ScoreAdmin(admin.ModelAdmin):
     list_display = (
         'archer_name',
         'score', 
+        'tens',
+        'xs',
         'round_name',
         'is_active',
     )
+    list_select_related = ('round_archer__round', 'round_archer__archer',)
     # list_display_links = ('score',)
-    list_editable = ('score',)
+    # Not list_editable: the totals of a Score with ends are the sum of its ends
+    readonly_fields = ('tens', 'xs',)
     list_per_page = 20
     list_filter = ('is_active', 'round_archer__round',)
     fieldsets = (
@@ -688,6 +884,8 @@ class ScoreAdmin(admin.ModelAdmin):
                 'round_archer',
                 'score',
                 'number_of_arrows',
+                'tens',
+                'xs',
             )
         }),
         ('Extra Information', {
@@ -699,6 +897,19 @@ class ScoreAdmin(admin.ModelAdmin):
         }),
     )
 
+    def get_readonly_fields(self, request, obj=None):
+        # Typed in by hand only until the first end is entered. Asked for
+        # several times per request, so the answer is kept on the object.
+        if obj is not None and not hasattr(obj, '_has_ends'):
+            obj._has_ends = obj.ends.exists()
+        if obj is not None and obj._has_ends:
+            return self.readonly_fields + ('score', 'number_of_arrows')
+        return self.readonly_fields
+
+    def save_related(self, request, form, formsets, change):
+        super().save_related(request, form, formsets, change)
+        form.instance.refresh_totals()
+
 @admin.action(description="Activate selected Competitions")
 def activate_competitions(modeladmin, request, queryset):
     queryset.update(is_active=True)
@@ -707,18 +918,54 @@ def activate_competitions(modeladmin, request, queryset):
 def deactivate_competitions(modeladmin, request, queryset):
     queryset.update(is_active=False)
 
+@admin.action(description="Scores for selected Competitions")
+def scores_for_selected_competitions(modeladmin, request, queryset):
+    for competition in queryset:
+        leaderboard.rebuild_competition(competition)
+    ids = ','.join(str(pk) for pk in queryset.values_list('pk', flat=True))
+    url = reverse('admin:modeling_competitionleaderboardentry_changelist')
+    return HttpResponseRedirect(f"{url}?competition__id__in={ids}")
+
+@admin.action(description="Create brackets of selected Competitions from their leaderboards")
+def create_competition_brackets(modeladmin, request, queryset):
+    for competition in queryset:
+        try:
+            matches = brackets.create_bracket(competition)
+        except brackets.BracketError as e:
+            modeladmin.message_user(request, f"{competition}: {e}", messages.ERROR)
+        else:
+            modeladmin.message_user(request, f"{competition}: {len(matches)} matches created.", messages.SUCCESS)
+
+@admin.action(description="Export results of selected Competitions (CSV)")
+def export_competitions_csv(modeladmin, request, queryset):
+    header, rows = exports.competition_results(queryset)
+    return exports.csv_response(header, rows, exports.export_filename('competition-results', 'csv'))
+
+@admin.action(description="Export results of selected Competitions (XLSX)")
+def export_competitions_xlsx(modeladmin, request, queryset):
+    header, rows = exports.competition_results(queryset)
+    return exports.xlsx_response(header, rows, exports.export_filename('competition-results', 'xlsx'))
+
 class CompetitionMembershipInline(admin.TabularInline):
     model = CompetitionMembership
+    autocomplete_fields = ('round',)
     extra = 1
     fields = ('competition', 'round',)
     can_delete = True
     show_change_link = True
 
+    def get_queryset(self, request):
+        return super().get_queryset(request).select_related('competition', 'round')
+
 @admin.register(Competition)
 class CompetitionAdmin(admin.ModelAdmin):
     actions=[
         activate_competitions, 
-        deactivate_competitions
+        deactivate_competitions,
+        scores_for_selected_competitions,
+        create_competition_brackets,
+        export_competitions_csv,
+        export_competitions_xlsx,
     ]
     inlines = [
         CompetitionMembershipInline
@@ -746,17 +993,24 @@ class CompetitionAdmin(admin.ModelAdmin):
         }),
     )
 
+def refresh_competition_memberships(membership_ids):
+    leaderboard.refresh_competitions(
+        CompetitionMembership.objects.filter(pk__in=membership_ids).values_list('competition_id', flat=True)
+    )
+
 @admin.action(description="Activate selected Competition Memberships")
 def activate_competition_memberships(modeladmin, request, queryset):
-    queryset.update(is_active=True)
+    set_active(queryset, True, refresh_competition_memberships)
 
 @admin.action(description="Deactivate selected Competition Memberships")
 def deactivate_competition_memberships(modeladmin, request, queryset):
-    queryset.update(is_active=False)
+    set_active(queryset, False, refresh_competition_memberships)
 
 @admin.register(CompetitionMembership)
 class CompetitionMembershipAdmin(admin.ModelAdmin):
     actions=[activate_competition_memberships, deactivate_competition_memberships]
+    autocomplete_fields = ('round',)
+    list_select_related = ('competition', 'round',)
     list_display = ('competition', 'round', 'is_active',)
     list_editable = ('is_active',)
     list_filter = ('is_active',)
@@ -776,12 +1030,122 @@ class CompetitionMembershipAdmin(admin.ModelAdmin):
             'fields': ('is_active',),
         }),
     )
-    search_fields = ('round__name', 'round__name')
+    search_fields = ('competition__name', 'round__name')
+
+class LeaderboardEntryAdminMixin:
+    list_display = ('archer', 'total', 'tens', 'xs', 'arrows',)
+    list_display_links = None
+    list_per_page = 20
+    ordering = leaderboard.RANKING
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+    def has_delete_permission(self, request, obj=None):
+        return False
+
+@admin.register(LeaderboardEntry)
+class LeaderboardEntryAdmin(LeaderboardEntryAdminMixin, admin.ModelAdmin):
+    list_display = ('round',) + LeaderboardEntryAdminMixin.list_display
+    list_select_related = ('round', 'archer',)
+    list_filter = ('round',)
+    ordering = ('round',) + leaderboard.RANKING
+
+@admin.register(CompetitionLeaderboardEntry)
+class CompetitionLeaderboardEntryAdmin(LeaderboardEntryAdminMixin, admin.ModelAdmin):
+    list_display = ('competition',) + LeaderboardEntryAdminMixin.list_display
+    list_select_related = ('competition', 'archer',)
+    list_filter = ('competition',)
+    ordering = ('competition',) + leaderboard.RANKING
+
+@admin.register(PersonalBest)
+class PersonalBestAdmin(LeaderboardEntryAdminMixin, admin.ModelAdmin):
+    list_display = ('archer', 'scoringsheet', 'targetface', 'discipline', 'category', 'season', 'total', 'tens', 'xs', 'round',)
+    list_select_related = ('archer', 'scoringsheet', 'targetface', 'discipline', 'category', 'round',)
+    list_filter = ('season', 'scoringsheet', 'discipline', 'category',)
+    ordering = ('scoringsheet', 'season') + leaderboard.RANKING
+    search_fields = ('^archer__last_name', '^archer__first_name',)
+
+class MatchAdminForm(forms.ModelForm):
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        if self.instance.pk:
+            self.fields['set_values'].initial = brackets.format_sets(self.instance.sets)
+
+    class Meta:
+        model = Match
+        fields = ('shoot_off',)
+
+    set_values = forms.CharField(
+        label="Sets",
+        max_length=60,
+        required=False,
+        help_text="format: set totals of archer A and B, e.g. 28-27 29-29 27-28",
+    )
+
+    def clean_set_values(self):
+        try:
+            return brackets.parse_sets(self.cleaned_data['set_values'])
+        except brackets.BracketError as e:
+            raise forms.ValidationError(str(e))
+
+    def clean(self):
+        data = super().clean()
+        if 'set_values' in data:
+            if data['set_values'] and (self.instance.archer_a_id is None or self.instance.archer_b_id is None):
+                raise forms.ValidationError("Both archers of a match must be known before its result.")
+            self.instance.sets = data['set_values']
+            try:
+                brackets.decide(self.instance)
+            except brackets.BracketError as e:
+                raise forms.ValidationError(str(e))
+        return data
+
+
+@admin.register(Match)
+class MatchAdmin(admin.ModelAdmin):
+    form = MatchAdminForm
+    list_display = ('competition', 'stage', 'archer_a', 'set_points_a', 'set_points_b', 'archer_b', 'winner',)
+    list_select_related = ('competition', 'archer_a', 'archer_b', 'winner',)
+    list_filter = ('competition',)
+    list_per_page = 20
+    ordering = ('competition', 'slot',)
+    readonly_fields = ('competition', 'stage', 'archer_a', 'seed_a', 'archer_b', 'seed_b', 'set_points_a', 'set_points_b', 'winner',)
+    fieldsets = (
+        (None, {
+            'fields': ('competition', 'stage', ('archer_a', 'seed_a'), ('archer_b', 'seed_b'), 'set_values', 'shoot_off',)
+        }),
+        ('Result', {
+            'fields': (('set_points_a', 'set_points_b'), 'winner',),
+        }),
+    )
+    search_fields = ('^archer_a__last_name', '^archer_b__last_name',)
+
+    def has_add_permission(self, request):
+        # Matches are created with their bracket, see the Competition actions
+        return False
+
+    def save_model(self, request, obj, form, change):
+        if obj.archer_a_id is not None and obj.archer_b_id is not None:
+            brackets.record_match(obj, obj.sets, obj.shoot_off)
+        else:
+            super().save_model(request, obj, form, change)
 
 # TODO: Continue here in admin
 
 # Wagtail Snippets
 
+class ArcherInspectView(InspectView):
+
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        context['personal_bests'] = personal_bests.for_archer(self.object)
+        return context
+
 class ArcherSnippetViewSet(SnippetViewSet):
     model = Archer
     icon = "arrow-right-full"
@@ -792,6 +1156,8 @@ class ArcherSnippetViewSet(SnippetViewSet):
     list_display = ('last_name', 'first_name', 'middle_name', 'union_number', BooleanColumn('is_active'),)
     list_filter = ('is_active',)
     inspect_view_enabled = True
+    inspect_view_class = ArcherInspectView
+    inspect_template_name = 'modeling/archer_inspect.html'
     copy_view_enabled = True
     history_view_enabled = True
     deletete_view_enabled=False
@@ -916,6 +1282,9 @@ class ClubMembershipSnippetViewSet(SnippetViewSet):
     inspect_view_enabled = True
     copy_view_enabled = True
 
+    def get_queryset(self, request):
+        return self.model._default_manager.select_related('archer', 'club')
+
     panels = [
         FieldPanel('club'),
         FieldPanel('archer'),
@@ -990,6 +1359,9 @@ class CategoryMembershipSnippetViewSet(SnippetViewSet):
     inspect_view_enabled = True
     copy_view_enabled = True
 
+    def get_queryset(self, request):
+        return self.model._default_manager.select_related('category', 'archer', 'agegroup')
+
     panels = [
         FieldPanel('category'),
         FieldPanel('archer'),
@@ -1057,6 +1429,9 @@ class TeamMembershipSnippetViewSet(SnippetViewSet):
     inspect_view_enabled = True
     copy_view_enabled = True
 
+    def get_queryset(self, request):
+        return self.model._default_manager.select_related('team', 'archer')
+
     panels = [
         FieldPanel('team'),
         FieldPanel('archer'),
@@ -1085,7 +1460,7 @@ class ScoringSheetSnippetViewSet(SnippetViewSet):
     menu_order = 90
     add_to_settings_menu = False
     add_to_admin_menu = False
-    list_display = ('name', 'columns', 'rows', BooleanColumn('is_active'),)
+    list_display = ('name', 'columns', 'rows', 'distance', BooleanColumn('is_active'),)
     list_filter = ('is_active',)
     inspect_view_enabled = True
     copy_view_enabled = True
@@ -1096,6 +1471,7 @@ class ScoringSheetSnippetViewSet(SnippetViewSet):
             FieldPanel('columns'),
             FieldPanel('rows'),            
         ]),
+        FieldPanel('distance'),
         FieldPanel('info'),
         MultiFieldPanel(
             [
@@ -1173,6 +1549,9 @@ class DisciplineMembershipSnippetViewSet(SnippetViewSet):
     inspect_view_enabled = True
     copy_view_enabled = True
 
+    def get_queryset(self, request):
+        return self.model._default_manager.select_related('discipline', 'archer')
+
     panels = [
         FieldPanel('discipline'),
         FieldPanel('archer'),
@@ -1213,4 +1592,3 @@ class ModelingSnippetViewSetGroup(SnippetViewSetGroup):
         TeamSnippetViewSet,
         TeamMembershipSnippetViewSet,
     )
-register_snippet(ModelingSnippetViewSetGroup)    
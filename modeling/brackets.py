@@ -0,0 +1,247 @@
+"""
+Head-to-head elimination brackets of a Competition.
+
+A bracket of N places, a power of two up to 64 for a 1/32 round, is stored
+as a binary heap of Match rows. The final is slot 1 and the match at slot k
+is fed by the winners of slot 2k (archer A) and slot 2k + 1 (archer B), so
+the first round holds the slots N/2 to N - 1. The losers of the semifinals
+meet in the bronze medal match at slot 0.
+
+Archers are seeded from the qualification ranking, the competition
+leaderboard, in the usual order 1 v N, N/2 v N/2 + 1, ... so that the top
+seeds can only meet in the late rounds. A place without an archer is a
+bye and its opponent goes through.
+
+Matches use the set system: a won set scores 2 set points and a tied set
+1 for both; the first archer at 6 set points wins, and at 5-5 after five
+sets a single arrow shoot-off decides. Recording a result only reads and
+writes the path from that match up to the final: the winner moves up one
+slot, and where that replaces an archer, the results that depended on the
+previous archer are cleared further up.
+
+After commit, ``bracket_changed`` is sent with the id of the competition.
+"""
+from django.db import transaction
+from django.dispatch import Signal
+
+from . import leaderboard
+from .models import Match
+
+BRACKET_SIZES = (2, 4, 8, 16, 32, 64)
+BRONZE = 0
+MAX_SETS = 5
+MAX_SET_TOTAL = 30
+SET_POINTS_TO_WIN = 6
+
+RESULT_FIELDS = ('archer_a', 'archer_b', 'seed_a', 'seed_b', 'sets', 'shoot_off', 'set_points_a', 'set_points_b', 'winner')
+
+# sender is Match, kwargs: competition_id
+bracket_changed = Signal()
+
+
+class BracketError(ValueError):
+    """A bracket or a match result that the rules do not allow."""
+
+
+def _send_changed(competition_id):
+    transaction.on_commit(lambda: bracket_changed.send(sender=Match, competition_id=competition_id))
+
+
+def seed_order(size):
+    """Seeds in the order of the bracket lines, two lines per first round match."""
+    order = [1]
+    while len(order) < size:
+        lines = len(order) * 2
+        order = [line for seed in order for line in (seed, lines + 1 - seed)]
+    return order
+
+
+def bracket_size(archers):
+    for size in BRACKET_SIZES:
+        if archers <= size:
+            return size
+    return BRACKET_SIZES[-1]
+
+
+def pack_sets(sets):
+    values = []
+    for number, (total_a, total_b) in enumerate(sets, start=1):
+        for total in (total_a, total_b):
+            if not 0 <= int(total) <= MAX_SET_TOTAL:
+                raise BracketError(f"Set {number}: a set total is 0 to {MAX_SET_TOTAL}.")
+        values += [int(total_a), int(total_b)]
+    return bytes(values)
+
+
+def unpack_sets(data):
+    data = bytes(data or b'')
+    return list(zip(data[::2], data[1::2]))
+
+
+def parse_sets(text):
+    """Parse set totals such as '28-27 29-29 27-28'."""
+    sets = []
+    for item in text.replace(',', ' ').split():
+        try:
+            total_a, total_b = (int(value) for value in item.replace(':', '-').split('-'))
+        except ValueError:
+            raise BracketError(f"Invalid set {item!r}, expected e.g. 28-27.")
+        sets.append((total_a, total_b))
+    return pack_sets(sets)
+
+
+def format_sets(data):
+    return ' '.join(f"{total_a}-{total_b}" for total_a, total_b in unpack_sets(data))
+
+
+def side_of(match, archer_id):
+    if archer_id is None:
+        return None
+    return 'a' if archer_id == match.archer_a_id else 'b'
+
+
+def decide(match):
+    """Set the set points and the winner of ``match`` from its sets and shoot-off."""
+    sets = unpack_sets(match.sets)
+    if len(sets) > MAX_SETS:
+        raise BracketError(f"A match has at most {MAX_SETS} sets.")
+    points_a = points_b = 0
+    for number, (total_a, total_b) in enumerate(sets, start=1):
+        if max(points_a, points_b) >= SET_POINTS_TO_WIN:
+            raise BracketError(f"Set {number} was shot after the match was decided.")
+        points_a += 2 if total_a > total_b else 1 if total_a == total_b else 0
+        points_b += 2 if total_b > total_a else 1 if total_a == total_b else 0
+
+    tied = len(sets) == MAX_SETS and points_a == points_b
+    if match.shoot_off and not tied:
+        raise BracketError("Only a match tied after five sets has a shoot-off.")
+    if match.shoot_off == 'a':
+        points_a += 1
+    elif match.shoot_off == 'b':
+        points_b += 1
+
+    match.set_points_a, match.set_points_b = points_a, points_b
+    if points_a >= SET_POINTS_TO_WIN:
+        match.winner_id = match.archer_a_id
+    elif points_b >= SET_POINTS_TO_WIN:
+        match.winner_id = match.archer_b_id
+    else:
+        match.winner_id = None
+
+
+def _place(match, side, archer_id, seed):
+    """Put an archer on one side of ``match``, clearing a result shot by another archer."""
+    if getattr(match, f'archer_{side}_id') == archer_id:
+        return False
+    setattr(match, f'archer_{side}_id', archer_id)
+    setattr(match, f'seed_{side}', seed)
+    match.sets = b''
+    match.shoot_off = ''
+    match.set_points_a = match.set_points_b = 0
+    match.winner_id = None
+    return True
+
+
+def _advance(matches, match):
+    """Carry the winner of ``match`` towards the final through ``matches``, a dict by slot.
+
+    The losers of the semifinals go to the bronze medal match. Returns the matches that changed.
+    """
+    changed = []
+    while match.slot > 1:
+        winner = side_of(match, match.winner_id)
+        loser = {'a': 'b', 'b': 'a'}.get(winner)
+        side = 'a' if match.slot % 2 == 0 else 'b'
+        targets = [(match.slot // 2, winner)]
+        if match.slot in (2, 3) and BRONZE in matches:
+            targets.append((BRONZE, loser))
+        following = None
+        for slot, from_side in targets:
+            target = matches[slot]
+            archer_id = getattr(match, f'archer_{from_side}_id') if from_side else None
+            seed = getattr(match, f'seed_{from_side}') if from_side else None
+            if _place(target, side, archer_id, seed):
+                changed.append(target)
+                if slot != BRONZE:
+                    following = target
+        if following is None:
+            break
+        match = following
+    return changed
+
+
+@transaction.atomic
+def create_bracket(competition, size=None):
+    """Replace the bracket of ``competition`` with one seeded from its leaderboard.
+
+    ``size`` defaults to the smallest bracket for every ranked archer, up to 64.
+    """
+    ranking = list(
+        leaderboard.competition_leaderboard(competition)
+        .filter(archer__is_active=True)
+        .values_list('archer_id', flat=True)[:BRACKET_SIZES[-1]]
+    )
+    size = size or bracket_size(len(ranking))
+    if size not in BRACKET_SIZES:
+        raise BracketError(f"A bracket has {', '.join(map(str, BRACKET_SIZES))} places.")
+    if len(ranking) <= size // 2:
+        raise BracketError(f"A bracket of {size} needs more than {size // 2} ranked archers.")
+    seeded = ranking[:size]
+
+    matches = {slot: Match(competition=competition, slot=slot) for slot in range(1, size)}
+    if size >= 4:
+        matches[BRONZE] = Match(competition=competition, slot=BRONZE)
+    lines = seed_order(size)
+    for index in range(size // 2):
+        match = matches[size // 2 + index]
+        for side, seed in zip('ab', lines[2 * index:2 * index + 2]):
+            if seed <= len(seeded):
+                setattr(match, f'archer_{side}_id', seeded[seed - 1])
+                setattr(match, f'seed_{side}', seed)
+        if match.archer_b_id is None:
+            # A bye, the better seed is always on side A
+            match.winner_id = match.archer_a_id
+            _advance(matches, match)
+
+    Match.objects.filter(competition=competition).delete()
+    Match.objects.bulk_create(matches.values())
+    _send_changed(competition.pk)
+    return sorted(matches.values(), key=lambda match: match.slot)
+
+
+@transaction.atomic
+def record_match(match, sets, shoot_off=''):
+    """Record the set totals of ``match``, (A, B) per set, and advance its winner.
+
+    ``sets`` may also be packed, see pack_sets. Returns the other matches that changed.
+    """
+    if match.archer_a_id is None or match.archer_b_id is None:
+        raise BracketError("Both archers of a match must be known before its result.")
+    match.sets = sets if isinstance(sets, bytes) else pack_sets(sets)
+    match.shoot_off = shoot_off
+    decide(match)
+
+    slots, slot = [BRONZE], match.slot // 2
+    while slot:
+        slots.append(slot)
+        slot //= 2
+    path = {
+        other.slot: other
+        for other in Match.objects.filter(competition_id=match.competition_id, slot__in=slots).order_by()
+    }
+    changed = _advance(path, match)
+    match.save()
+    if changed:
+        Match.objects.bulk_update(changed, RESULT_FIELDS)
+    _send_changed(match.competition_id)
+    return changed
+
+
+def bracket(competition):
+    """Matches of ``competition`` with their archers, by slot."""
+    return (
+        Match.objects
+        .filter(competition=competition)
+        .select_related('archer_a', 'archer_b', 'winner')
+        .order_by('slot')
+    )
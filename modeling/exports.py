@@ -0,0 +1,115 @@
+"""
+Results exports of Rounds and Competitions.
+
+Score rows are read with .iterator() in chunks, joined to the round, the
+archer and the archer's club in the same query, and written out as they
+arrive, so exporting a whole season keeps memory flat. The query runs on
+the read replica when there is one. CSV is streamed to
+the client while the query runs. An XLSX file is a zip archive that cannot
+be sent before it is complete, so openpyxl's write-only workbook spools it
+to a temporary file first; that file is then streamed.
+"""
+import csv
+import tempfile
+
+from django.db.models import OuterRef, Subquery
+from django.http import FileResponse, StreamingHttpResponse
+from django.utils import timezone
+from django.utils.http import content_disposition_header
+
+from utils.db_utils import read_alias
+
+from .models import ClubMembership, Score
+
+CHUNK_SIZE = 2000
+XLSX_CONTENT_TYPE = 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
+
+ROUND_COLUMNS = (
+    ('Round', 'round_archer__round__name'),
+    ('Date', 'round_archer__round__start_date'),
+    ('Last name', 'round_archer__archer__last_name'),
+    ('First name', 'round_archer__archer__first_name'),
+    ('Union number', 'round_archer__archer__union_number'),
+    ('Club', 'club'),
+    ('Score', 'score'),
+    ('10s', 'tens'),
+    ('Xs', 'xs'),
+    ('Arrows', 'number_of_arrows'),
+)
+COMPETITION_COLUMNS = (
+    ('Competition', 'round_archer__round__competitionmembership_round__competition__name'),
+) + ROUND_COLUMNS
+RESULT_ORDER = ('round_archer__round__start_date', 'round_archer__round__name', '-score', '-tens', '-xs')
+
+
+def _results(scores, columns, order):
+    club = (
+        ClubMembership.objects
+        .filter(archer=OuterRef('round_archer__archer'), is_active=True)
+        .order_by('club__name')
+        .values('club__name')[:1]
+    )
+    return (
+        scores
+        .using(read_alias())
+        .filter(is_active=True, round_archer__is_active=True)
+        .annotate(club=Subquery(club))
+        .order_by(*order)
+        .values_list(*(field for _, field in columns))
+        .iterator(chunk_size=CHUNK_SIZE)
+    )
+
+
+def round_results(rounds):
+    """Header and result rows of the scores shot in ``rounds``."""
+    rows = _results(Score.objects.filter(round_archer__round__in=rounds), ROUND_COLUMNS, RESULT_ORDER)
+    return [header for header, _ in ROUND_COLUMNS], rows
+
+
+def competition_results(competitions):
+    """Header and result rows of the rounds of ``competitions``, one block per competition."""
+    scores = Score.objects.filter(
+        round_archer__round__competitionmembership_round__competition__in=competitions,
+        round_archer__round__competitionmembership_round__is_active=True,
+    )
+    order = (COMPETITION_COLUMNS[0][1],) + RESULT_ORDER
+    return [header for header, _ in COMPETITION_COLUMNS], _results(scores, COMPETITION_COLUMNS, order)
+
+
+def export_filename(name, extension):
+    return f"{name}-{timezone.localdate():%Y%m%d}.{extension}"
+
+
+class Echo:
+    """File-like object handing back what csv.writer writes to it."""
+
+    def write(self, value):
+        return value
+
+
+def csv_response(header, rows, filename):
+    writer = csv.writer(Echo())
+
+    def lines():
+        yield writer.writerow(header)
+        for row in rows:
+            yield writer.writerow(row)
+
+    response = StreamingHttpResponse(lines(), content_type='text/csv; charset=utf-8')
+    response['Content-Disposition'] = content_disposition_header(True, filename)
+    return response
+
+
+def xlsx_response(header, rows, filename):
+    # Only needed for this export, kept out of the import of the admin
+    from openpyxl import Workbook
+
+    workbook = Workbook(write_only=True)
+    sheet = workbook.create_sheet("Results")
+    sheet.append(header)
+    for row in rows:
+        sheet.append(row)
+    spool = tempfile.TemporaryFile()
+    workbook.save(spool)
+    spool.seek(0)
+    return FileResponse(spool, as_attachment=True, filename=filename, content_type=XLSX_CONTENT_TYPE)
@@ -0,0 +1,177 @@
+"""
+Handicaps and classifications from scores, Archery GB 2023 model.
+
+The model gives the expected score of one arrow for a handicap, a distance
+and a target face: the arrow lands around the centre with an angular
+spread that grows with the handicap and the distance. A face is a list of
+rings, so the expectation is a closed sum over the rings.
+
+For every distance and face the expected arrow score of each handicap on
+the scale is computed once and cached as a HandicapTable. A round of N
+arrows scores N times the arrow expectation, so one table serves every
+number of arrows. Converting a score is then a binary search in the table.
+"""
+import math
+from bisect import bisect_right
+from collections import namedtuple
+from functools import lru_cache
+
+from django.conf import settings
+
+from .models import LeaderboardEntry, TargetFaceNameChoice
+
+HANDICAPS = range(-75, 151)
+
+# Archery GB 2023 model constants
+ANGLE_0 = 5.0e-4
+STEP = 3.5
+DATUM = 6.0
+KD = 0.00365
+# Arrow diameters in cm, indoor arrows may be thicker
+ARROW_DIAMETER = {'Indoor': 0.93, 'Outdoor': 0.55}
+
+# Handicap an archer needs at most for each classification, best first;
+# a league sets its own ladder with the HANDICAP_CLASSIFICATIONS setting
+CLASSIFICATIONS = (
+    ("Elite Master Bowman", 16),
+    ("Grand Master Bowman", 23),
+    ("Master Bowman", 30),
+    ("Bowman 1st Class", 37),
+    ("Bowman 2nd Class", 44),
+    ("Bowman 3rd Class", 51),
+    ("Archer 1st Class", 58),
+    ("Archer 2nd Class", 65),
+    ("Archer 3rd Class", 72),
+)
+
+# rings: (outer radius in cm, points) from the centre outwards
+Face = namedtuple('Face', ['name', 'rings', 'arrow_radius'])
+HandicapResult = namedtuple('HandicapResult', ['archer_id', 'total', 'arrows', 'handicap', 'classification'])
+
+
+class HandicapError(ValueError):
+    """The round lacks what a handicap needs: a distance or a known target face."""
+
+
+def face_rings(diameter, discipline, keyfeature):
+    if keyfeature == '10-Zone':
+        return tuple((ring * diameter / 20, 11 - ring) for ring in range(1, 11))
+    if keyfeature == '6-Zone' and discipline == 'Field Archery':
+        return tuple((ring * diameter / 12, 7 - ring) for ring in range(1, 7))
+    if keyfeature == '6-Zone':
+        # The reduced target face, rings 10 down to 5
+        return tuple((ring * diameter / 20, 11 - ring) for ring in range(1, 7))
+    if keyfeature == '5-Zone':
+        return tuple((ring * diameter / 10, 11 - 2 * ring) for ring in range(1, 6))
+    raise HandicapError(f"No rings known for a {keyfeature} face.")
+
+
+def face_from_choice(choice):
+    """The Face of a TargetFaceNameChoice, e.g. Indoor Target Archery 40 cm 10-Zone."""
+    diameter = float(choice.targetsize.split()[0])
+    return Face(
+        choice.name,
+        face_rings(diameter, choice.discipline, choice.keyfeature),
+        ARROW_DIAMETER.get(choice.environment, ARROW_DIAMETER['Outdoor']) / 2,
+    )
+
+
+def spread(handicap, distance):
+    """Standard deviation in cm of where the arrows land."""
+    angle = ANGLE_0 * (1 + STEP / 100) ** (handicap + DATUM) * math.exp(KD * distance)
+    return 100 * distance * angle
+
+
+def arrow_score(handicap, distance, face):
+    """Expected score of one arrow."""
+    sigma = spread(handicap, distance)
+    expected = 0.0
+    for index, (radius, points) in enumerate(face.rings):
+        outer_points = face.rings[index + 1][1] if index + 1 < len(face.rings) else 0
+        hit = 1 - math.exp(-((radius + face.arrow_radius) / sigma) ** 2)
+        expected += (points - outer_points) * hit
+    return expected
+
+
+def table_score(arrow_score, arrows):
+    return math.floor(arrows * arrow_score + 0.5)
+
+
+class HandicapTable:
+    """Expected arrow scores of every handicap for one distance and face."""
+
+    def __init__(self, distance, face):
+        self.distance = distance
+        self.face = face
+        self.max_points = face.rings[0][1]
+        # Worst handicap first, the scores go up
+        self.handicaps = list(reversed(HANDICAPS))
+        self.arrow_scores = [arrow_score(handicap, distance, face) for handicap in self.handicaps]
+
+    def score(self, handicap, arrows):
+        """Score of ``arrows`` arrows shot at ``handicap``, to the nearest point."""
+        return table_score(arrow_score(handicap, self.distance, self.face), arrows)
+
+    def handicap(self, score, arrows):
+        """Best handicap whose table score ``score`` reaches; None without arrows."""
+        if not arrows:
+            return None
+        position = bisect_right(self.arrow_scores, score, key=lambda value: table_score(value, arrows))
+        return self.handicaps[max(position - 1, 0)]
+
+    def allowance(self, handicap, arrows):
+        """Points added to a score of ``handicap`` in a handicap-adjusted ranking."""
+        return arrows * self.max_points - self.score(handicap, arrows)
+
+
+@lru_cache(maxsize=None)
+def handicap_table(distance, face):
+    return HandicapTable(distance, face)
+
+
+def classification(handicap):
+    if handicap is None:
+        return None
+    for name, limit in getattr(settings, 'HANDICAP_CLASSIFICATIONS', CLASSIFICATIONS):
+        if handicap <= limit:
+            return name
+    return None
+
+
+def round_table(round):
+    """HandicapTable of the distance of the scoring sheet and the target face of ``round``."""
+    sheet = round.scoringsheet
+    if sheet is None or sheet.distance is None:
+        raise HandicapError(f"{round} has no scoring sheet with a distance.")
+    if round.targetface_id is None:
+        raise HandicapError(f"{round} has no target face.")
+    choice = TargetFaceNameChoice.objects.filter(name=round.targetface.name).first()
+    if choice is None:
+        raise HandicapError(f"Target face {round.targetface.name} is not a known face.")
+    return handicap_table(sheet.distance, face_from_choice(choice))
+
+
+def round_handicaps(round):
+    """Handicap and classification of every result of ``round``, in ranking order."""
+    table = round_table(round)
+    results = []
+    for archer_id, total, arrows in (
+        LeaderboardEntry.objects.filter(round=round).values_list('archer_id', 'total', 'arrows')
+    ):
+        handicap = table.handicap(total, arrows)
+        results.append(HandicapResult(archer_id, total, arrows, handicap, classification(handicap)))
+    return results
+
+
+def adjusted_ranking(round, handicaps):
+    """Results of ``round`` as (adjusted total, entry), best first.
+
+    ``handicaps`` maps archer ids to the handicap the league gives them;
+    archers without one are not ranked.
+    """
+    table = round_table(round)
+    adjusted = [
+        (entry.total + table.allowance(handicaps[entry.archer_id], entry.arrows), entry)
+        for entry in LeaderboardEntry.objects.filter(round=round, archer_id__in=handicaps).select_related('archer')
+    ]
+    return sorted(adjusted, key=lambda item: (-item[0], -item[1].tens, -item[1].xs))
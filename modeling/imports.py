@@ -0,0 +1,463 @@
+"""
+Bulk imports of membership files and of result files.
+
+Archers and club memberships
+----------------------------
+
+The CSV file is read line by line and handled in batches of BATCH_SIZE
+rows. Every row is validated with the clean() of the model fields, and a
+batch is written in one transaction: Archer rows are upserted on
+union_number and ClubMembership rows on (club, archer), both with
+bulk_create(update_conflicts=True). Invalid rows are reported with their
+line number and skipped; the rest of the file is still imported. Rows that
+match the stored archer and membership are not written at all.
+
+Header names are matched without case, spaces or dashes. union_number,
+last_name and first_name are required. middle_name, email, phone,
+address, city, zip_code, province, birth_date (Y-m-d) and club (the name
+of an existing club) are optional. Existing archers only get the columns
+that are in the file updated.
+
+Scores
+------
+
+Result files of tournament software have a row per archer and round: the
+archer's union number (or bib, license, code), the round name, the score
+and optionally 10s, Xs and the number of arrows. Rounds, archers,
+memberships and scores are read into dictionaries up front, one query per
+table, and every row is resolved against those. The import then either
+only reports what would change (dry run) or writes the new memberships
+and scores with bulk_create, upserting the changed scores on their primary
+key, in one transaction for the whole file.
+"""
+import csv
+from itertools import chain, islice
+
+from django.core.exceptions import ValidationError
+from django.db import transaction
+from django.db.models import Exists, OuterRef
+
+from utils.slug_utils import given_slugs, suffixed_slug
+
+from . import leaderboard
+from .models import Archer, Club, ClubMembership, End, Round, RoundMembership, Score
+
+BATCH_SIZE = 2000
+REQUIRED_COLUMNS = ('union_number', 'last_name', 'first_name')
+ARCHER_COLUMNS = REQUIRED_COLUMNS + (
+    'middle_name', 'email', 'phone', 'address', 'city', 'zip_code', 'province', 'birth_date',
+)
+
+
+SCORE_REQUIRED_COLUMNS = ('union_number', 'round', 'score')
+SCORE_COLUMN_ALIASES = {
+    'bib': 'union_number',
+    'license': 'union_number',
+    'code': 'union_number',
+    'round_name': 'round',
+    'total': 'score',
+    '10': 'tens',
+    '10s': 'tens',
+    'x': 'xs',
+    'number_of_arrows': 'arrows',
+}
+
+
+class ImportFileError(ValueError):
+    """The file as a whole cannot be imported."""
+
+
+class ImportResult:
+
+    def __init__(self):
+        self.rows = 0
+        self.created = 0
+        self.updated = 0
+        self.unchanged = 0
+        self.memberships = 0
+        self.errors = []
+
+    def __str__(self):
+        return (
+            f"{self.rows} rows: {self.created} archers created, {self.updated} updated, "
+            f"{self.unchanged} unchanged, {self.memberships} club memberships added, "
+            f"{len(self.errors)} rows with errors"
+        )
+
+
+def _column(name, aliases):
+    name = name.strip().lower().replace(' ', '_').replace('-', '_')
+    return aliases.get(name, name)
+
+
+def read_rows(lines, required=REQUIRED_COLUMNS, aliases=None):
+    """Return the columns and an iterator of (line number, row) of CSV text ``lines``.
+
+    The delimiter (comma, semicolon or tab) is taken from the header line.
+    Header names found in ``aliases`` are renamed to the column they stand for.
+    """
+    lines = iter(lines)
+    header = next(lines, '')
+    if not header.strip():
+        raise ImportFileError("The file is empty.")
+    try:
+        dialect = csv.Sniffer().sniff(header, delimiters=',;\t')
+    except csv.Error:
+        dialect = csv.excel
+    reader = csv.reader(chain([header], lines), dialect)
+    columns = [_column(name, aliases or {}) for name in next(reader)]
+    missing = [name for name in required if name not in columns]
+    if missing:
+        raise ImportFileError(f"Missing column(s): {', '.join(missing)}.")
+
+    def rows():
+        for row in reader:
+            if any(value.strip() for value in row):
+                yield reader.line_num, dict(zip(columns, row))
+
+    return columns, rows()
+
+
+def _club_ids():
+    """Club ids by case folded name; a name used by several clubs maps to None."""
+    clubs = {}
+    for pk, name in Club.objects.values_list('pk', 'name'):
+        key = name.strip().casefold()
+        clubs[key] = None if key in clubs else pk
+    return clubs
+
+
+def _clean_row(row, columns, clubs):
+    """Return (archer values, club id) of ``row``, or raise ValidationError."""
+    values, errors = {}, []
+    for name in columns:
+        field = Archer._meta.get_field(name)
+        value = row.get(name, '').strip()
+        if not value and name not in REQUIRED_COLUMNS:
+            values[name] = None if field.null else value
+            continue
+        try:
+            values[name] = field.clean(value, None)
+        except ValidationError as e:
+            errors.append(f"{name}: {' '.join(e.messages)}")
+    club_id = None
+    club = row.get('club', '').strip()
+    if club:
+        key = club.casefold()
+        if key not in clubs:
+            errors.append(f"club: unknown club {club!r}.")
+        elif clubs[key] is None:
+            errors.append(f"club: more than one club is named {club!r}.")
+        else:
+            club_id = clubs[key]
+    if errors:
+        raise ValidationError(errors)
+    return values, club_id
+
+
+def _write_batch(batch, fields, author, result):
+    """Upsert the archers of ``batch`` and their club memberships.
+
+    Rows equal to what is stored already are left out of the write, so a
+    file imported again only costs the two reads.
+    """
+    with transaction.atomic():
+        numbers = [archer.union_number for archer, _ in batch]
+        stored = {
+            row[0]: row[1:] for row in
+            Archer.objects.filter(union_number__in=numbers).values_list('union_number', *fields)
+        }
+        archers = [
+            archer for archer, _ in batch
+            if stored.get(archer.union_number) != tuple(getattr(archer, name) for name in fields)
+        ]
+        members = set(
+            ClubMembership.objects
+            .filter(archer__union_number__in=numbers, is_active=True)
+            .values_list('club_id', 'archer__union_number')
+        )
+        joins = [
+            (archer, club_id) for archer, club_id in batch
+            if club_id and (club_id, archer.union_number) not in members
+        ]
+        with given_slugs(Archer):
+            Archer.objects.bulk_create(
+                archers,
+                update_conflicts=True,
+                unique_fields=['union_number'],
+                update_fields=[*fields, 'modified_at'],
+            )
+        # Upserted rows keep their own primary key, so read the ids back
+        archer_ids = dict(
+            Archer.objects
+            .filter(union_number__in=[archer.union_number for archer, _ in joins])
+            .values_list('union_number', 'pk')
+        )
+        with given_slugs(ClubMembership):
+            ClubMembership.objects.bulk_create(
+                [
+                    ClubMembership(
+                        club_id=club_id,
+                        archer_id=archer_ids[archer.union_number],
+                        slug=suffixed_slug('club-member', suffix=f"{archer.union_number}-{str(club_id)[:8]}"),
+                        **author,
+                    )
+                    for archer, club_id in joins
+                ],
+                update_conflicts=True,
+                unique_fields=['club', 'archer'],
+                update_fields=['is_active', 'modified_at'],
+            )
+    created = sum(1 for archer in archers if archer.union_number not in stored)
+    result.created += created
+    result.updated += len(archers) - created
+    result.unchanged += len(batch) - len(archers)
+    result.memberships += len(joins)
+
+
+def import_archers(lines, author=None, batch_size=BATCH_SIZE):
+    """Import the archers of CSV text ``lines``; returns an ImportResult."""
+    columns, rows = read_rows(lines)
+    archer_columns = [name for name in ARCHER_COLUMNS if name in columns]
+    fields = [name for name in archer_columns if name != 'union_number']
+    author = {'author': author} if author is not None else {}
+    clubs = _club_ids() if 'club' in columns else {}
+    result = ImportResult()
+    seen = {}
+    while chunk := list(islice(rows, batch_size)):
+        batch = []
+        for line, row in chunk:
+            result.rows += 1
+            try:
+                values, club_id = _clean_row(row, archer_columns, clubs)
+            except ValidationError as e:
+                result.errors.append((line, ' '.join(e.messages)))
+                continue
+            number = values['union_number']
+            if number in seen:
+                result.errors.append((line, f"union_number: {number} is already on line {seen[number]}."))
+                continue
+            seen[number] = line
+            archer = Archer(**values, **author)
+            archer.slug = suffixed_slug(archer.last_name, suffix=number)
+            batch.append((archer, club_id))
+        if batch:
+            _write_batch(batch, fields, author, result)
+    return result
+
+
+def _batches(values, size=BATCH_SIZE):
+    values = iter(values)
+    while batch := list(islice(values, size)):
+        yield batch
+
+
+class ScoreChange:
+    """A row of a result file resolved against the stored scores."""
+
+    NEW = '+'
+    CHANGED = '~'
+    UNCHANGED = '='
+
+    def __init__(self, line, round, archer, totals, kind, old=None):
+        self.line = line
+        self.round = round
+        self.archer = archer
+        self.totals = totals
+        self.kind = kind
+        self.old = old
+
+    def __str__(self):
+        totals = "{}/{}/{} in {} arrows".format(*self.totals)
+        if self.old is not None and self.kind == self.CHANGED:
+            totals = "{}/{}/{} -> {}".format(*self.old[:3], totals)
+        return f"{self.kind} line {self.line}: {self.round[1]} - {self.archer[1]}: {totals}"
+
+
+class ScoreImportResult:
+
+    def __init__(self, dry_run):
+        self.dry_run = dry_run
+        self.rows = 0
+        self.changes = []
+        self.memberships = 0
+        self.errors = []
+
+    def count(self, kind):
+        return sum(1 for change in self.changes if change.kind == kind)
+
+    def __str__(self):
+        text = (
+            f"{self.rows} rows: {self.count(ScoreChange.NEW)} new scores "
+            f"({self.memberships} new round memberships), {self.count(ScoreChange.CHANGED)} changed, "
+            f"{self.count(ScoreChange.UNCHANGED)} unchanged, {len(self.errors)} rows with errors"
+        )
+        return f"{text}, dry run: nothing written" if self.dry_run else text
+
+
+def _round_lookup():
+    """(id, name, arrows of its scoring sheet) of every round, by case folded name."""
+    return {
+        name.casefold(): (pk, name, (rows or 0) * (columns or 0))
+        for pk, name, rows, columns in
+        Round.objects.values_list('pk', 'name', 'scoringsheet__rows', 'scoringsheet__columns')
+    }
+
+
+def _archer_lookup(numbers):
+    """(id, name) of the archers with the given union numbers, by union number."""
+    archers = {}
+    for batch in _batches(sorted(numbers)):
+        for number, pk, last_name, first_name in (
+            Archer.objects.filter(union_number__in=batch)
+            .values_list('union_number', 'pk', 'last_name', 'first_name')
+        ):
+            archers[number] = (pk, f"{last_name} {first_name} ({number})")
+    return archers
+
+
+def _parse_score_row(row, round_name, rounds, archers):
+    """Return (round, archer, totals) of ``row``, or raise ValidationError."""
+    errors = []
+    name = round_name or row.get('round', '').strip()
+    round = rounds.get(name.casefold())
+    if round is None:
+        errors.append(f"round: unknown round {name!r}.")
+    number = row.get('union_number', '').strip()
+    archer = archers.get(int(number)) if number.isdigit() else None
+    if archer is None:
+        errors.append(f"union_number: no archer with union number {number!r}.")
+    values = {}
+    for column in ('score', 'tens', 'xs', 'arrows'):
+        value = row.get(column, '').strip()
+        if not value and column != 'score':
+            values[column] = None
+        elif value.isdigit():
+            values[column] = int(value)
+        else:
+            errors.append(f"{column}: {value!r} is not a whole number.")
+    if not errors:
+        tens, xs = values['tens'] or 0, values['xs'] or 0
+        arrows = values['arrows'] if values['arrows'] is not None else round[2]
+        if xs > tens:
+            errors.append("xs: more Xs than 10s.")
+        if arrows and values['score'] > 10 * arrows:
+            errors.append(f"score: more than 10 points for each of the {arrows} arrows.")
+    if errors:
+        raise ValidationError(errors)
+    return round, archer, (values['score'], tens, xs, arrows)
+
+
+def import_scores(lines, round_name=None, author=None, dry_run=False):
+    """Import the scores of result file ``lines``; returns a ScoreImportResult.
+
+    With ``round_name`` every row is a score of that round and the file
+    needs no round column. A stored score is only overwritten when it is
+    the single active score of the archer in the round and has no ends.
+    """
+    required = [name for name in SCORE_REQUIRED_COLUMNS if not (name == 'round' and round_name)]
+    _, rows = read_rows(lines, required, SCORE_COLUMN_ALIASES)
+    rows = list(rows)
+    result = ScoreImportResult(dry_run)
+    result.rows = len(rows)
+
+    rounds = _round_lookup()
+    archers = _archer_lookup({
+        int(row['union_number']) for _, row in rows if row.get('union_number', '').strip().isdigit()
+    })
+    parsed, seen = [], {}
+    for line, row in rows:
+        try:
+            round, archer, totals = _parse_score_row(row, round_name, rounds, archers)
+        except ValidationError as e:
+            result.errors.append((line, ' '.join(e.messages)))
+            continue
+        key = (round[0], archer[0])
+        if key in seen:
+            result.errors.append((line, f"{archer[1]} is already in {round[1]} on line {seen[key]}."))
+            continue
+        seen[key] = line
+        parsed.append((line, round, archer, totals))
+
+    round_ids = {round[0] for _, round, _, _ in parsed}
+    memberships = {}
+    for batch in _batches({archer[0] for _, _, archer, _ in parsed}):
+        memberships.update(
+            ((round_id, archer_id), pk) for round_id, archer_id, pk in
+            RoundMembership.objects.filter(round_id__in=round_ids, archer_id__in=batch)
+            .values_list('round_id', 'archer_id', 'pk')
+            if (round_id, archer_id) in seen
+        )
+    stored = {}
+    for batch in _batches(memberships.values()):
+        for score in (
+            Score.objects.filter(round_archer_id__in=batch, is_active=True)
+            .annotate(has_ends=Exists(End.objects.filter(score=OuterRef('pk'))))
+        ):
+            stored.setdefault(score.round_archer_id, []).append(score)
+
+    new, changed = [], []
+    for line, round, archer, totals in parsed:
+        membership_id = memberships.get((round[0], archer[0]))
+        scores = stored.get(membership_id, [])
+        if not scores:
+            result.changes.append(ScoreChange(line, round, archer, totals, ScoreChange.NEW))
+            new.append((membership_id, round, archer, totals))
+            continue
+        if len(scores) > 1:
+            result.errors.append((
+                line, f"{archer[1]} has {len(scores)} scores in {round[1]}, none is overwritten.",
+            ))
+            continue
+        score = scores[0]
+        old = (score.score or 0, score.tens, score.xs, score.number_of_arrows)
+        if old == totals:
+            result.changes.append(ScoreChange(line, round, archer, totals, ScoreChange.UNCHANGED))
+        elif score.has_ends:
+            result.errors.append((
+                line, f"the score of {archer[1]} in {round[1]} is kept by its ends, it is not overwritten.",
+            ))
+        else:
+            result.changes.append(ScoreChange(line, round, archer, totals, ScoreChange.CHANGED, old))
+            score.score, score.tens, score.xs, score.number_of_arrows = totals
+            changed.append(score)
+    result.memberships = sum(1 for membership_id, _, _, _ in new if membership_id is None)
+    if not dry_run:
+        _write_scores(new, changed, {'author': author} if author is not None else {})
+    return result
+
+
+@transaction.atomic
+def _write_scores(new, changed, author):
+    created = [
+        RoundMembership(
+            round_id=round[0],
+            archer_id=archer[0],
+            slug=suffixed_slug('round-member', suffix=f"{str(round[0])[:8]}-{archer[0].hex[:8]}"),
+            **author,
+        )
+        for membership_id, round, archer, _ in new if membership_id is None
+    ]
+    with given_slugs(RoundMembership):
+        RoundMembership.objects.bulk_create(created)
+    membership_ids = {(membership.round_id, membership.archer_id): membership.pk for membership in created}
+    scores = [
+        Score(
+            round_archer_id=membership_id or membership_ids[round[0], archer[0]],
+            score=totals[0],
+            tens=totals[1],
+            xs=totals[2],
+            number_of_arrows=totals[3],
+            **author,
+        )
+        for membership_id, round, archer, totals in new
+    ]
+    # The changed scores are upserted on their primary key, bulk_update
+    # would build a CASE per field and row
+    Score.objects.bulk_create(
+        scores + changed,
+        update_conflicts=True,
+        unique_fields=['id'],
+        update_fields=['score', 'tens', 'xs', 'number_of_arrows', 'modified_at'],
+    )
+    leaderboard.refresh_round_entries([score.round_archer_id for score in scores + changed])
@@ -0,0 +1,252 @@
+"""
+Materialized leaderboards per Round and per Competition.
+
+LeaderboardEntry holds one row per RoundMembership with the summed totals
+of its active scores, CompetitionLeaderboardEntry rolls those rows up per
+archer over the rounds of a competition. Both are refreshed for the
+affected archers only, see modeling.signals, and so are the personal
+bests of those archers, see modeling.personal_bests.
+
+After commit, ``leaderboard_changed`` is sent with the changed and removed
+entries so that live displays can be pushed a delta.
+"""
+from django.db import transaction
+from django.dispatch import Signal
+from django.db.models import Sum, Value
+from django.db.models.functions import Coalesce
+
+from .models import (
+    RANKING,
+    CompetitionLeaderboardEntry,
+    CompetitionMembership,
+    LeaderboardEntry,
+    RoundMembership,
+    Score,
+)
+from . import personal_bests
+
+TOTAL_FIELDS = ('total', 'tens', 'xs', 'arrows')
+
+# sender is LeaderboardEntry or CompetitionLeaderboardEntry,
+# kwargs: changed (list of entries), removed (list of (parent id, archer id))
+leaderboard_changed = Signal()
+
+
+def _send_changed(sender, changed, removed):
+    if changed or removed:
+        transaction.on_commit(
+            lambda: leaderboard_changed.send(sender=sender, changed=changed, removed=removed)
+        )
+
+
+def _totals(queryset, *group_by):
+    return (
+        queryset
+        .values(*group_by)
+        .order_by()
+        .annotate(
+            sum_total=Coalesce(Sum('score'), Value(0)),
+            sum_tens=Coalesce(Sum('tens'), Value(0)),
+            sum_xs=Coalesce(Sum('xs'), Value(0)),
+            sum_arrows=Coalesce(Sum('number_of_arrows'), Value(0)),
+        )
+    )
+
+
+def _apply_totals(entry, row):
+    changed = False
+    for field in TOTAL_FIELDS:
+        value = row[f'sum_{field}'] if row else 0
+        if getattr(entry, field) != value:
+            setattr(entry, field, value)
+            changed = True
+    return changed
+
+
+@transaction.atomic
+def refresh_round_entries(membership_ids):
+    """Recompute the leaderboard rows of the given RoundMemberships.
+
+    Returns the ids of the entries that were created or changed.
+    """
+    membership_ids = set(membership_ids) - {None}
+    if not membership_ids:
+        return []
+
+    memberships = {
+        m['id']: m for m in RoundMembership.objects
+        .filter(id__in=membership_ids, is_active=True)
+        .values('id', 'round_id', 'archer_id')
+    }
+    totals = {
+        row['round_archer_id']: row for row in _totals(
+            Score.objects.filter(round_archer_id__in=memberships, is_active=True),
+            'round_archer_id',
+        )
+    }
+    existing = {
+        entry.round_archer_id: entry
+        for entry in LeaderboardEntry.objects.filter(round_archer_id__in=membership_ids)
+    }
+
+    to_create, to_update, to_delete = [], [], []
+    # Archers with a result removed or moved, their personal bests are recomputed
+    lost_archer_ids = set()
+    for membership_id in membership_ids:
+        membership = memberships.get(membership_id)
+        entry = existing.get(membership_id)
+        row = totals.get(membership_id)
+        if membership is None or row is None:
+            if entry is not None:
+                to_delete.append(entry.pk)
+                lost_archer_ids.add(entry.archer_id)
+            continue
+        if entry is None:
+            entry = LeaderboardEntry(
+                round_id=membership['round_id'],
+                round_archer_id=membership_id,
+                archer_id=membership['archer_id'],
+            )
+            _apply_totals(entry, row)
+            to_create.append(entry)
+        elif _apply_totals(entry, row) or entry.round_id != membership['round_id']:
+            if entry.round_id != membership['round_id']:
+                lost_archer_ids.add(entry.archer_id)
+            entry.round_id = membership['round_id']
+            entry.archer_id = membership['archer_id']
+            to_update.append(entry)
+
+    if to_delete:
+        LeaderboardEntry.objects.filter(pk__in=to_delete).delete()
+    # One upsert on the primary key instead of bulk_update's CASE per field and row
+    LeaderboardEntry.objects.bulk_create(
+        to_create + to_update,
+        update_conflicts=True,
+        unique_fields=['id'],
+        update_fields=['round', 'archer', *TOTAL_FIELDS, 'modified_at'],
+    )
+    _send_changed(
+        LeaderboardEntry,
+        to_create + to_update,
+        [(e.round_id, e.archer_id) for e in existing.values() if e.pk in to_delete],
+    )
+
+    affected = {
+        (m['round_id'], m['archer_id']) for m in memberships.values()
+    } | {
+        (entry.round_id, entry.archer_id) for entry in existing.values()
+    }
+    refresh_competition_entries(affected)
+    personal_bests.record_results([entry.pk for entry in to_create + to_update], lost_archer_ids)
+    return [entry.pk for entry in to_create + to_update]
+
+
+@transaction.atomic
+def refresh_competition_entries(round_archer_pairs):
+    """Recompute the competition rows of the given (round id, archer id) pairs."""
+    round_archer_pairs = set(round_archer_pairs)
+    if not round_archer_pairs:
+        return
+    round_ids = {round_id for round_id, _ in round_archer_pairs}
+    competition_ids = set(
+        CompetitionMembership.objects
+        .filter(round_id__in=round_ids, is_active=True)
+        .values_list('competition_id', flat=True)
+    )
+    if not competition_ids:
+        return
+    archer_ids = {archer_id for _, archer_id in round_archer_pairs}
+    _refresh_competitions(competition_ids, archer_ids)
+
+
+def _refresh_competitions(competition_ids, archer_ids=None):
+    entries = LeaderboardEntry.objects.filter(
+        round__competitionmembership_round__competition_id__in=competition_ids,
+        round__competitionmembership_round__is_active=True,
+    )
+    existing = CompetitionLeaderboardEntry.objects.filter(competition_id__in=competition_ids)
+    if archer_ids is not None:
+        entries = entries.filter(archer_id__in=archer_ids)
+        existing = existing.filter(archer_id__in=archer_ids)
+
+    totals = {
+        (row['round__competitionmembership_round__competition_id'], row['archer_id']): row
+        for row in entries
+        .values('round__competitionmembership_round__competition_id', 'archer_id')
+        .order_by()
+        .annotate(
+            sum_total=Sum('total'),
+            sum_tens=Sum('tens'),
+            sum_xs=Sum('xs'),
+            sum_arrows=Sum('arrows'),
+        )
+    }
+    existing = {(entry.competition_id, entry.archer_id): entry for entry in existing}
+
+    to_create, to_update = [], []
+    for key, row in totals.items():
+        entry = existing.pop(key, None)
+        if entry is None:
+            entry = CompetitionLeaderboardEntry(competition_id=key[0], archer_id=key[1])
+            _apply_totals(entry, row)
+            to_create.append(entry)
+        elif _apply_totals(entry, row):
+            to_update.append(entry)
+
+    if existing:
+        CompetitionLeaderboardEntry.objects.filter(pk__in=[e.pk for e in existing.values()]).delete()
+    CompetitionLeaderboardEntry.objects.bulk_create(to_create)
+    CompetitionLeaderboardEntry.objects.bulk_update(to_update, TOTAL_FIELDS)
+    _send_changed(CompetitionLeaderboardEntry, to_create + to_update, list(existing))
+
+
+@transaction.atomic
+def rebuild_round(round):
+    LeaderboardEntry.objects.filter(round=round).exclude(round_archer__round=round).delete()
+    refresh_round_entries(
+        list(RoundMembership.objects.filter(round=round).values_list('id', flat=True))
+    )
+
+
+@transaction.atomic
+def rebuild_competition(competition):
+    _refresh_competitions({competition.pk})
+
+
+@transaction.atomic
+def refresh_competitions(competition_ids):
+    """Recompute every row of the given competitions, e.g. after their rounds changed."""
+    competition_ids = set(competition_ids)
+    if competition_ids:
+        _refresh_competitions(competition_ids)
+
+
+def round_leaderboard(round, limit=None):
+    """Entries of a round in ranking order, read from the rank index."""
+    queryset = (
+        LeaderboardEntry.objects
+        .filter(round=round)
+        .select_related('archer')
+        .order_by(*RANKING)
+    )
+    return queryset[:limit] if limit else queryset
+
+
+def competition_leaderboard(competition, limit=None):
+    queryset = (
+        CompetitionLeaderboardEntry.objects
+        .filter(competition=competition)
+        .select_related('archer')
+        .order_by(*RANKING)
+    )
+    return queryset[:limit] if limit else queryset
+
+
+def ranked(entries):
+    """Yield (rank, entry) pairs; entries equal on every tie break share a rank."""
+    rank, previous = 0, None
+    for position, entry in enumerate(entries, start=1):
+        key = (entry.total, entry.tens, entry.xs)
+        if key != previous:
+            rank, previous = position, key
+        yield rank, entry
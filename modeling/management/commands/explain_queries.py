@@ -0,0 +1,148 @@
+"""
+Print query plans and timings of the hot lookup paths of the modeling app.
+
+    python manage.py explain_queries
+    python manage.py explain_queries --before 0004
+
+With --before the database is copied to a throwaway database first, the
+modeling migrations of the copy are unapplied down to the given migration
+and the queries are explained there, with the schema and default ordering
+of that state. The copy is dropped afterwards; the database itself is only
+read. SQLite is copied with VACUUM INTO, other databases are cloned the
+way the test runner clones test databases (CREATE DATABASE ... TEMPLATE on
+PostgreSQL, which needs the database to be otherwise unused).
+"""
+import os
+import tempfile
+import time
+import uuid
+from contextlib import contextmanager
+from datetime import date
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DEFAULT_DB_ALIAS, connections
+from django.db.migrations.executor import MigrationExecutor
+
+from modeling.models import (
+    CategoryMembership,
+    ClubMembership,
+    CompetitionMembership,
+    DisciplineMembership,
+    LeaderboardEntry,
+    Round,
+    RoundMembership,
+    Score,
+    TeamMembership,
+    search_archers,
+)
+
+
+def sample(queryset, *fields):
+    """Values of the first row, or random ids when the table is empty."""
+    row = queryset.values_list(*fields).first()
+    return row or tuple(uuid.uuid4() for _ in fields)
+
+
+def hot_queries(using):
+    round_id, archer_id = sample(RoundMembership.objects.using(using), 'round_id', 'archer_id')
+    membership_id, = sample(RoundMembership.objects.using(using), 'id')
+    club_id, = sample(ClubMembership.objects.using(using), 'club_id')
+    category_id, = sample(CategoryMembership.objects.using(using), 'category_id')
+    discipline_id, = sample(DisciplineMembership.objects.using(using), 'discipline_id')
+    team_id, = sample(TeamMembership.objects.using(using), 'team_id')
+    competition_id, = sample(CompetitionMembership.objects.using(using), 'competition_id')
+    return [
+        ("Archer search", search_archers('a')),
+        ("Archers of a club", ClubMembership.objects.filter(club_id=club_id).order_by('club_id', 'archer_id')),
+        ("Archers of a category", CategoryMembership.objects.filter(category_id=category_id)),
+        ("Archers of a discipline", DisciplineMembership.objects.filter(discipline_id=discipline_id)),
+        ("Archers of a team", TeamMembership.objects.filter(team_id=team_id)),
+        ("Archers of a round", RoundMembership.objects.filter(round_id=round_id)),
+        ("Membership of an archer in a round", RoundMembership.objects.filter(round_id=round_id, archer_id=archer_id)),
+        ("Rounds of a competition", CompetitionMembership.objects.filter(competition_id=competition_id)),
+        ("Active scores of a membership", Score.objects.filter(round_archer_id=membership_id, is_active=True)),
+        ("Upcoming rounds", Round.objects.filter(start_date__gte=date.today()).order_by('start_date')),
+        ("Round leaderboard", LeaderboardEntry.objects.filter(round_id=round_id)),
+    ]
+
+
+@contextmanager
+def throwaway_copy(using):
+    """Alias of a temporary copy of the ``using`` database, dropped on exit."""
+    connection = connections[using]
+    alias = f'{using}_explain_before'
+    if connection.vendor == 'sqlite':
+        if connection.in_atomic_block:
+            raise CommandError("--before cannot copy the database inside a transaction.")
+        handle, name = tempfile.mkstemp(suffix='.sqlite3')
+        os.close(handle)
+        try:
+            with connection.cursor() as cursor:
+                cursor.execute("VACUUM INTO %s", [name])
+        except Exception:
+            os.remove(name)
+            raise
+        settings_dict = {**connection.settings_dict, 'NAME': name}
+    else:
+        connection.creation.clone_test_db(suffix='explain_before', verbosity=0)
+        settings_dict = connection.creation.get_test_db_clone_settings('explain_before')
+    # Set for this thread only, the alias stays out of settings.DATABASES
+    connections[alias] = connection.__class__(settings_dict, alias=alias)
+    try:
+        yield alias
+    finally:
+        connections[alias].close()
+        del connections[alias]
+        if connection.vendor == 'sqlite':
+            os.remove(settings_dict['NAME'])
+        else:
+            connection.creation.destroy_test_db(verbosity=0, suffix='explain_before')
+
+
+class Command(BaseCommand):
+    help = 'Print query plans and timings of the hot lookup paths of the modeling app'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--before',
+            metavar='MIGRATION',
+            help='Also explain the queries at this modeling migration, on a throwaway copy of the database',
+        )
+        parser.add_argument('--repeat', type=int, default=20, help='Executions per query for the timing')
+        parser.add_argument('--database', default=DEFAULT_DB_ALIAS)
+
+    def handle(self, *args, before=None, repeat=20, database=DEFAULT_DB_ALIAS, **options):
+        if before:
+            try:
+                migration = MigrationExecutor(connections[database]).loader.get_migration_by_prefix('modeling', before)
+            except KeyError as e:
+                raise CommandError(str(e))
+            target = ('modeling', migration.name)
+            with throwaway_copy(database) as copy:
+                executor = MigrationExecutor(connections[copy])
+                executor.migrate([target])
+                state_apps = executor.loader.project_state(target).apps
+                self.stdout.write(self.style.MIGRATE_HEADING(f"Before (modeling {migration.name}):"))
+                self.explain(copy, repeat, state_apps)
+            self.stdout.write(self.style.MIGRATE_HEADING("After:"))
+        self.explain(database, repeat)
+
+    def explain(self, using, repeat, state_apps=None):
+        for label, queryset in hot_queries(using):
+            queryset = queryset.using(using)
+            if state_apps is not None:
+                # Only the columns, and the default ordering, of that migration
+                meta = state_apps.get_model(queryset.model._meta.label)._meta
+                columns = {field.name for field in meta.concrete_fields}
+                queryset = queryset.only(*(
+                    field.name for field in queryset.model._meta.concrete_fields if field.name in columns
+                ))
+                if queryset.query.default_ordering and not queryset.query.order_by:
+                    queryset = queryset.order_by(*meta.ordering)
+            start = time.perf_counter()
+            for _ in range(repeat):
+                list(queryset[:100])
+            elapsed = (time.perf_counter() - start) / max(repeat, 1) * 1000
+            self.stdout.write(self.style.SUCCESS(f"{label} ({elapsed:.2f} ms)"))
+            for line in queryset[:100].explain().splitlines():
+                self.stdout.write(f"    {line}")
@@ -0,0 +1,38 @@
+"""
+Import archers and club memberships from a CSV membership file.
+
+    python manage.py import_archers members.csv
+
+Archers are matched on union number: new ones are created, existing ones
+updated with the columns in the file. See modeling.imports for the columns.
+"""
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from modeling.imports import BATCH_SIZE, ImportFileError, import_archers
+
+# Rows with errors listed in full, the rest is only counted
+MAX_ERRORS_SHOWN = 50
+
+
+class Command(BaseCommand):
+    help = 'Import archers and club memberships from a CSV file, upserting on union number'
+
+    def add_arguments(self, parser):
+        parser.add_argument('file', help='CSV file with a header line')
+        parser.add_argument('--batch-size', type=int, default=BATCH_SIZE)
+        parser.add_argument('--encoding', default='utf-8-sig')
+
+    def handle(self, *args, **options):
+        start = time.perf_counter()
+        try:
+            with open(options['file'], encoding=options['encoding'], newline='') as lines:
+                result = import_archers(lines, batch_size=options['batch_size'])
+        except (OSError, UnicodeDecodeError, ImportFileError) as e:
+            raise CommandError(e)
+        for line, message in result.errors[:MAX_ERRORS_SHOWN]:
+            self.stderr.write(f"line {line}: {message}")
+        if len(result.errors) > MAX_ERRORS_SHOWN:
+            self.stderr.write(f"... and {len(result.errors) - MAX_ERRORS_SHOWN} more rows with errors")
+        self.stdout.write(self.style.SUCCESS(f"{result} in {time.perf_counter() - start:.1f} s"))
@@ -0,0 +1,40 @@
+"""
+Import scores from a result file of tournament software.
+
+    python manage.py import_scores results.csv --dry-run
+    python manage.py import_scores results.csv
+    python manage.py import_scores results.csv --round "Indoor 18 meter Round 1"
+
+Archers are matched on union number, rounds on name. Use --dry-run to
+list the new and changed scores before anything is written. See
+modeling.imports for the columns.
+"""
+from django.core.management.base import BaseCommand, CommandError
+
+from modeling.imports import ImportFileError, ScoreChange, import_scores
+
+
+class Command(BaseCommand):
+    help = 'Import scores from a CSV result file, matching archers on union number'
+
+    def add_arguments(self, parser):
+        parser.add_argument('file', help='CSV file with a header line')
+        parser.add_argument(
+            '--round', default=None,
+            help='Name of the round of every row; the file needs no round column',
+        )
+        parser.add_argument('--dry-run', action='store_true', help='Report the differences without writing them')
+        parser.add_argument('--encoding', default='utf-8-sig')
+
+    def handle(self, *args, **options):
+        try:
+            with open(options['file'], encoding=options['encoding'], newline='') as lines:
+                result = import_scores(lines, round_name=options['round'], dry_run=options['dry_run'])
+        except (OSError, UnicodeDecodeError, ImportFileError) as e:
+            raise CommandError(e)
+        for change in result.changes:
+            if change.kind != ScoreChange.UNCHANGED or options['verbosity'] > 1:
+                self.stdout.write(str(change))
+        for line, message in result.errors:
+            self.stderr.write(f"line {line}: {message}")
+        self.stdout.write(self.style.SUCCESS(str(result)))
@@ -0,0 +1,23 @@
+"""
+Recompute the personal and season bests of every archer.
+
+    python manage.py rebuild_personal_bests
+
+The bests are kept up to date on every score write; run this once after
+the migration that adds them, or after results were changed in bulk
+without the leaderboard being refreshed.
+"""
+from django.core.management.base import BaseCommand
+
+from modeling import personal_bests
+
+
+class Command(BaseCommand):
+    help = 'Recompute the personal bests of every archer from the leaderboards'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=2000, help='Archers per transaction')
+
+    def handle(self, *args, **options):
+        count = personal_bests.rebuild(batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(f"{count} personal bests written"))
@@ -0,0 +1,57 @@
+# Generated by Django 5.2.18 on 2026-10-18 08:45
+
+import django.core.validators
+import django.db.models.deletion
+import django.utils.timezone
+import uuid
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('modeling', '0001_initial'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='round',
+            name='scoringsheet',
+            field=models.ForeignKey(blank=True, help_text='format: not required, limits ends and arrows per end', null=True, on_delete=django.db.models.deletion.PROTECT, related_name='rounds', to='modeling.scoringsheet', verbose_name='Scoring sheet'),
+        ),
+        migrations.AddField(
+            model_name='score',
+            name='tens',
+            field=models.PositiveIntegerField(default=0, help_text='format: generated from ends, 10 and X count', verbose_name='10s'),
+        ),
+        migrations.AddField(
+            model_name='score',
+            name='xs',
+            field=models.PositiveIntegerField(default=0, help_text='format: generated from ends', verbose_name='Xs'),
+        ),
+        migrations.CreateModel(
+            name='End',
+            fields=[
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('created_at', models.DateTimeField(default=django.utils.timezone.now, editable=False)),
+                ('modified_at', models.DateTimeField(auto_now=True)),
+                ('is_active', models.BooleanField(default=True)),
+                ('number', models.PositiveIntegerField(help_text='format: required min-1, max-20', validators=[django.core.validators.MinValueValidator(1), django.core.validators.MaxValueValidator(20)], verbose_name='End')),
+                ('arrows', models.BinaryField(default=bytes, help_text='format: packed arrow values, max-20', max_length=20, verbose_name='Arrows')),
+                ('total', models.PositiveIntegerField(default=0, editable=False, help_text='format: generated', verbose_name='Total')),
+                ('tens', models.PositiveIntegerField(default=0, editable=False, help_text='format: generated, 10 and X count', verbose_name='10s')),
+                ('xs', models.PositiveIntegerField(default=0, editable=False, help_text='format: generated', verbose_name='Xs')),
+                ('author', models.ForeignKey(default=1, help_text='format: required, default=1 (superuser)', on_delete=django.db.models.deletion.PROTECT, related_name='end_author', to=settings.AUTH_USER_MODEL, verbose_name='Author')),
+                ('score', models.ForeignKey(help_text='format: required', on_delete=django.db.models.deletion.CASCADE, related_name='ends', to='modeling.score', verbose_name='Score')),
+            ],
+            options={
+                'verbose_name': 'End',
+                'verbose_name_plural': 'Ends',
+                'db_table': 'ends',
+                'ordering': ['score', 'number'],
+                'constraints': [models.UniqueConstraint(fields=('score', 'number'), name='unique_end_number_per_score')],
+            },
+        ),
+    ]
@@ -0,0 +1,116 @@
+# Generated by Django 5.2.18 on 2026-10-18 08:47
+
+import django.db.models.deletion
+import django.utils.timezone
+import uuid
+from django.db import migrations, models
+from django.db.models import Sum, Value
+from django.db.models.functions import Coalesce
+
+
+def build_leaderboards(apps, schema_editor):
+    Score = apps.get_model('modeling', 'Score')
+    CompetitionMembership = apps.get_model('modeling', 'CompetitionMembership')
+    LeaderboardEntry = apps.get_model('modeling', 'LeaderboardEntry')
+    CompetitionLeaderboardEntry = apps.get_model('modeling', 'CompetitionLeaderboardEntry')
+
+    rows = (
+        Score.objects
+        .filter(is_active=True, round_archer__isnull=False, round_archer__is_active=True)
+        .values('round_archer_id', 'round_archer__round_id', 'round_archer__archer_id')
+        .order_by()
+        .annotate(
+            total=Coalesce(Sum('score'), Value(0)),
+            tens=Sum('tens'),
+            xs=Sum('xs'),
+            arrows=Sum('number_of_arrows'),
+        )
+    )
+    LeaderboardEntry.objects.bulk_create([
+        LeaderboardEntry(
+            round_id=row['round_archer__round_id'],
+            round_archer_id=row['round_archer_id'],
+            archer_id=row['round_archer__archer_id'],
+            total=row['total'],
+            tens=row['tens'],
+            xs=row['xs'],
+            arrows=row['arrows'],
+        )
+        for row in rows
+    ], batch_size=500)
+
+    totals = {}
+    for membership in CompetitionMembership.objects.filter(is_active=True).values('competition_id', 'round_id'):
+        for entry in LeaderboardEntry.objects.filter(round_id=membership['round_id']):
+            key = (membership['competition_id'], entry.archer_id)
+            sums = totals.setdefault(key, [0, 0, 0, 0])
+            for i, value in enumerate((entry.total, entry.tens, entry.xs, entry.arrows)):
+                sums[i] += value
+    CompetitionLeaderboardEntry.objects.bulk_create([
+        CompetitionLeaderboardEntry(
+            competition_id=competition_id,
+            archer_id=archer_id,
+            total=sums[0],
+            tens=sums[1],
+            xs=sums[2],
+            arrows=sums[3],
+        )
+        for (competition_id, archer_id), sums in totals.items()
+    ], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('modeling', '0002_scoring_ends'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CompetitionLeaderboardEntry',
+            fields=[
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('created_at', models.DateTimeField(default=django.utils.timezone.now, editable=False)),
+                ('modified_at', models.DateTimeField(auto_now=True)),
+                ('is_active', models.BooleanField(default=True)),
+                ('total', models.PositiveIntegerField(default=0, verbose_name='Total')),
+                ('tens', models.PositiveIntegerField(default=0, verbose_name='10s')),
+                ('xs', models.PositiveIntegerField(default=0, verbose_name='Xs')),
+                ('arrows', models.PositiveIntegerField(default=0, verbose_name='Arrows')),
+                ('archer', models.ForeignKey(help_text='format: generated', on_delete=django.db.models.deletion.CASCADE, related_name='competition_leaderboard_entries', to='modeling.archer', verbose_name='Archer')),
+                ('competition', models.ForeignKey(help_text='format: generated', on_delete=django.db.models.deletion.CASCADE, related_name='leaderboard_entries', to='modeling.competition', verbose_name='Competition')),
+            ],
+            options={
+                'verbose_name': 'Competition Leaderboard Entry',
+                'verbose_name_plural': 'Competition Leaderboard Entries',
+                'db_table': 'competitionleaderboardentries',
+                'ordering': ['competition', '-total', '-tens', '-xs'],
+                'indexes': [models.Index(fields=['competition', '-total', '-tens', '-xs'], name='leaderboard_competition_idx')],
+                'constraints': [models.UniqueConstraint(fields=('competition', 'archer'), name='unique_competition_leaderboard_archer')],
+            },
+        ),
+        migrations.CreateModel(
+            name='LeaderboardEntry',
+            fields=[
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('created_at', models.DateTimeField(default=django.utils.timezone.now, editable=False)),
+                ('modified_at', models.DateTimeField(auto_now=True)),
+                ('is_active', models.BooleanField(default=True)),
+                ('total', models.PositiveIntegerField(default=0, verbose_name='Total')),
+                ('tens', models.PositiveIntegerField(default=0, verbose_name='10s')),
+                ('xs', models.PositiveIntegerField(default=0, verbose_name='Xs')),
+                ('arrows', models.PositiveIntegerField(default=0, verbose_name='Arrows')),
+                ('archer', models.ForeignKey(help_text='format: generated', on_delete=django.db.models.deletion.CASCADE, related_name='leaderboard_entries', to='modeling.archer', verbose_name='Archer')),
+                ('round', models.ForeignKey(help_text='format: generated', on_delete=django.db.models.deletion.CASCADE, related_name='leaderboard_entries', to='modeling.round', verbose_name='Round')),
+                ('round_archer', models.OneToOneField(help_text='format: generated', on_delete=django.db.models.deletion.CASCADE, related_name='leaderboard_entry', to='modeling.roundmembership', verbose_name='Round & Archer')),
+            ],
+            options={
+                'verbose_name': 'Leaderboard Entry',
+                'verbose_name_plural': 'Leaderboard Entries',
+                'db_table': 'leaderboardentries',
+                'ordering': ['round', '-total', '-tens', '-xs'],
+                'indexes': [models.Index(fields=['round', '-total', '-tens', '-xs'], name='leaderboard_round_rank_idx')],
+            },
+        ),
+        migrations.RunPython(build_leaderboards, migrations.RunPython.noop),
+    ]
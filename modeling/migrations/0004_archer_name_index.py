@@ -0,0 +1,23 @@
+# Generated by Django 5.2.18 on 2026-10-18 08:56
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('modeling', '0003_leaderboards'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AlterModelOptions(
+            name='archer',
+            options={'ordering': ['last_name', 'first_name'], 'verbose_name': 'Archer', 'verbose_name_plural': 'Archers'},
+        ),
+        migrations.AddIndex(
+            model_name='archer',
+            index=models.Index(fields=['last_name', 'first_name'], name='archers_name_idx'),
+        ),
+    ]
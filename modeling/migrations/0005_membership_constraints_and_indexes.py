@@ -0,0 +1,79 @@
+# Generated by Django 5.2.18 on 2026-10-18 08:59
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('modeling', '0004_archer_name_index'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AlterModelOptions(
+            name='categorymembership',
+            options={'ordering': ['category_id', 'archer_id'], 'verbose_name': 'Category Membership', 'verbose_name_plural': 'Category Memberships'},
+        ),
+        migrations.AlterModelOptions(
+            name='clubmembership',
+            options={'ordering': ['club_id', 'archer_id'], 'verbose_name': 'Club Membership', 'verbose_name_plural': 'Club Memberships'},
+        ),
+        migrations.AlterModelOptions(
+            name='competitionleaderboardentry',
+            options={'ordering': ['competition_id', '-total', '-tens', '-xs'], 'verbose_name': 'Competition Leaderboard Entry', 'verbose_name_plural': 'Competition Leaderboard Entries'},
+        ),
+        migrations.AlterModelOptions(
+            name='competitionmembership',
+            options={'ordering': ['competition_id', 'round_id'], 'verbose_name': 'Competition Membership', 'verbose_name_plural': 'Competition Memberships'},
+        ),
+        migrations.AlterModelOptions(
+            name='disciplinemembership',
+            options={'ordering': ['discipline_id', 'archer_id'], 'verbose_name': 'Discipline Membership', 'verbose_name_plural': 'Discipline Memberships'},
+        ),
+        migrations.AlterModelOptions(
+            name='leaderboardentry',
+            options={'ordering': ['round_id', '-total', '-tens', '-xs'], 'verbose_name': 'Leaderboard Entry', 'verbose_name_plural': 'Leaderboard Entries'},
+        ),
+        migrations.AlterModelOptions(
+            name='roundmembership',
+            options={'ordering': ['round_id', 'archer_id'], 'verbose_name': 'Round Membership', 'verbose_name_plural': 'Round Memberships'},
+        ),
+        migrations.AlterModelOptions(
+            name='teammembership',
+            options={'ordering': ['team_id', 'archer_id'], 'verbose_name': 'Team Membership', 'verbose_name_plural': 'Team Memberships'},
+        ),
+        migrations.AddIndex(
+            model_name='round',
+            index=models.Index(fields=['start_date'], name='rounds_start_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='score',
+            index=models.Index(fields=['round_archer', 'is_active'], name='scores_round_archer_active_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='categorymembership',
+            constraint=models.UniqueConstraint(fields=('category', 'archer'), name='unique_archer_per_category'),
+        ),
+        migrations.AddConstraint(
+            model_name='clubmembership',
+            constraint=models.UniqueConstraint(fields=('club', 'archer'), name='unique_archer_per_club'),
+        ),
+        migrations.AddConstraint(
+            model_name='competitionmembership',
+            constraint=models.UniqueConstraint(fields=('competition', 'round'), name='unique_round_per_competition'),
+        ),
+        migrations.AddConstraint(
+            model_name='disciplinemembership',
+            constraint=models.UniqueConstraint(fields=('discipline', 'archer'), name='unique_archer_per_discipline'),
+        ),
+        migrations.AddConstraint(
+            model_name='roundmembership',
+            constraint=models.UniqueConstraint(fields=('round', 'archer'), name='unique_archer_per_round'),
+        ),
+        migrations.AddConstraint(
+            model_name='teammembership',
+            constraint=models.UniqueConstraint(fields=('team', 'archer'), name='unique_archer_per_team'),
+        ),
+    ]
@@ -0,0 +1,124 @@
+# Generated by Django 5.2.18 on 2026-10-18 09:01
+
+import utils.uuid_utils
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('modeling', '0005_membership_constraints_and_indexes'),
+    ]
+
+    # The key default is evaluated in Python only, the columns do not change
+    operations = [
+        migrations.SeparateDatabaseAndState(
+            state_operations=[
+                migrations.AlterField(
+                    model_name='agegroup',
+                    name='id',
+                    field=models.UUIDField(default=utils.uuid_utils.default_uuid, editable=False, primary_key=True, serialize=False),
+                ),
+                migrations.AlterField(
+                    model_name='archer',
+                    name='id',
+                    field=models.UUIDField(default=utils.uuid_utils.default_uuid, editable=False, primary_key=True, serialize=False),
+                ),
+                migrations.AlterField(
+                    model_name='category',
+                    name='id',
+                    field=models.UUIDField(default=utils.uuid_utils.default_uuid, editable=False, primary_key=True, serialize=False),
+                ),
+                migrations.AlterField(
+                    model_name='categorymembership',
+                    name='id',
+                    field=models.UUIDField(default=utils.uuid_utils.default_uuid, editable=False, primary_key=True, serialize=False),
+                ),
+                migrations.AlterField(
+                    model_name='club',
+                    name='id',
+                    field=models.UUIDField(default=utils.uuid_utils.default_uuid, editable=False, primary_key=True, serialize=False),
+                ),
+                migrations.AlterField(
+                    model_name='clubmembership',
+                    name='id',
+                    field=models.UUIDField(default=utils.uuid_utils.default_uuid, editable=False, primary_key=True, serialize=False),
+                ),
+                migrations.AlterField(
+                    model_name='competition',
+                    name='id',
+                    field=models.UUIDField(default=utils.uuid_utils.default_uuid, editable=False, primary_key=True, serialize=False),
+                ),
+                migrations.AlterField(
+                    model_name='competitionleaderboardentry',
+                    name='id',
+                    field=models.UUIDField(default=utils.uuid_utils.default_uuid, editable=False, primary_key=True, serialize=False),
+                ),
+                migrations.AlterField(
+                    model_name='competitionmembership',
+                    name='id',
+                    field=models.UUIDField(default=utils.uuid_utils.default_uuid, editable=False, primary_key=True, serialize=False),
+                ),
+                migrations.AlterField(
+                    model_name='discipline',
+                    name='id',
+                    field=models.UUIDField(default=utils.uuid_utils.default_uuid, editable=False, primary_key=True, serialize=False),
+                ),
+                migrations.AlterField(
+                    model_name='disciplinemembership',
+                    name='id',
+                    field=models.UUIDField(default=utils.uuid_utils.default_uuid, editable=False, primary_key=True, serialize=False),
+                ),
+                migrations.AlterField(
+                    model_name='end',
+                    name='id',
+                    field=models.UUIDField(default=utils.uuid_utils.default_uuid, editable=False, primary_key=True, serialize=False),
+                ),
+                migrations.AlterField(
+                    model_name='leaderboardentry',
+                    name='id',
+                    field=models.UUIDField(default=utils.uuid_utils.default_uuid, editable=False, primary_key=True, serialize=False),
+                ),
+                migrations.AlterField(
+                    model_name='round',
+                    name='id',
+                    field=models.UUIDField(default=utils.uuid_utils.default_uuid, editable=False, primary_key=True, serialize=False),
+                ),
+                migrations.AlterField(
+                    model_name='roundmembership',
+                    name='id',
+                    field=models.UUIDField(default=utils.uuid_utils.default_uuid, editable=False, primary_key=True, serialize=False),
+                ),
+                migrations.AlterField(
+                    model_name='score',
+                    name='id',
+                    field=models.UUIDField(default=utils.uuid_utils.default_uuid, editable=False, primary_key=True, serialize=False),
+                ),
+                migrations.AlterField(
+                    model_name='scoringsheet',
+                    name='id',
+                    field=models.UUIDField(default=utils.uuid_utils.default_uuid, editable=False, primary_key=True, serialize=False),
+                ),
+                migrations.AlterField(
+                    model_name='targetface',
+                    name='id',
+                    field=models.UUIDField(default=utils.uuid_utils.default_uuid, editable=False, primary_key=True, serialize=False),
+                ),
+                migrations.AlterField(
+                    model_name='targetfacenamechoice',
+                    name='id',
+                    field=models.UUIDField(default=utils.uuid_utils.default_uuid, editable=False, primary_key=True, serialize=False),
+                ),
+                migrations.AlterField(
+                    model_name='team',
+                    name='id',
+                    field=models.UUIDField(default=utils.uuid_utils.default_uuid, editable=False, primary_key=True, serialize=False),
+                ),
+                migrations.AlterField(
+                    model_name='teammembership',
+                    name='id',
+                    field=models.UUIDField(default=utils.uuid_utils.default_uuid, editable=False, primary_key=True, serialize=False),
+                ),
+            ],
+        ),
+    ]
@@ -0,0 +1,58 @@
+# Generated by Django 5.2.18 on 2026-10-18 09:48
+
+import django.db.models.deletion
+import django.utils.timezone
+import utils.uuid_utils
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('modeling', '0006_time_ordered_primary_keys'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='round',
+            name='targetface',
+            field=models.ForeignKey(blank=True, help_text='format: not required', null=True, on_delete=django.db.models.deletion.PROTECT, related_name='rounds', to='modeling.targetface', verbose_name='Target face'),
+        ),
+        migrations.AddField(
+            model_name='roundmembership',
+            name='category',
+            field=models.ForeignKey(blank=True, help_text='format: not required', null=True, on_delete=django.db.models.deletion.PROTECT, related_name='round_memberships', to='modeling.category', verbose_name='Category'),
+        ),
+        migrations.AddField(
+            model_name='roundmembership',
+            name='discipline',
+            field=models.ForeignKey(blank=True, help_text='format: not required', null=True, on_delete=django.db.models.deletion.PROTECT, related_name='round_memberships', to='modeling.discipline', verbose_name='Discipline'),
+        ),
+        migrations.CreateModel(
+            name='PersonalBest',
+            fields=[
+                ('id', models.UUIDField(default=utils.uuid_utils.default_uuid, editable=False, primary_key=True, serialize=False)),
+                ('created_at', models.DateTimeField(default=django.utils.timezone.now, editable=False)),
+                ('modified_at', models.DateTimeField(auto_now=True)),
+                ('is_active', models.BooleanField(default=True)),
+                ('key', models.CharField(editable=False, help_text='format: generated', max_length=200, unique=True, verbose_name='Key')),
+                ('season', models.PositiveIntegerField(help_text='format: generated, year of the round, empty for the best of all seasons', null=True, verbose_name='Season')),
+                ('total', models.PositiveIntegerField(default=0, verbose_name='Total')),
+                ('tens', models.PositiveIntegerField(default=0, verbose_name='10s')),
+                ('xs', models.PositiveIntegerField(default=0, verbose_name='Xs')),
+                ('arrows', models.PositiveIntegerField(default=0, verbose_name='Arrows')),
+                ('archer', models.ForeignKey(help_text='format: generated', on_delete=django.db.models.deletion.CASCADE, related_name='personal_bests', to='modeling.archer', verbose_name='Archer')),
+                ('category', models.ForeignKey(help_text='format: generated', null=True, on_delete=django.db.models.deletion.CASCADE, related_name='personal_bests', to='modeling.category', verbose_name='Category')),
+                ('discipline', models.ForeignKey(help_text='format: generated', null=True, on_delete=django.db.models.deletion.CASCADE, related_name='personal_bests', to='modeling.discipline', verbose_name='Discipline')),
+                ('round', models.ForeignKey(help_text='format: generated, where the best was shot', on_delete=django.db.models.deletion.CASCADE, related_name='personal_bests', to='modeling.round', verbose_name='Round')),
+                ('scoringsheet', models.ForeignKey(help_text='format: generated', null=True, on_delete=django.db.models.deletion.CASCADE, related_name='personal_bests', to='modeling.scoringsheet', verbose_name='Scoring sheet')),
+                ('targetface', models.ForeignKey(help_text='format: generated', null=True, on_delete=django.db.models.deletion.CASCADE, related_name='personal_bests', to='modeling.targetface', verbose_name='Target face')),
+            ],
+            options={
+                'verbose_name': 'Personal Best',
+                'verbose_name_plural': 'Personal Bests',
+                'db_table': 'personalbests',
+                'ordering': ['archer_id', 'season', '-total', '-tens', '-xs'],
+            },
+        ),
+    ]
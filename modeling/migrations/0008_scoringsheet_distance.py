@@ -0,0 +1,32 @@
+# Generated by Django 5.2.18 on 2026-10-18 09:55
+
+import re
+
+import django.core.validators
+from django.db import migrations, models
+
+
+def distance_from_name(apps, schema_editor):
+    # The existing sheets are named after their distance, e.g. "Indoor 18 meter"
+    ScoringSheet = apps.get_model('modeling', 'ScoringSheet')
+    for sheet in ScoringSheet.objects.filter(distance__isnull=True):
+        match = re.search(r'(\d+)\s*(m\b|meter|metre)', sheet.name, re.IGNORECASE)
+        if match and 5 <= int(match.group(1)) <= 100:
+            sheet.distance = int(match.group(1))
+            sheet.save(update_fields=['distance'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('modeling', '0007_personal_bests'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='scoringsheet',
+            name='distance',
+            field=models.PositiveIntegerField(blank=True, help_text='format: not required, meters, used for handicaps', null=True, validators=[django.core.validators.MinValueValidator(5), django.core.validators.MaxValueValidator(100)], verbose_name='Distance'),
+        ),
+        migrations.RunPython(distance_from_name, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,46 @@
+# Generated by Django 5.2.18 on 2026-10-18 10:06
+
+import django.db.models.deletion
+import django.utils.timezone
+import utils.uuid_utils
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('modeling', '0008_scoringsheet_distance'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Match',
+            fields=[
+                ('id', models.UUIDField(default=utils.uuid_utils.default_uuid, editable=False, primary_key=True, serialize=False)),
+                ('created_at', models.DateTimeField(default=django.utils.timezone.now, editable=False)),
+                ('modified_at', models.DateTimeField(auto_now=True)),
+                ('is_active', models.BooleanField(default=True)),
+                ('slot', models.PositiveIntegerField(help_text='format: generated, 1 = final, 2-3 = semifinals, ..., 0 = bronze medal match', verbose_name='Slot')),
+                ('seed_a', models.PositiveIntegerField(blank=True, null=True, verbose_name='Seed A')),
+                ('seed_b', models.PositiveIntegerField(blank=True, null=True, verbose_name='Seed B')),
+                ('sets', models.BinaryField(default=bytes, help_text='format: packed set totals, max-5 sets', max_length=10, verbose_name='Sets')),
+                ('shoot_off', models.CharField(blank=True, choices=[('a', 'Archer A'), ('b', 'Archer B')], default='', help_text='format: not required, the archer closest to the centre in the shoot-off', max_length=1, verbose_name='Shoot-off')),
+                ('set_points_a', models.PositiveIntegerField(default=0, editable=False, verbose_name='Set points A')),
+                ('set_points_b', models.PositiveIntegerField(default=0, editable=False, verbose_name='Set points B')),
+                ('archer_a', models.ForeignKey(blank=True, help_text='format: generated, empty until decided or a bye', null=True, on_delete=django.db.models.deletion.PROTECT, related_name='matches_a', to='modeling.archer', verbose_name='Archer A')),
+                ('archer_b', models.ForeignKey(blank=True, help_text='format: generated, empty until decided or a bye', null=True, on_delete=django.db.models.deletion.PROTECT, related_name='matches_b', to='modeling.archer', verbose_name='Archer B')),
+                ('author', models.ForeignKey(default=1, help_text='format: required, default=1 (superuser)', on_delete=django.db.models.deletion.PROTECT, related_name='match_author', to=settings.AUTH_USER_MODEL, verbose_name='Author')),
+                ('competition', models.ForeignKey(help_text='format: required', on_delete=django.db.models.deletion.CASCADE, related_name='matches', to='modeling.competition', verbose_name='Competition')),
+                ('winner', models.ForeignKey(blank=True, editable=False, help_text='format: generated', null=True, on_delete=django.db.models.deletion.PROTECT, related_name='matches_won', to='modeling.archer', verbose_name='Winner')),
+            ],
+            options={
+                'verbose_name': 'Match',
+                'verbose_name_plural': 'Matches',
+                'db_table': 'matches',
+                'ordering': ['competition_id', 'slot'],
+                'constraints': [models.UniqueConstraint(fields=('competition', 'slot'), name='unique_match_slot_per_competition')],
+            },
+        ),
+    ]
@@ -0,0 +1,24 @@
+# Generated by Django 5.2.18 on 2026-10-18 10:46
+
+import django.db.models.functions.text
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('modeling', '0009_brackets'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='archer',
+            index=models.Index(django.db.models.functions.text.Lower('last_name'), django.db.models.functions.text.Lower('first_name'), name='archers_lower_name_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='archer',
+            index=models.Index(django.db.models.functions.text.Lower('first_name'), name='archers_lower_first_name_idx'),
+        ),
+    ]
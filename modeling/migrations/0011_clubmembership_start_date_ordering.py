@@ -0,0 +1,17 @@
+# Generated by Django 5.2.18 on 2026-10-18 10:56
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('modeling', '0010_archer_lower_name_indexes'),
+    ]
+
+    operations = [
+        migrations.AlterModelOptions(
+            name='clubmembership',
+            options={'ordering': ['start_date'], 'verbose_name': 'Club Membership', 'verbose_name_plural': 'Club Memberships'},
+        ),
+    ]
@@ -1,5 +1,7 @@
-import uuid
-from django.db import models
+from django.core.exceptions import ValidationError
+from django.db import models, transaction
+from django.db.models import F, Q
+from django.db.models.functions import Coalesce, Lower
 from django.utils import timezone
 from django.conf import settings
 from django.utils.translation import gettext_lazy as _
@@ -10,9 +12,12 @@ from django.core.validators import MaxValueValidator, MinValueValidator
 from wagtail.models import Page
 
 from userauth.models import CustomUser
+from utils.uuid_utils import default_uuid
+
+from .scoring import ARROW_X, format_arrows, summarize, unpack_arrows
 
 class BaseModel(models.Model):
-    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    id = models.UUIDField(primary_key=True, default=default_uuid, editable=False)
 
     created_at = models.DateTimeField(default=timezone.now, editable=False)
     modified_at = models.DateTimeField(auto_now=True)
@@ -142,7 +147,13 @@ class Archer(BaseModel):
        
     class Meta:
         db_table = 'archers'
-        ordering = ['last_name']
+        ordering = ['last_name', 'first_name']
+        indexes = [
+            models.Index(fields=['last_name', 'first_name'], name='archers_name_idx'),
+            # Case-insensitive name prefix search, see search_archers
+            models.Index(Lower('last_name'), Lower('first_name'), name='archers_lower_name_idx'),
+            models.Index(Lower('first_name'), name='archers_lower_first_name_idx'),
+        ]
         verbose_name = _("Archer")
         verbose_name_plural = _("Archers")
 
@@ -158,6 +169,28 @@ class Archer(BaseModel):
             s_middle_name = self.middle_name
         return f"{self.last_name} {self.first_name} {s_middle_name}"
 
+def search_archers(term):
+    """Archers whose last or first name starts with ``term`` in any case, or
+    with union number ``term``.
+
+    A prefix is a range over the lower-case name: LIKE and istartswith
+    compare a case-folded value, which no index serves, a range on
+    Lower(name) is served by the archers_lower_*_idx indexes.
+    """
+    term = term.lower()
+    following = term[:-1] + chr(ord(term[-1]) + 1)
+    condition = (
+        Q(lower_last_name__gte=term, lower_last_name__lt=following)
+        | Q(lower_first_name__gte=term, lower_first_name__lt=following)
+    )
+    if term.isdigit():
+        condition |= Q(union_number=int(term))
+    return (
+        Archer.objects
+        .alias(lower_last_name=Lower('last_name'), lower_first_name=Lower('first_name'))
+        .filter(condition)
+    )
+
 # Target Archery
 # Indoor Archery
 # Field Archery
@@ -259,9 +292,12 @@ class DisciplineMembership(BaseModel):
 
     class Meta:
         db_table = 'disciplinememberships'
-        ordering = ['discipline__name']
+        ordering = ['discipline_id', 'archer_id']
         verbose_name = _("Discipline Membership")
         verbose_name_plural = _("Discipline Memberships")
+        constraints = [
+            models.UniqueConstraint(fields=['discipline', 'archer'], name='unique_archer_per_discipline'),
+        ]
 
     def __str__(self):
         return f"{str(self.archer)} - {str(self.discipline)}"
@@ -443,6 +479,9 @@ class ClubMembership(BaseModel):
         ordering = ['start_date']
         verbose_name = _("Club Membership")
         verbose_name_plural = _("Club Memberships")
+        constraints = [
+            models.UniqueConstraint(fields=['club', 'archer'], name='unique_archer_per_club'),
+        ]
 
     def __str__(self):
         return f"{str(self.archer)} - {str(self.club)} {self.club.town}"
@@ -599,9 +638,12 @@ class CategoryMembership(BaseModel):
 
     class Meta:
         db_table = 'categorymemberships'
-        ordering = ['category__name']
+        ordering = ['category_id', 'archer_id']
         verbose_name = _("Category Membership")
         verbose_name_plural = _("Category Memberships")
+        constraints = [
+            models.UniqueConstraint(fields=['category', 'archer'], name='unique_archer_per_category'),
+        ]
 
     def __str__(self):
         return f"{str(self.archer)} - {str(self.category)}"
@@ -706,9 +748,12 @@ class TeamMembership(BaseModel):
 
     class Meta:
         db_table = 'teammemberships'
-        ordering = ['team__name']
+        ordering = ['team_id', 'archer_id']
         verbose_name = _("Team Membership")
         verbose_name_plural = _("Team Memberships")
+        constraints = [
+            models.UniqueConstraint(fields=['team', 'archer'], name='unique_archer_per_team'),
+        ]
 
     def __str__(self):
         return f"{str(self.archer)} - {str(self.team)}"
@@ -751,6 +796,13 @@ class ScoringSheet(BaseModel):
         verbose_name=_("Rows"),
         help_text=_("format: required min-3, max-20")
     )
+    distance = models.PositiveIntegerField(
+        null=True,
+        blank=True,
+        validators=[MinValueValidator(5), MaxValueValidator(100)],
+        verbose_name=_("Distance"),
+        help_text=_("format: not required, meters, used for handicaps")
+    )
         
     info = models.TextField(
         null=True,
@@ -979,6 +1031,26 @@ class Round(BaseModel):
         help_text=_("format: H:M:S, not required"),
     )
     # TODO: Insert location
+    scoringsheet = models.ForeignKey(
+        ScoringSheet,
+        on_delete=models.PROTECT,
+        null=True,
+        blank=True,
+        unique=False,
+        related_name='rounds',
+        verbose_name=_("Scoring sheet"),
+        help_text=_("format: not required, limits ends and arrows per end"),
+    )
+    targetface = models.ForeignKey(
+        TargetFace,
+        on_delete=models.PROTECT,
+        null=True,
+        blank=True,
+        unique=False,
+        related_name='rounds',
+        verbose_name=_("Target face"),
+        help_text=_("format: not required"),
+    )
     archers = models.ManyToManyField(
         Archer,
         through='RoundMembership',
@@ -1008,6 +1080,9 @@ class Round(BaseModel):
         ordering = ['name']
         verbose_name = _("Round")
         verbose_name_plural = _("Rounds")
+        indexes = [
+            models.Index(fields=['start_date'], name='rounds_start_date_idx'),
+        ]
 
     def __str__(self):
         return self.name
@@ -1036,6 +1111,27 @@ class RoundMembership(BaseModel):
         help_text=_("format: required"),
         related_name='archer_round_membership'
     )
+    # The class the archer shoots the round in
+    discipline = models.ForeignKey(
+        Discipline,
+        on_delete=models.PROTECT,
+        null=True,
+        blank=True,
+        unique=False,
+        verbose_name=_("Discipline"),
+        help_text=_("format: not required"),
+        related_name='round_memberships'
+    )
+    category = models.ForeignKey(
+        Category,
+        on_delete=models.PROTECT,
+        null=True,
+        blank=True,
+        unique=False,
+        verbose_name=_("Category"),
+        help_text=_("format: not required"),
+        related_name='round_memberships'
+    )
     slug = AutoSlugField(
         populate_from=('archer__last_name', 'round__name'), 
         editable=True
@@ -1058,9 +1154,12 @@ class RoundMembership(BaseModel):
 
     class Meta:
         db_table = 'roundmemberships'
-        ordering = ['round__name']
+        ordering = ['round_id', 'archer_id']
         verbose_name = _("Round Membership")
         verbose_name_plural = _("Round Memberships")
+        constraints = [
+            models.UniqueConstraint(fields=['round', 'archer'], name='unique_archer_per_round'),
+        ]
 
     def __str__(self):
         return f"{str(self.archer)} - {str(self.round)}"
@@ -1095,6 +1194,20 @@ class Score(BaseModel):
         verbose_name=_("Number of arrows")  ,      
         help_text=_("format: not required"),
     )
+    tens = models.PositiveIntegerField(
+        null=False,
+        blank=False,
+        default=0,
+        verbose_name=_("10s"),
+        help_text=_("format: generated from ends, 10 and X count"),
+    )
+    xs = models.PositiveIntegerField(
+        null=False,
+        blank=False,
+        default=0,
+        verbose_name=_("Xs"),
+        help_text=_("format: generated from ends"),
+    )
     info = models.TextField(
         null=True,
         blank=True,
@@ -1115,6 +1228,9 @@ class Score(BaseModel):
         db_table = 'scores'
         verbose_name = _("Score")
         verbose_name_plural = _("Scores")
+        indexes = [
+            models.Index(fields=['round_archer', 'is_active'], name='scores_round_archer_active_idx'),
+        ]
 
     # TODO: 119
     def __str__(self):
@@ -1129,6 +1245,144 @@ class Score(BaseModel):
         else:
             return f"{str(self.score)} - No Archer"
 
+    def refresh_totals(self):
+        """Set the totals to the sum of the ends, when there are ends.
+
+        End.save and End.delete add their difference to the stored totals,
+        so a total typed in by hand before the first end would stay on top
+        of them. Returns True when the totals were saved.
+        """
+        ends = list(self.ends.values_list('total', 'tens', 'xs', 'arrows'))
+        if not ends:
+            return False
+        self.score = sum(end[0] for end in ends)
+        self.tens = sum(end[1] for end in ends)
+        self.xs = sum(end[2] for end in ends)
+        self.number_of_arrows = sum(len(end[3] or b'') for end in ends)
+        self.save(update_fields=['score', 'tens', 'xs', 'number_of_arrows'])
+        return True
+
+class End(BaseModel):
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._stored_totals = (0, 0, 0, 0)
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._stored_totals = instance._totals()
+        return instance
+
+    score = models.ForeignKey(
+        Score,
+        on_delete=models.CASCADE,
+        unique=False,
+        related_name='ends',
+        verbose_name=_("Score"),
+        help_text=_("format: required"),
+    )
+    number = models.PositiveIntegerField(
+        null=False,
+        blank=False,
+        validators=[MinValueValidator(1), MaxValueValidator(20)],
+        verbose_name=_("End"),
+        help_text=_("format: required min-1, max-20"),
+    )
+    # One byte per arrow, see modeling.scoring
+    arrows = models.BinaryField(
+        max_length=20,
+        default=bytes,
+        verbose_name=_("Arrows"),
+        help_text=_("format: packed arrow values, max-20"),
+    )
+    total = models.PositiveIntegerField(
+        default=0,
+        editable=False,
+        verbose_name=_("Total"),
+        help_text=_("format: generated"),
+    )
+    tens = models.PositiveIntegerField(
+        default=0,
+        editable=False,
+        verbose_name=_("10s"),
+        help_text=_("format: generated, 10 and X count"),
+    )
+    xs = models.PositiveIntegerField(
+        default=0,
+        editable=False,
+        verbose_name=_("Xs"),
+        help_text=_("format: generated"),
+    )
+    author = models.ForeignKey(
+        CustomUser,
+        on_delete=models.PROTECT,
+        default=1,
+        related_name='end_author',
+        verbose_name=_("Author"),
+        help_text=_("format: required, default=1 (superuser)"),
+    )
+
+    class Meta:
+        db_table = 'ends'
+        ordering = ['score', 'number']
+        verbose_name = _("End")
+        verbose_name_plural = _("Ends")
+        constraints = [
+            models.UniqueConstraint(fields=['score', 'number'], name='unique_end_number_per_score'),
+        ]
+
+    def __str__(self):
+        return f"{self.number}: {format_arrows(self.arrows)}"
+
+    def __unicode__(self):
+        return f"{self.number}: {format_arrows(self.arrows)}"
+
+    def _totals(self):
+        return (self.total, self.tens, self.xs, len(self.arrows or b''))
+
+    def clean(self):
+        codes = unpack_arrows(self.arrows)
+        if any(code > ARROW_X for code in codes):
+            raise ValidationError({'arrows': _("Invalid arrow value.")})
+        sheet = None
+        if self.score_id and self.score.round_archer_id:
+            sheet = self.score.round_archer.round.scoringsheet
+        if sheet:
+            if self.number > sheet.rows:
+                raise ValidationError({'number': _("End %(number)s exceeds the %(rows)s rows of %(sheet)s.") % {
+                    'number': self.number, 'rows': sheet.rows, 'sheet': sheet.name,
+                }})
+            if len(codes) > sheet.columns:
+                raise ValidationError({'arrows': _("%(count)s arrows exceed the %(columns)s columns of %(sheet)s.") % {
+                    'count': len(codes), 'columns': sheet.columns, 'sheet': sheet.name,
+                }})
+
+    def save(self, *args, **kwargs):
+        self.total, self.tens, self.xs = summarize(unpack_arrows(self.arrows))
+        with transaction.atomic():
+            # Score first, so post_save receivers see the new totals
+            self._apply_delta(self._totals(), self._stored_totals)
+            super().save(*args, **kwargs)
+        self._stored_totals = self._totals()
+
+    def delete(self, *args, **kwargs):
+        with transaction.atomic():
+            self._apply_delta((0, 0, 0, 0), self._stored_totals)
+            result = super().delete(*args, **kwargs)
+        self._stored_totals = (0, 0, 0, 0)
+        return result
+
+    def _apply_delta(self, new, old):
+        # Keep the aggregate on Score in step without re-reading other ends
+        delta = [n - o for n, o in zip(new, old)]
+        if any(delta):
+            Score.objects.filter(pk=self.score_id).update(
+                score=Coalesce(F('score'), 0) + delta[0],
+                tens=F('tens') + delta[1],
+                xs=F('xs') + delta[2],
+                number_of_arrows=F('number_of_arrows') + delta[3],
+            )
+
 # TODO: Can be removed probably
 # class ScoreMembership(BaseModel):
 #     def __init__(self, *args, **kwargs):
@@ -1245,9 +1499,12 @@ class CompetitionMembership(BaseModel):
 
     class Meta:
         db_table = 'competitionmemberships'
-        ordering = ['competition__name']
+        ordering = ['competition_id', 'round_id']
         verbose_name = _("Competition Membership")
         verbose_name_plural = _("Competition Memberships")
+        constraints = [
+            models.UniqueConstraint(fields=['competition', 'round'], name='unique_round_per_competition'),
+        ]
 
     def __str__(self):
         return f"{str(self.competition)} - {str(self.round)}"
@@ -1255,6 +1512,297 @@ class CompetitionMembership(BaseModel):
     def __unicode__(self):
         return f"{str(self.competition)} - {str(self.round)}"
 
+#----------------------------------------
+# Leaderboard Models
+#----------------------------------------
+
+# Ranking order of World Archery: total, then 10s (X included), then Xs
+RANKING = ('-total', '-tens', '-xs')
+
+class LeaderboardEntry(BaseModel):
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+
+    round = models.ForeignKey(
+        Round,
+        on_delete=models.CASCADE,
+        unique=False,
+        verbose_name=_("Round"),
+        help_text=_("format: generated"),
+        related_name='leaderboard_entries'
+    )
+    round_archer = models.OneToOneField(
+        RoundMembership,
+        on_delete=models.CASCADE,
+        verbose_name=_("Round & Archer"),
+        help_text=_("format: generated"),
+        related_name='leaderboard_entry'
+    )
+    archer = models.ForeignKey(
+        Archer,
+        on_delete=models.CASCADE,
+        unique=False,
+        verbose_name=_("Archer"),
+        help_text=_("format: generated"),
+        related_name='leaderboard_entries'
+    )
+    total = models.PositiveIntegerField(default=0, verbose_name=_("Total"))
+    tens = models.PositiveIntegerField(default=0, verbose_name=_("10s"))
+    xs = models.PositiveIntegerField(default=0, verbose_name=_("Xs"))
+    arrows = models.PositiveIntegerField(default=0, verbose_name=_("Arrows"))
+
+    class Meta:
+        db_table = 'leaderboardentries'
+        ordering = ['round_id', *RANKING]
+        verbose_name = _("Leaderboard Entry")
+        verbose_name_plural = _("Leaderboard Entries")
+        indexes = [
+            models.Index(fields=['round', *RANKING], name='leaderboard_round_rank_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.total} - {str(self.archer)}"
+
+    def __unicode__(self):
+        return f"{self.total} - {str(self.archer)}"
+
+class CompetitionLeaderboardEntry(BaseModel):
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+
+    competition = models.ForeignKey(
+        Competition,
+        on_delete=models.CASCADE,
+        unique=False,
+        verbose_name=_("Competition"),
+        help_text=_("format: generated"),
+        related_name='leaderboard_entries'
+    )
+    archer = models.ForeignKey(
+        Archer,
+        on_delete=models.CASCADE,
+        unique=False,
+        verbose_name=_("Archer"),
+        help_text=_("format: generated"),
+        related_name='competition_leaderboard_entries'
+    )
+    total = models.PositiveIntegerField(default=0, verbose_name=_("Total"))
+    tens = models.PositiveIntegerField(default=0, verbose_name=_("10s"))
+    xs = models.PositiveIntegerField(default=0, verbose_name=_("Xs"))
+    arrows = models.PositiveIntegerField(default=0, verbose_name=_("Arrows"))
+
+    class Meta:
+        db_table = 'competitionleaderboardentries'
+        ordering = ['competition_id', *RANKING]
+        verbose_name = _("Competition Leaderboard Entry")
+        verbose_name_plural = _("Competition Leaderboard Entries")
+        constraints = [
+            models.UniqueConstraint(fields=['competition', 'archer'], name='unique_competition_leaderboard_archer'),
+        ]
+        indexes = [
+            models.Index(fields=['competition', *RANKING], name='leaderboard_competition_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.total} - {str(self.archer)}"
+
+    def __unicode__(self):
+        return f"{self.total} - {str(self.archer)}"
+
+#----------------------------------------
+# Personal Best Models
+#----------------------------------------
+
+class PersonalBest(BaseModel):
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+
+    # Archer, round type and class joined, see modeling.personal_bests.best_key
+    key = models.CharField(
+        max_length=200,
+        unique=True,
+        editable=False,
+        verbose_name=_("Key"),
+        help_text=_("format: generated"),
+    )
+    archer = models.ForeignKey(
+        Archer,
+        on_delete=models.CASCADE,
+        unique=False,
+        verbose_name=_("Archer"),
+        help_text=_("format: generated"),
+        related_name='personal_bests'
+    )
+    scoringsheet = models.ForeignKey(
+        ScoringSheet,
+        on_delete=models.CASCADE,
+        null=True,
+        unique=False,
+        verbose_name=_("Scoring sheet"),
+        help_text=_("format: generated"),
+        related_name='personal_bests'
+    )
+    targetface = models.ForeignKey(
+        TargetFace,
+        on_delete=models.CASCADE,
+        null=True,
+        unique=False,
+        verbose_name=_("Target face"),
+        help_text=_("format: generated"),
+        related_name='personal_bests'
+    )
+    discipline = models.ForeignKey(
+        Discipline,
+        on_delete=models.CASCADE,
+        null=True,
+        unique=False,
+        verbose_name=_("Discipline"),
+        help_text=_("format: generated"),
+        related_name='personal_bests'
+    )
+    category = models.ForeignKey(
+        Category,
+        on_delete=models.CASCADE,
+        null=True,
+        unique=False,
+        verbose_name=_("Category"),
+        help_text=_("format: generated"),
+        related_name='personal_bests'
+    )
+    season = models.PositiveIntegerField(
+        null=True,
+        verbose_name=_("Season"),
+        help_text=_("format: generated, year of the round, empty for the best of all seasons"),
+    )
+    round = models.ForeignKey(
+        Round,
+        on_delete=models.CASCADE,
+        unique=False,
+        verbose_name=_("Round"),
+        help_text=_("format: generated, where the best was shot"),
+        related_name='personal_bests'
+    )
+    total = models.PositiveIntegerField(default=0, verbose_name=_("Total"))
+    tens = models.PositiveIntegerField(default=0, verbose_name=_("10s"))
+    xs = models.PositiveIntegerField(default=0, verbose_name=_("Xs"))
+    arrows = models.PositiveIntegerField(default=0, verbose_name=_("Arrows"))
+
+    class Meta:
+        db_table = 'personalbests'
+        ordering = ['archer_id', 'season', *RANKING]
+        verbose_name = _("Personal Best")
+        verbose_name_plural = _("Personal Bests")
+
+    def __str__(self):
+        return f"{self.total} - {str(self.archer)}"
+
+    def __unicode__(self):
+        return f"{self.total} - {str(self.archer)}"
+
+class Match(BaseModel):
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+
+    SIDE_CHOICES = (
+        ('a', _("Archer A")),
+        ('b', _("Archer B")),
+    )
+
+    competition = models.ForeignKey(
+        Competition,
+        on_delete=models.CASCADE,
+        unique=False,
+        verbose_name=_("Competition"),
+        help_text=_("format: required"),
+        related_name='matches'
+    )
+    # Heap position in the bracket, see modeling.brackets
+    slot = models.PositiveIntegerField(
+        verbose_name=_("Slot"),
+        help_text=_("format: generated, 1 = final, 2-3 = semifinals, ..., 0 = bronze medal match"),
+    )
+    archer_a = models.ForeignKey(
+        Archer,
+        on_delete=models.PROTECT,
+        null=True,
+        blank=True,
+        unique=False,
+        verbose_name=_("Archer A"),
+        help_text=_("format: generated, empty until decided or a bye"),
+        related_name='matches_a'
+    )
+    archer_b = models.ForeignKey(
+        Archer,
+        on_delete=models.PROTECT,
+        null=True,
+        blank=True,
+        unique=False,
+        verbose_name=_("Archer B"),
+        help_text=_("format: generated, empty until decided or a bye"),
+        related_name='matches_b'
+    )
+    seed_a = models.PositiveIntegerField(null=True, blank=True, verbose_name=_("Seed A"))
+    seed_b = models.PositiveIntegerField(null=True, blank=True, verbose_name=_("Seed B"))
+    # Two bytes per set, the set totals of archer A and archer B
+    sets = models.BinaryField(
+        max_length=10,
+        default=bytes,
+        verbose_name=_("Sets"),
+        help_text=_("format: packed set totals, max-5 sets"),
+    )
+    shoot_off = models.CharField(
+        max_length=1,
+        blank=True,
+        default='',
+        choices=SIDE_CHOICES,
+        verbose_name=_("Shoot-off"),
+        help_text=_("format: not required, the archer closest to the centre in the shoot-off"),
+    )
+    set_points_a = models.PositiveIntegerField(default=0, editable=False, verbose_name=_("Set points A"))
+    set_points_b = models.PositiveIntegerField(default=0, editable=False, verbose_name=_("Set points B"))
+    winner = models.ForeignKey(
+        Archer,
+        on_delete=models.PROTECT,
+        null=True,
+        blank=True,
+        unique=False,
+        editable=False,
+        verbose_name=_("Winner"),
+        help_text=_("format: generated"),
+        related_name='matches_won'
+    )
+    author = models.ForeignKey(
+        CustomUser,
+        on_delete=models.PROTECT,
+        default=1,
+        related_name='match_author',
+        verbose_name=_("Author"),
+        help_text=_("format: required, default=1 (superuser)"),
+    )
+
+    class Meta:
+        db_table = 'matches'
+        ordering = ['competition_id', 'slot']
+        verbose_name = _("Match")
+        verbose_name_plural = _("Matches")
+        constraints = [
+            models.UniqueConstraint(fields=['competition', 'slot'], name='unique_match_slot_per_competition'),
+        ]
+
+    def __str__(self):
+        return f"{self.stage}: {self.archer_a or '-'} - {self.archer_b or '-'}"
+
+    def __unicode__(self):
+        return f"{self.stage}: {self.archer_a or '-'} - {self.archer_b or '-'}"
+
+    @property
+    def stage(self):
+        if self.slot == 0:
+            return "Bronze medal match"
+        return {1: "Final", 2: "Semifinal", 3: "Quarterfinal"}.get(
+            self.slot.bit_length(), f"1/{2 ** (self.slot.bit_length() - 1)}"
+        )
+
 # Wagtail Pages
 
 class GridPage(Page):
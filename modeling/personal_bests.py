@@ -0,0 +1,199 @@
+"""
+Personal and season bests per archer.
+
+PersonalBest holds the best round result of an archer per round type
+(scoring sheet and target face) and class (discipline and category), once
+over all seasons and once per season, the year the round started. A
+result is a LeaderboardEntry, the summed scores of one RoundMembership.
+
+The bests are kept up to date from leaderboard.refresh_round_entries: a
+changed result only has to be compared with the current best of its keys.
+Only when the result holding a best got worse, or an archer lost a result,
+are the bests of that archer recomputed from all their results. A profile
+page reads the bests of an archer in one query, see for_archer.
+"""
+from django.db import transaction
+from django.db.models import F, IntegerField, Value, Window
+from django.db.models.functions import ExtractYear, RowNumber
+
+from .models import Archer, LeaderboardEntry, PersonalBest
+
+KEY_FIELDS = (
+    'archer_id', 'round__scoringsheet_id', 'round__targetface_id',
+    'round_archer__discipline_id', 'round_archer__category_id',
+)
+RESULT_FIELDS = ('round', 'total', 'tens', 'xs', 'arrows')
+# PersonalBest fields whose primary keys make up the key, see best_key
+KEY_RELATIONS = ('archer', 'scoringsheet', 'targetface', 'discipline', 'category')
+
+
+def best_key(archer_id, scoringsheet_id, targetface_id, discipline_id, category_id, season):
+    return '/'.join(
+        '-' if value is None else str(value)
+        for value in (archer_id, scoringsheet_id, targetface_id, discipline_id, category_id, season)
+    )
+
+
+def _rank(total, tens, xs, date):
+    # Ties go to the round shot first, rounds without a date last
+    return (total, tens, xs, -date.toordinal() if date else float('-inf'))
+
+
+def _best(key, key_values, season, round_id, total, tens, xs, arrows):
+    archer_id, sheet_id, face_id, discipline_id, category_id = key_values
+    return PersonalBest(
+        key=key,
+        archer_id=archer_id,
+        scoringsheet_id=sheet_id,
+        targetface_id=face_id,
+        discipline_id=discipline_id,
+        category_id=category_id,
+        season=season,
+        round_id=round_id,
+        total=total,
+        tens=tens,
+        xs=xs,
+        arrows=arrows,
+    )
+
+
+def _save(bests):
+    # Upsert on the key, a new best replaces the round and totals of the row in place
+    PersonalBest.objects.bulk_create(
+        bests,
+        update_conflicts=True,
+        unique_fields=['key'],
+        update_fields=[*RESULT_FIELDS, 'modified_at'],
+    )
+
+
+def _winners(archer_ids, per_season):
+    """Best LeaderboardEntry per key of the given archers, ranked in the database."""
+    partition = [F(field) for field in KEY_FIELDS]
+    entries = LeaderboardEntry.objects.filter(archer_id__in=archer_ids)
+    if per_season:
+        entries = entries.filter(round__start_date__isnull=False).annotate(season=ExtractYear('round__start_date'))
+        partition.append(F('season'))
+    else:
+        entries = entries.annotate(season=Value(None, output_field=IntegerField()))
+    return (
+        entries
+        .annotate(position=Window(
+            RowNumber(),
+            partition_by=partition,
+            order_by=[F('total').desc(), F('tens').desc(), F('xs').desc(), F('round__start_date').asc(nulls_last=True)],
+        ))
+        .filter(position=1)
+        .order_by()
+        .values_list(*KEY_FIELDS, 'season', 'round_id', 'total', 'tens', 'xs', 'arrows')
+    )
+
+
+def _bests(archer_ids):
+    bests = {}
+    for per_season in (False, True):
+        for *key_values, season, round_id, total, tens, xs, arrows in _winners(archer_ids, per_season):
+            key = best_key(*key_values, season)
+            bests[key] = _best(key, key_values, season, round_id, total, tens, xs, arrows)
+    return bests
+
+
+@transaction.atomic
+def record_results(entry_ids, lost_archer_ids=()):
+    """Fold the created or changed LeaderboardEntries into the bests of their archers.
+
+    Returns the number of rows written. ``lost_archer_ids`` are archers with a result removed or moved to
+    another round; their bests are recomputed.
+    """
+    recompute = set(lost_archer_ids) - {None}
+    results = []
+    for *key_values, date, round_id, total, tens, xs, arrows in (
+        LeaderboardEntry.objects
+        .filter(pk__in=entry_ids)
+        .order_by()
+        .values_list(*KEY_FIELDS, 'round__start_date', 'round_id', 'total', 'tens', 'xs', 'arrows')
+    ):
+        for season in {None, date.year if date else None}:
+            key = best_key(*key_values, season)
+            results.append((key, key_values, season, _rank(total, tens, xs, date), round_id, total, tens, xs, arrows))
+
+    held = {
+        key: (round_id, _rank(total, tens, xs, date), arrows)
+        for key, round_id, total, tens, xs, arrows, date in PersonalBest.objects
+        .filter(key__in={result[0] for result in results})
+        .order_by()
+        .values_list('key', 'round_id', 'total', 'tens', 'xs', 'arrows', 'round__start_date')
+    }
+    candidates = {}
+    for key, key_values, season, result_rank, round_id, *totals in results:
+        best = held.get(key)
+        if best is not None and best[0] == round_id and result_rank < best[1]:
+            # The best got worse, another result may be better now
+            recompute.add(key_values[0])
+        elif best is None or result_rank > best[1] or (best[0] == round_id and totals[3] != best[2]):
+            if key not in candidates or result_rank > candidates[key][0]:
+                candidates[key] = (result_rank, _best(key, key_values, season, round_id, *totals))
+
+    bests = [best for _, best in candidates.values() if best.archer_id not in recompute]
+    _save(bests)
+    return len(bests) + (refresh_archers(recompute) if recompute else 0)
+
+
+@transaction.atomic
+def refresh_archers(archer_ids):
+    """Bring the PersonalBest rows of the given archers in line with their results.
+
+    Returns the number of rows created, changed or removed.
+    """
+    archer_ids = set(archer_ids) - {None}
+    if not archer_ids:
+        return 0
+    bests = _bests(archer_ids)
+    existing = {
+        key: values for key, *values in PersonalBest.objects
+        .filter(archer_id__in=archer_ids)
+        .order_by()
+        .values_list('key', 'round_id', 'total', 'tens', 'xs', 'arrows')
+    }
+    changed = [
+        best for key, best in bests.items()
+        if existing.get(key) != [best.round_id, best.total, best.tens, best.xs, best.arrows]
+    ]
+    removed = [key for key in existing if key not in bests]
+    if removed:
+        PersonalBest.objects.filter(key__in=removed).delete()
+    _save(changed)
+    return len(changed) + len(removed)
+
+
+def key_models():
+    """Models whose primary keys are part of PersonalBest.key."""
+    return {PersonalBest._meta.get_field(name).related_model for name in KEY_RELATIONS}
+
+
+def rebuild(batch_size=2000):
+    """Recompute the bests of every archer; returns the number of rows written.
+
+    Also what brings the keys in line after primary keys changed, e.g. by
+    the rekey_uuids command: the rows under an old key are removed.
+    """
+    count = 0
+    archer_ids = Archer.objects.order_by('pk').values_list('pk', flat=True)
+    batch = []
+    for archer_id in archer_ids.iterator(chunk_size=batch_size):
+        batch.append(archer_id)
+        if len(batch) == batch_size:
+            count += refresh_archers(batch)
+            batch = []
+    return count + refresh_archers(batch)
+
+
+def for_archer(archer):
+    """Bests of ``archer`` with round type, class and round, in one query."""
+    return (
+        PersonalBest.objects
+        .filter(archer=archer)
+        .select_related('scoringsheet', 'targetface', 'discipline', 'category', 'round')
+        .order_by('scoringsheet__name', 'targetface__name', 'discipline__name', 'category__name',
+                  F('season').desc(nulls_first=True))
+    )
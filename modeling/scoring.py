@@ -0,0 +1,204 @@
+"""
+Arrow encoding for ends and scores.
+
+Every arrow of an end is stored as one byte in ``End.arrows``:
+0 is a miss, 1-10 the ring value and 11 an inner ten (X).
+"""
+import uuid
+
+from django.db import transaction
+from django.utils import timezone
+
+ARROW_MISS = 0
+ARROW_X = 11
+
+ARROW_LABELS = {
+    ARROW_MISS: 'M',
+    ARROW_X: 'X',
+}
+
+
+def encode_arrow(value):
+    """Return the stored code for an arrow given as 'X', 'M', '9' or 9."""
+    if isinstance(value, str):
+        label = value.strip().upper()
+        if label == 'X':
+            return ARROW_X
+        if label == 'M':
+            return ARROW_MISS
+        if not label.isdigit():
+            raise ValueError(f"Invalid arrow value '{value}'")
+        value = int(label)
+    if isinstance(value, bool) or not isinstance(value, int) or not 0 <= value <= 10:
+        raise ValueError(f"Invalid arrow value '{value}'")
+    return value
+
+
+def decode_arrow(code):
+    """Return the scoresheet label for a stored arrow code."""
+    return ARROW_LABELS.get(code, str(code))
+
+
+def arrow_points(code):
+    return 10 if code == ARROW_X else code
+
+
+def pack_arrows(values):
+    return bytes(encode_arrow(value) for value in values)
+
+
+def unpack_arrows(data):
+    if not data:
+        return []
+    return list(bytes(data))
+
+
+def parse_arrows(text):
+    """Parse a scoresheet line such as 'X 10 9' or 'X,10,M'."""
+    return pack_arrows(text.replace(',', ' ').split())
+
+
+def format_arrows(data):
+    return ' '.join(decode_arrow(code) for code in unpack_arrows(data))
+
+
+def summarize(codes):
+    """Return (total, tens, xs) for a list of arrow codes.
+
+    ``tens`` counts every arrow in the ten ring, Xs included, which is the
+    first tie break of World Archery rules.
+    """
+    total = tens = xs = 0
+    for code in codes:
+        total += arrow_points(code)
+        if code >= 10:
+            tens += 1
+        if code == ARROW_X:
+            xs += 1
+    return total, tens, xs
+
+
+def record_end(score, number, arrows, author=None):
+    """Create or replace end ``number`` of ``score`` with the given arrows."""
+    from .models import End
+
+    end = End.objects.filter(score=score, number=number).first()
+    if end is None:
+        end = End(score=score, number=number)
+    if author is not None:
+        end.author = author
+    end.arrows = pack_arrows(arrows)
+    end.full_clean(exclude=['author'])
+    end.save()
+    return end
+
+
+class EndEntryError(ValueError):
+    """Raised by record_ends with the list of (index, message) errors."""
+
+    def __init__(self, errors):
+        super().__init__(errors)
+        self.errors = errors
+
+
+def record_ends(entries, author=None):
+    """Write many ends in one transaction with bulk operations.
+
+    ``entries`` is a sequence of (round_archer_id, end number, arrows) where
+    arrows is anything ``pack_arrows`` accepts. The first active Score of
+    each RoundMembership receives the end; a Score is created when there is
+    none. Nothing is written when one of the entries is invalid.
+
+    Returns the updated Score objects keyed by round_archer_id.
+    """
+    from . import leaderboard
+    from .models import End, RoundMembership, Score
+
+    errors = []
+    packed = []
+    for index, (membership_id, number, arrows) in enumerate(entries):
+        try:
+            membership_id = str(uuid.UUID(str(membership_id)))
+            data = arrows if isinstance(arrows, bytes) else pack_arrows(arrows)
+        except (TypeError, ValueError) as e:
+            errors.append((index, str(e)))
+            continue
+        packed.append((index, membership_id, number, data))
+
+    membership_ids = {membership_id for _, membership_id, _, _ in packed}
+    with transaction.atomic():
+        # Held until the commit, so that concurrent batches for a membership
+        # without an active Score cannot both create one
+        list(
+            RoundMembership.objects
+            .select_for_update()
+            .filter(pk__in=membership_ids)
+            .order_by('pk')
+            .values_list('pk', flat=True)
+        )
+        memberships = {
+            str(m.pk): m for m in RoundMembership.objects
+            .filter(pk__in=membership_ids)
+            .select_related('round__scoringsheet')
+        }
+        for index, membership_id, number, data in packed:
+            membership = memberships.get(membership_id)
+            sheet = membership.round.scoringsheet if membership else None
+            if membership is None:
+                errors.append((index, f"Unknown round membership '{membership_id}'"))
+            elif isinstance(number, bool) or not isinstance(number, int) or not 1 <= number <= (sheet.rows if sheet else 20):
+                errors.append((index, f"Invalid end number '{number}'"))
+            elif len(data) > (sheet.columns if sheet else 20):
+                errors.append((index, f"Too many arrows for end {number}"))
+        if errors:
+            raise EndEntryError(sorted(errors))
+
+        scores = {}
+        for score in (
+            Score.objects
+            .select_for_update()
+            .filter(round_archer_id__in=memberships, is_active=True)
+            .order_by('created_at')
+        ):
+            scores.setdefault(str(score.round_archer_id), score)
+        new_scores = [
+            Score(round_archer=membership, score=0, **({'author': author} if author else {}))
+            for membership_id, membership in memberships.items()
+            if membership_id not in scores
+        ]
+        Score.objects.bulk_create(new_scores)
+        scores.update({str(score.round_archer_id): score for score in new_scores})
+
+        existing = {
+            (end.score_id, end.number): end
+            for end in End.objects.filter(
+                score__in=scores.values(),
+                number__in={number for _, _, number, _ in packed},
+            )
+        }
+        now = timezone.now()
+        to_create, to_update = {}, {}
+        for _, membership_id, number, data in packed:
+            score = scores[membership_id]
+            key = (score.pk, number)
+            end = to_create.get(key) or to_update.get(key) or existing.get(key)
+            if end is None:
+                end = End(score=score, number=number, **({'author': author} if author else {}))
+                to_create[key] = end
+            elif key not in to_create:
+                to_update[key] = end
+            old = (end.total, end.tens, end.xs, len(end.arrows or b''))
+            end.arrows = data
+            end.total, end.tens, end.xs = summarize(unpack_arrows(data))
+            end.modified_at = now
+            score.score = (score.score or 0) + end.total - old[0]
+            score.tens += end.tens - old[1]
+            score.xs += end.xs - old[2]
+            score.number_of_arrows += len(data) - old[3]
+            score.modified_at = now
+
+        End.objects.bulk_create(to_create.values())
+        End.objects.bulk_update(to_update.values(), ['arrows', 'total', 'tens', 'xs', 'modified_at'])
+        Score.objects.bulk_update(scores.values(), ['score', 'tens', 'xs', 'number_of_arrows', 'modified_at'])
+        leaderboard.refresh_round_entries([score.round_archer_id for score in scores.values()])
+    return scores
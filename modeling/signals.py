@@ -0,0 +1,53 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .models import (
+    Competition,
+    CompetitionMembership,
+    End,
+    LeaderboardEntry,
+    Round,
+    RoundMembership,
+    Score,
+)
+from . import leaderboard, personal_bests
+
+
+@receiver(post_save, sender=Score)
+@receiver(post_delete, sender=Score)
+def score_changed(sender, instance, **kwargs):
+    leaderboard.refresh_round_entries([instance.round_archer_id])
+
+
+@receiver(post_save, sender=End)
+@receiver(post_delete, sender=End)
+def end_changed(sender, instance, **kwargs):
+    # End keeps its Score up to date with an update(), which sends no signal
+    leaderboard.refresh_round_entries(
+        Score.objects.filter(pk=instance.score_id).values_list('round_archer_id', flat=True)
+    )
+
+
+@receiver(post_save, sender=RoundMembership)
+def round_membership_changed(sender, instance, created, **kwargs):
+    if not created:
+        leaderboard.refresh_round_entries([instance.pk])
+        # Discipline or category decide which bests the result counts for
+        personal_bests.refresh_archers([instance.archer_id])
+
+
+@receiver(post_save, sender=Round)
+def round_changed(sender, instance, created, **kwargs):
+    # Scoring sheet, target face or date decide which bests the results count for
+    if not created:
+        personal_bests.refresh_archers(
+            LeaderboardEntry.objects.filter(round=instance).values_list('archer_id', flat=True)
+        )
+
+
+@receiver(post_save, sender=CompetitionMembership)
+@receiver(post_delete, sender=CompetitionMembership)
+def competition_membership_changed(sender, instance, **kwargs):
+    competition = Competition.objects.filter(pk=instance.competition_id).first()
+    if competition is not None:
+        leaderboard.rebuild_competition(competition)
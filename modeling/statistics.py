@@ -0,0 +1,163 @@
+"""
+Arrow statistics of rounds and competitions, computed with NumPy.
+
+The ends of the active scores are read in one query and laid out as a
+matrix of scores x ends x arrows holding the arrow codes of
+modeling.scoring, with EMPTY where no arrow was shot. Every statistic is
+an array operation over that matrix; nothing loops per score or arrow in
+Python, so a season of millions of arrows is a few vector passes.
+
+NumPy is in requirements.txt and imported on first use, so that starting
+the project does not pay for it (see "manage.py importtime").
+"""
+import uuid
+
+from django.core.exceptions import ImproperlyConfigured
+from django.db.models import CharField
+from django.db.models.functions import Cast
+
+from .models import End
+from .scoring import ARROW_X
+
+# Code of a cell without an arrow
+EMPTY = 0xFF
+
+
+def _numpy():
+    try:
+        import numpy
+    except ImportError:
+        raise ImproperlyConfigured("Arrow statistics require the 'numpy' package.")
+    return numpy
+
+
+def load_arrows(ends):
+    """Return (score ids, archer ids, codes) for the End queryset ``ends``.
+
+    ``codes`` has a row per score, a column per end number and a cell per
+    arrow; scores, ends and arrows missing from the data are EMPTY.
+    """
+    np = _numpy()
+    # The ids come as text, building a UUID for every end costs more than the rest
+    rows = list(
+        ends.filter(score__is_active=True, score__round_archer__is_active=True)
+        .order_by()
+        .values_list(
+            Cast('score_id', CharField()), Cast('score__round_archer__archer_id', CharField()), 'number', 'arrows',
+        )
+    )
+    scores, archers = {}, []
+    for score_id, archer_id, _, _ in rows:
+        if score_id not in scores:
+            scores[score_id] = len(scores)
+            archers.append(uuid.UUID(archer_id))
+    if not rows:
+        return [], [], np.full((0, 0, 0), EMPTY, dtype=np.uint8)
+
+    index = np.fromiter((scores[row[0]] for row in rows), dtype=np.intp, count=len(rows))
+    numbers = np.fromiter((row[2] for row in rows), dtype=np.intp, count=len(rows))
+    width = max(len(row[3]) for row in rows)
+    packed = b''.join(bytes(row[3]).ljust(width, bytes([EMPTY])) for row in rows)
+    codes = np.full((len(scores), int(numbers.max()), width), EMPTY, dtype=np.uint8)
+    codes[index, numbers - 1] = np.frombuffer(packed, dtype=np.uint8).reshape(len(rows), width)
+    return [uuid.UUID(score_id) for score_id in scores], archers, codes
+
+
+class ArrowStatistics:
+    """
+    Statistics of a scores x ends x arrows matrix of arrow codes.
+
+    Arrays have one entry per score (``totals``, ``xs``, ...) or one row per
+    score and a column per end (``end_totals``, ``running_totals``).
+    Averages and deviations are per arrow unless named per end; a score
+    without arrows gets NaN.
+    """
+
+    def __init__(self, score_ids, archer_ids, codes):
+        np = _numpy()
+        self.score_ids = score_ids
+        self.archer_ids = archer_ids
+        self.codes = codes
+
+        shot = codes != EMPTY
+        points = np.where(codes == ARROW_X, 10, codes).astype(np.int32)
+        points[~shot] = 0
+        self.arrows = shot.sum(axis=(1, 2))
+        self.end_totals = points.sum(axis=2)
+        self.running_totals = self.end_totals.cumsum(axis=1)
+        self.totals = self.end_totals.sum(axis=1)
+        self.xs = (codes == ARROW_X).sum(axis=(1, 2))
+        self.tens = self.xs + (codes == 10).sum(axis=(1, 2))
+        self.nines = (codes == 9).sum(axis=(1, 2))
+        self.misses = (codes == 0).sum(axis=(1, 2))
+
+        with np.errstate(invalid='ignore', divide='ignore'):
+            self.averages = self.totals / self.arrows
+            deviation = np.where(shot, points - self.averages[:, None, None], 0)
+            self.deviations = np.sqrt((deviation ** 2).sum(axis=(1, 2)) / self.arrows)
+
+            # Consistency over the ends that were shot: spread of the end totals
+            shot_ends = shot.any(axis=2)
+            end_count = shot_ends.sum(axis=1)
+            end_averages = self.totals / end_count
+            end_deviation = np.where(shot_ends, self.end_totals - end_averages[:, None], 0)
+            self.end_deviations = np.sqrt((end_deviation ** 2).sum(axis=1) / end_count)
+            self.variation = self.end_deviations / end_averages
+            highest = np.where(shot_ends, self.end_totals, 0).max(axis=1, initial=0)
+            lowest = np.where(shot_ends, self.end_totals, highest[:, None]).min(
+                axis=1, initial=np.iinfo(np.int32).max,
+            )
+            self.end_ranges = highest - lowest
+
+            # Field average of every end over the scores that shot it
+            self.field_end_averages = self.end_totals.sum(axis=0) / shot_ends.sum(axis=0)
+
+    def __len__(self):
+        return len(self.score_ids)
+
+    def rows(self):
+        """A dict per score, highest total first, for templates and the API."""
+        np = _numpy()
+        order = np.lexsort((-self.xs, -self.tens, -self.totals))
+        return [
+            {
+                'score_id': self.score_ids[i],
+                'archer_id': self.archer_ids[i],
+                'arrows': int(self.arrows[i]),
+                'total': int(self.totals[i]),
+                'tens': int(self.tens[i]),
+                'xs': int(self.xs[i]),
+                'nines': int(self.nines[i]),
+                'misses': int(self.misses[i]),
+                'average': float(self.averages[i]),
+                'deviation': float(self.deviations[i]),
+                'end_deviation': float(self.end_deviations[i]),
+                'end_range': int(self.end_ranges[i]),
+                'running_totals': self.running_totals[i].tolist(),
+            }
+            for i in order
+        ]
+
+    def archer_totals(self):
+        """(archer ids, totals, tens, xs, arrows) summed per archer over all scores."""
+        np = _numpy()
+        ids = list(dict.fromkeys(self.archer_ids))
+        position = {archer_id: i for i, archer_id in enumerate(ids)}
+        index = np.fromiter((position[a] for a in self.archer_ids), dtype=np.intp, count=len(self.archer_ids))
+        sums = [
+            np.bincount(index, weights=values, minlength=len(ids)).astype(np.int64)
+            for values in (self.totals, self.tens, self.xs, self.arrows)
+        ]
+        return (ids, *sums)
+
+
+def round_statistics(round):
+    return ArrowStatistics(*load_arrows(End.objects.filter(score__round_archer__round=round)))
+
+
+def competition_statistics(competition):
+    """Statistics over every score in the active rounds of ``competition``."""
+    return ArrowStatistics(*load_arrows(End.objects.filter(
+        score__round_archer__round__competitionmembership_round__competition=competition,
+        score__round_archer__round__competitionmembership_round__is_active=True,
+    )))
@@ -0,0 +1,125 @@
+"""
+Team results per Round and per Competition.
+
+A team scores with the results of its members, read from the materialized
+leaderboards (LeaderboardEntry, CompetitionLeaderboardEntry):
+
+* best of N: the N best member results count, e.g. the best 3 of a club
+  team of 4 to 6 archers;
+* mixed: the best ``per_category`` results of every given category count,
+  e.g. the best man and the best woman of a mixed team.
+
+The counting results of every team are picked in one query, ranked within
+their team (and category) with a ROW_NUMBER window. Summing those rows into
+the team totals is a single pass over them. A team without enough results
+for every place is ranked after the complete teams.
+"""
+from collections import namedtuple
+from itertools import groupby
+
+from django.db.models import F, OuterRef, Subquery, Window
+from django.db.models.functions import RowNumber
+
+from .models import CategoryMembership, CompetitionLeaderboardEntry, LeaderboardEntry
+
+TEAM_SIZE = 3
+
+TeamResult = namedtuple('TeamResult', ['team_id', 'team', 'total', 'tens', 'xs', 'arrows', 'archer_ids', 'complete'])
+
+TEAM = 'archer__teammembership_archer__team'
+
+
+def _counting(entries, places, category=None):
+    """Rows of the results that count for their team, grouped per team, best first."""
+    partition = [F(f'{TEAM}_id')]
+    if category is not None:
+        partition.append(F(category))
+    return (
+        entries
+        .filter(**{
+            f'{TEAM}__isnull': False,
+            f'{TEAM}__is_active': True,
+            'archer__teammembership_archer__is_active': True,
+        })
+        .annotate(position=Window(
+            RowNumber(),
+            partition_by=partition,
+            order_by=[F('total').desc(), F('tens').desc(), F('xs').desc(), F('archer_id').asc()],
+        ))
+        .filter(position__lte=places)
+        .order_by()
+        .values_list(f'{TEAM}_id', f'{TEAM}__name', 'archer_id', 'total', 'tens', 'xs', 'arrows')
+    )
+
+
+def _team_results(rows, places):
+    results = []
+    for (team_id, name), members in groupby(sorted(rows, key=lambda row: str(row[0])), key=lambda row: row[:2]):
+        members = list(members)
+        results.append(TeamResult(
+            team_id,
+            name,
+            sum(row[3] for row in members),
+            sum(row[4] for row in members),
+            sum(row[5] for row in members),
+            sum(row[6] for row in members),
+            [row[2] for row in members],
+            len(members) == places,
+        ))
+    return sorted(results, key=lambda result: (not result.complete, -result.total, -result.tens, -result.xs, result.team))
+
+
+def best_of(entries, size=TEAM_SIZE):
+    """Team results of the leaderboard ``entries``, the best ``size`` results of a team count."""
+    return _team_results(_counting(entries, size), size)
+
+
+def mixed(entries, categories, category, per_category=1):
+    """Team results where the best ``per_category`` results of each of ``categories`` count.
+
+    ``category`` is the lookup of the category id of an entry.
+    """
+    categories = list(categories)
+    rows = _counting(entries.filter(**{f'{category}__in': categories}), per_category, category)
+    return _team_results(rows, per_category * len(categories))
+
+
+def round_teams(round, size=TEAM_SIZE, categories=None, per_category=1):
+    """Team results of ``round``; mixed teams over ``categories`` when given."""
+    entries = LeaderboardEntry.objects.filter(round=round)
+    if categories:
+        return mixed(entries, categories, 'round_archer__category_id', per_category)
+    return best_of(entries, size)
+
+
+def competition_teams(competition, size=TEAM_SIZE, categories=None, per_category=1):
+    """Team results of ``competition``; mixed teams go by the CategoryMemberships of the archers.
+
+    An archer with active memberships in several of ``categories`` counts
+    once, in the category they joined last.
+    """
+    entries = CompetitionLeaderboardEntry.objects.filter(competition=competition)
+    if categories:
+        categories = list(categories)
+        # A join would give one row per membership, counting a result twice
+        entries = entries.annotate(team_category_id=Subquery(
+            CategoryMembership.objects
+            .filter(archer=OuterRef('archer_id'), is_active=True, category_id__in=categories)
+            .order_by('-created_at', '-pk')
+            .values('category_id')[:1]
+        ))
+        return mixed(entries, categories, 'team_category_id', per_category)
+    return best_of(entries, size)
+
+
+def ranked(results):
+    """Yield (rank, result) pairs; incomplete teams get no rank."""
+    rank, previous = 0, None
+    for position, result in enumerate(results, start=1):
+        if not result.complete:
+            yield None, result
+            continue
+        key = (result.total, result.tens, result.xs)
+        if key != previous:
+            rank, previous = position, key
+        yield rank, result
@@ -1,3 +1,925 @@
-from django.test import TestCase
+import tempfile
+from datetime import date, timedelta
+from io import BytesIO, StringIO
 
-# Create your tests here.
+from django.core.exceptions import ValidationError
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.db import IntegrityError, connection, transaction
+from django.db.migrations.recorder import MigrationRecorder
+from django.http import StreamingHttpResponse
+from django.test import TestCase, TransactionTestCase
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+from userauth.models import CustomUser
+
+from . import brackets, handicaps, imports, leaderboard, personal_bests, teams
+from .models import (
+    AgeGroup,
+    Archer,
+    Category,
+    CategoryMembership,
+    Club,
+    ClubMembership,
+    Competition,
+    CompetitionLeaderboardEntry,
+    CompetitionMembership,
+    Discipline,
+    DisciplineMembership,
+    End,
+    LeaderboardEntry,
+    Match,
+    PersonalBest,
+    Round,
+    RoundMembership,
+    Score,
+    ScoringSheet,
+    TargetFace,
+    TargetFaceNameChoice,
+    Team,
+    TeamMembership,
+)
+from .scoring import pack_arrows, parse_arrows, record_end, summarize, unpack_arrows
+
+
+class ModelingTestCase(TestCase):
+    """
+    Base class creating the superuser that is the default author of every model.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = CustomUser.objects.create_superuser(
+            id=1,
+            username='admin',
+            password='changeme',
+            email='me@mail.com',
+        )
+        cls.sheet = ScoringSheet.objects.create(name="Indoor 18 meter", columns=3, rows=10)
+        cls.round = Round.objects.create(name="Indoor 18 meter Round 1", scoringsheet=cls.sheet)
+
+    @classmethod
+    def create_archer(cls, number):
+        return Archer.objects.create(
+            first_name=f"First{number}",
+            last_name=f"Last{number}",
+            union_number=number,
+        )
+
+    @classmethod
+    def create_score(cls, number, round=None):
+        membership = RoundMembership.objects.create(
+            round=round or cls.round,
+            archer=cls.create_archer(number),
+        )
+        return Score.objects.create(round_archer=membership)
+
+
+class ArrowEncodingTests(TestCase):
+
+    def test_pack_roundtrip(self):
+        data = pack_arrows(['X', 10, '9', 'm'])
+        self.assertEqual(len(data), 4)
+        self.assertEqual(unpack_arrows(data), [11, 10, 9, 0])
+
+    def test_summarize_counts_x_as_ten(self):
+        self.assertEqual(summarize(unpack_arrows(parse_arrows("X, 10 9"))), (29, 2, 1))
+
+    def test_invalid_arrow(self):
+        with self.assertRaises(ValueError):
+            pack_arrows(['11'])
+
+
+class EndTests(ModelingTestCase):
+    """
+    Tests for the incremental maintenance of Score totals from ends.
+    """
+
+    def test_ends_update_score(self):
+        score = self.create_score(1)
+        record_end(score, 1, ['X', '10', '9'])
+        record_end(score, 2, ['8', '7', 'M'])
+        score.refresh_from_db()
+        self.assertEqual((score.score, score.tens, score.xs, score.number_of_arrows), (44, 2, 1, 6))
+
+    def test_replacing_an_end_applies_the_difference(self):
+        score = self.create_score(1)
+        record_end(score, 1, ['X', '10', '9'])
+        record_end(score, 1, ['9', '9', '9'])
+        score.refresh_from_db()
+        self.assertEqual((score.score, score.tens, score.xs), (27, 0, 0))
+        self.assertEqual(score.ends.count(), 1)
+
+    def test_deleting_an_end(self):
+        score = self.create_score(1)
+        record_end(score, 1, ['X', '10', '9'])
+        record_end(score, 2, ['5', '5', '5']).delete()
+        score.refresh_from_db()
+        self.assertEqual((score.score, score.number_of_arrows), (29, 3))
+
+    def test_end_limited_by_scoring_sheet(self):
+        score = self.create_score(1)
+        with self.assertRaises(ValidationError):
+            record_end(score, 1, ['X', '10', '9', '8'])
+        with self.assertRaises(ValidationError):
+            record_end(score, 11, ['X'])
+        self.assertFalse(End.objects.exists())
+
+
+class LeaderboardTests(ModelingTestCase):
+    """
+    Tests for the materialized round and competition leaderboards.
+    """
+
+    def test_ties_broken_by_tens_then_xs(self):
+        first = self.create_score(1)
+        record_end(first, 1, ['X', 'X', '8'])
+        second = self.create_score(2)
+        record_end(second, 1, ['X', '10', '8'])
+        third = self.create_score(3)
+        record_end(third, 1, ['10', '9', '9'])
+        fourth = self.create_score(4)
+        record_end(fourth, 1, ['X', '9', '9'])
+
+        entries = list(leaderboard.ranked(leaderboard.round_leaderboard(self.round)))
+        self.assertEqual(
+            [(rank, entry.archer.union_number) for rank, entry in entries],
+            [(1, 1), (2, 2), (3, 4), (4, 3)],
+        )
+
+    def test_equal_scores_share_a_rank(self):
+        for number in (1, 2):
+            record_end(self.create_score(number), 1, ['X', '9', '9'])
+        ranks = [rank for rank, _ in leaderboard.ranked(leaderboard.round_leaderboard(self.round))]
+        self.assertEqual(ranks, [1, 1])
+
+    def test_top_n_is_a_single_query(self):
+        for number in range(1, 6):
+            record_end(self.create_score(number), 1, [str(number), 'X', 'X'])
+        with self.assertNumQueries(1):
+            top = [entry.archer.last_name for entry in leaderboard.round_leaderboard(self.round, 3)]
+        self.assertEqual(top, ["Last5", "Last4", "Last3"])
+
+    def test_hand_entered_score_and_deactivation(self):
+        score = self.create_score(1)
+        score.score = 250
+        score.save()
+        entry = score.round_archer.leaderboard_entry
+        self.assertEqual(entry.total, 250)
+        score.is_active = False
+        score.save()
+        self.assertFalse(leaderboard.round_leaderboard(self.round).exists())
+
+    def test_competition_rolls_up_rounds(self):
+        other_round = Round.objects.create(name="Indoor 18 meter Round 2")
+        competition = Competition.objects.create(name="Winter League")
+        other_competition = Competition.objects.create(name="Club Championship")
+        CompetitionMembership.objects.create(competition=competition, round=self.round)
+        CompetitionMembership.objects.create(competition=competition, round=other_round)
+        CompetitionMembership.objects.create(competition=other_competition, round=self.round)
+
+        score = self.create_score(1)
+        record_end(score, 1, ['X', '10', '9'])
+        membership = RoundMembership.objects.create(round=other_round, archer=score.round_archer.archer)
+        record_end(Score.objects.create(round_archer=membership), 1, ['X', 'X', 'X'])
+
+        entry = leaderboard.competition_leaderboard(competition).get()
+        self.assertEqual((entry.total, entry.tens, entry.xs, entry.arrows), (59, 5, 4, 6))
+        entry = leaderboard.competition_leaderboard(other_competition).get()
+        self.assertEqual((entry.total, entry.tens, entry.xs), (29, 2, 1))
+
+    def test_admin_action_rebuilds_and_redirects(self):
+        score = self.create_score(1)
+        record_end(score, 1, ['X', '10', '9'])
+        leaderboard.LeaderboardEntry.objects.all().delete()
+        self.client.force_login(self.user)
+        response = self.client.post('/django-admin/modeling/round/', {
+            'action': 'scores_for_selected_rounds',
+            '_selected_action': [self.round.pk],
+        })
+        self.assertEqual(response.status_code, 302)
+        self.assertEqual(self.client.get(response.url).status_code, 200)
+        self.assertEqual(leaderboard.round_leaderboard(self.round).get().total, 29)
+
+
+class ChangelistQueryCountTests(ModelingTestCase):
+    """
+    A changelist page must cost the same number of queries for 2 rows as for 20.
+    """
+
+    urls = [
+        '/django-admin/modeling/archer/',
+        '/django-admin/modeling/clubmembership/',
+        '/django-admin/modeling/categorymembership/',
+        '/django-admin/modeling/disciplinemembership/',
+        '/django-admin/modeling/teammembership/',
+        '/django-admin/modeling/roundmembership/',
+        '/django-admin/modeling/competitionmembership/',
+        '/django-admin/modeling/score/',
+        '/django-admin/modeling/leaderboardentry/',
+        '/django-admin/modeling/competitionleaderboardentry/',
+        '/django-admin/archery_materials/bowtypemembership/',
+        '/admin/clubmembershiphook/',
+        '/admin/snippets/modeling/categorymembership/',
+        '/admin/snippets/modeling/disciplinemembership/',
+        '/admin/snippets/modeling/teammembership/',
+        '/admin/snippets/archery_materials/bowtypemembership/',
+    ]
+
+    @classmethod
+    def create_rows(cls, start, count):
+        from archery_materials.models import BowType, BowTypeMembership
+
+        for number in range(start, start + count):
+            suffix = f"{number}"
+            score = cls.create_score(number, Round.objects.create(name=f"Round {suffix}"))
+            record_end(score, 1, ['X', '10', '9'])
+            archer = score.round_archer.archer
+            ClubMembership.objects.create(club=Club.objects.create(name=f"Club {suffix}", town="Town"), archer=archer)
+            CategoryMembership.objects.create(
+                category=Category.objects.create(name=f"Category {suffix}"),
+                agegroup=AgeGroup.objects.create(name=f"Age Group {suffix}"),
+                archer=archer,
+            )
+            DisciplineMembership.objects.create(discipline=Discipline.objects.create(name=f"Discipline {suffix}"), archer=archer)
+            TeamMembership.objects.create(team=Team.objects.create(name=f"Team {suffix}"), archer=archer)
+            competition = Competition.objects.create(name=f"Competition {suffix}")
+            CompetitionMembership.objects.create(competition=competition, round=score.round_archer.round)
+            BowTypeMembership.objects.create(bowtype=BowType.objects.create(name=f"Bow Type {suffix}"), archer=archer)
+
+    def count_queries(self, url):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200, url)
+        return len(queries)
+
+    def test_changelists_do_not_query_per_row(self):
+        self.client.force_login(self.user)
+        self.create_rows(1, 2)
+        few = {url: self.count_queries(url) for url in self.urls}
+        self.create_rows(3, 18)
+        many = {url: self.count_queries(url) for url in self.urls}
+        self.assertEqual(few, many)
+
+
+class AdminAutocompleteTests(ModelingTestCase):
+    """
+    Foreign keys to large tables are chosen through the paginated admin autocomplete.
+    """
+
+    autocomplete_url = '/django-admin/autocomplete/'
+
+    def setUp(self):
+        self.client.force_login(self.user)
+
+    def autocomplete(self, term, page=1):
+        return self.client.get(self.autocomplete_url, {
+            'app_label': 'modeling',
+            'model_name': 'score',
+            'field_name': 'round_archer',
+            'term': term,
+            'page': page,
+        })
+
+    def test_score_form_does_not_render_every_membership(self):
+        for number in range(1, 31):
+            self.create_score(number)
+        response = self.client.get('/django-admin/modeling/score/add/')
+        self.assertContains(response, 'admin-autocomplete')
+        self.assertNotContains(response, 'Last30 First30')
+
+    def test_autocomplete_is_paginated_by_archer_name_and_union_number(self):
+        for number in range(1, 31):
+            self.create_score(number)
+        data = self.autocomplete('Last').json()
+        self.assertEqual(len(data['results']), 20)
+        self.assertTrue(data['pagination']['more'])
+        self.assertEqual(len(self.autocomplete('Last', page=2).json()['results']), 10)
+        results = self.autocomplete('17').json()['results']
+        self.assertEqual([r['text'] for r in results], [f"Last17 First17  - {self.round.name}"])
+
+    def test_autocomplete_queries_do_not_grow_with_results(self):
+        self.create_score(1)
+        with CaptureQueriesContext(connection) as few:
+            self.autocomplete('Last')
+        for number in range(2, 21):
+            self.create_score(number)
+        with CaptureQueriesContext(connection) as many:
+            self.autocomplete('Last')
+        self.assertEqual(len(few), len(many))
+
+    def test_search_is_case_insensitive_and_keeps_filters(self):
+        for number in range(1, 4):
+            self.create_score(number)
+        Archer.objects.filter(union_number=2).update(is_active=False)
+        response = self.client.get('/django-admin/modeling/archer/', {'q': 'last', 'is_active__exact': 1})
+        self.assertEqual(response.context['cl'].result_count, 2)
+        response = self.client.get('/django-admin/modeling/archer/', {'q': '2', 'is_active__exact': 1})
+        self.assertEqual(response.context['cl'].result_count, 0)
+        response = self.client.get('/django-admin/modeling/roundmembership/', {'q': 'first3', 'is_active__exact': 1})
+        self.assertEqual(response.context['cl'].result_count, 1)
+
+
+class ActivateActionTests(ModelingTestCase):
+    """
+    The activate and deactivate actions update() is_active and refresh the leaderboards themselves.
+    """
+
+    def setUp(self):
+        self.client.force_login(self.user)
+        self.competition = Competition.objects.create(name="Winter League")
+        self.competition_membership = CompetitionMembership.objects.create(competition=self.competition, round=self.round)
+        self.scores = [self.create_score(number) for number in (1, 2)]
+        for score in self.scores:
+            record_end(score, 1, ['X', '10', '9'])
+
+    def action(self, model, action, pk):
+        response = self.client.post(f'/django-admin/modeling/{model}/', {'action': action, '_selected_action': [pk]})
+        self.assertEqual(response.status_code, 302)
+
+    def entries(self):
+        return (
+            LeaderboardEntry.objects.filter(round=self.round).count(),
+            CompetitionLeaderboardEntry.objects.filter(competition=self.competition).count(),
+        )
+
+    def test_round_membership_actions(self):
+        membership = self.scores[0].round_archer
+        self.action('roundmembership', 'deactivate_round_memberships', membership.pk)
+        self.assertEqual(self.entries(), (1, 1))
+        self.action('roundmembership', 'activate_round_memberships', membership.pk)
+        self.assertEqual(self.entries(), (2, 2))
+
+    def test_score_actions(self):
+        self.action('score', 'deactivate_scores', self.scores[1].pk)
+        self.assertEqual(self.entries(), (1, 1))
+        self.action('score', 'activate_scores', self.scores[1].pk)
+        self.assertEqual(self.entries(), (2, 2))
+
+    def test_competition_membership_actions(self):
+        self.action('competitionmembership', 'deactivate_competition_memberships', self.competition_membership.pk)
+        self.assertEqual(self.entries(), (2, 0))
+        self.action('competitionmembership', 'activate_competition_memberships', self.competition_membership.pk)
+        self.assertEqual(self.entries(), (2, 2))
+
+
+class ScoreAdminTotalsTests(ModelingTestCase):
+    """
+    The totals of a Score with ends are the sum of its ends, not a hand edit.
+    """
+
+    def setUp(self):
+        self.client.force_login(self.user)
+
+    def form_data(self, score, **fields):
+        data = {
+            'round_archer': str(score.round_archer_id),
+            'score': 100,
+            'number_of_arrows': 30,
+            'author': self.user.pk,
+            'info': '',
+            'ends-TOTAL_FORMS': 1,
+            'ends-INITIAL_FORMS': 0,
+            'ends-MIN_NUM_FORMS': 0,
+            'ends-MAX_NUM_FORMS': 1000,
+            'ends-0-number': 1,
+            'ends-0-arrow_values': 'X 10 9',
+        }
+        data.update(fields)
+        return data
+
+    def test_hand_total_is_replaced_by_the_ends(self):
+        score = self.create_score(1)
+        response = self.client.post(f'/django-admin/modeling/score/{score.pk}/change/', self.form_data(score))
+        self.assertEqual(response.status_code, 302)
+        score.refresh_from_db()
+        self.assertEqual((score.score, score.tens, score.xs, score.number_of_arrows), (29, 2, 1, 3))
+        self.assertEqual(leaderboard.round_leaderboard(self.round).first().total, 29)
+
+    def test_totals_are_read_only_with_ends(self):
+        score = self.create_score(1)
+        record_end(score, 1, ['X', '10', '9'])
+        response = self.client.get(f'/django-admin/modeling/score/{score.pk}/change/')
+        self.assertNotContains(response, ' name="score"')
+        self.assertNotContains(response, 'name="number_of_arrows"')
+        response = self.client.get('/django-admin/modeling/score/')
+        self.assertNotContains(response, 'name="form-0-score"')
+
+
+class IndexTests(ModelingTestCase):
+
+    def test_archer_joins_a_round_once(self):
+        membership = self.create_score(1).round_archer
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            RoundMembership.objects.create(round=self.round, archer=membership.archer)
+
+    def test_default_ordering_does_not_join(self):
+        for model in (ClubMembership, CategoryMembership, DisciplineMembership, TeamMembership, RoundMembership, CompetitionMembership):
+            self.assertNotIn('JOIN', str(model.objects.all().query), model)
+
+    def test_explain_queries_command(self):
+        self.create_score(1)
+        out = StringIO()
+        call_command('explain_queries', repeat=1, stdout=out)
+        self.assertIn("Archers of a round", out.getvalue())
+
+
+class ExplainBeforeTests(TransactionTestCase):
+    # The database is copied, which SQLite cannot do inside the transaction of a TestCase
+
+    def test_explain_queries_before_leaves_the_database_alone(self):
+        out = StringIO()
+        call_command('explain_queries', before='0004', repeat=1, stdout=out)
+        self.assertIn("Before (modeling 0004_archer_name_index)", out.getvalue())
+        self.assertIn("After:", out.getvalue())
+        self.assertIn(
+            ('modeling', '0011_clubmembership_start_date_ordering'),
+            MigrationRecorder(connection).applied_migrations(),
+        )
+        self.assertIn(
+            'unique_archer_per_round',
+            connection.introspection.get_constraints(connection.cursor(), RoundMembership._meta.db_table),
+        )
+
+
+class ExportTests(ModelingTestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        club = Club.objects.create(name="De Roos")
+        for number, arrows in enumerate((['9', '9', '9'], ['X', '10', '9'], ['8', '8', '8']), start=1):
+            score = cls.create_score(number)
+            record_end(score, 1, arrows)
+            if number == 1:
+                ClubMembership.objects.create(club=club, archer=score.round_archer.archer)
+        cls.competition = Competition.objects.create(name="Winter League")
+        CompetitionMembership.objects.create(competition=cls.competition, round=cls.round)
+
+    def setUp(self):
+        self.client.force_login(self.user)
+
+    def export(self, url, action, pk):
+        return self.client.post(url, {'action': action, '_selected_action': [pk]})
+
+    def test_round_results_csv_is_streamed(self):
+        response = self.export('/django-admin/modeling/round/', 'export_rounds_csv', self.round.pk)
+        self.assertIsInstance(response, StreamingHttpResponse)
+        self.assertIn('attachment; filename="round-results-', response['Content-Disposition'])
+        lines = b''.join(response.streaming_content).decode().splitlines()
+        self.assertEqual(lines[0], 'Round,Date,Last name,First name,Union number,Club,Score,10s,Xs,Arrows')
+        self.assertEqual([line.split(',')[2] for line in lines[1:]], ['Last2', 'Last1', 'Last3'])
+        self.assertEqual(lines[2].split(',')[5:], ['De Roos', '27', '0', '0', '3'])
+
+    def test_competition_results_xlsx(self):
+        from openpyxl import load_workbook
+
+        response = self.export('/django-admin/modeling/competition/', 'export_competitions_xlsx', self.competition.pk)
+        self.assertEqual(response.status_code, 200)
+        sheet = load_workbook(BytesIO(b''.join(response.streaming_content))).active
+        rows = list(sheet.values)
+        self.assertEqual(rows[0][:2], ('Competition', 'Round'))
+        self.assertEqual(len(rows), 4)
+        self.assertEqual(rows[1][0], "Winter League")
+        self.assertEqual(rows[1][-4:], (29, 2, 1, 3))
+
+
+class ArcherImportTests(ModelingTestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        cls.club = Club.objects.create(name="De Roos")
+        cls.existing = cls.create_archer(100)
+
+    def test_upsert_on_union_number(self):
+        result = imports.import_archers([
+            "Union number;Last name;First name;Email;Club\n",
+            "100;Jansen;Anna;anna@example.com;de roos\n",
+            "101;Bakker;Bart;;De Roos\n",
+            "102;Visser;;not-an-email;Elsewhere\n",
+            "101;Bakker;Bart;;\n",
+        ])
+        self.assertEqual((result.rows, result.created, result.updated, result.memberships), (4, 1, 1, 2))
+        self.assertEqual([line for line, _ in result.errors], [4, 5])
+        self.assertIn("first_name", result.errors[0][1])
+        self.assertIn("unknown club", result.errors[0][1])
+
+        archer = Archer.objects.get(union_number=100)
+        self.assertEqual((archer.pk, archer.last_name, archer.email), (self.existing.pk, "Jansen", "anna@example.com"))
+        self.assertEqual(Archer.objects.get(union_number=101).slug, "bakker-101")
+        self.assertEqual(ClubMembership.objects.filter(club=self.club).count(), 2)
+
+        # Importing again updates the same rows, columns missing from the file are kept
+        result = imports.import_archers(["union_number,last_name,first_name,club\n", "100,Jansen,Anne,De Roos\n"])
+        self.assertEqual((result.created, result.updated, result.memberships), (0, 1, 0))
+        archer.refresh_from_db()
+        self.assertEqual((archer.first_name, archer.email), ("Anne", "anna@example.com"))
+        self.assertEqual(ClubMembership.objects.filter(club=self.club).count(), 2)
+
+    def test_missing_columns(self):
+        with self.assertRaisesMessage(imports.ImportFileError, "first_name"):
+            imports.import_archers(["union_number,last_name\n", "1,Jansen\n"])
+
+    def test_admin_upload_and_command(self):
+        self.client.force_login(self.user)
+        self.assertContains(self.client.get('/django-admin/modeling/archer/'), 'href="/django-admin/modeling/archer/import/"')
+        upload = SimpleUploadedFile("members.csv", "\ufeffunion_number,last_name,first_name\r\n7,Smit,Sem\r\n".encode())
+        response = self.client.post('/django-admin/modeling/archer/import/', {'file': upload})
+        self.assertContains(response, "1 archers created")
+        self.assertEqual(Archer.objects.get(union_number=7).author, self.user)
+
+        stdout, stderr = StringIO(), StringIO()
+        with tempfile.NamedTemporaryFile('w', suffix='.csv') as file:
+            file.write("union_number,last_name,first_name\n7,Smit,Sam\nx,Smit,Sam\n")
+            file.flush()
+            call_command('import_archers', file.name, stdout=stdout, stderr=stderr)
+        self.assertIn("0 archers created, 1 updated, 0 unchanged", stdout.getvalue())
+        self.assertIn("line 3: union_number", stderr.getvalue())
+
+
+class ScoreImportTests(ModelingTestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        cls.archers = [cls.create_archer(number) for number in (1, 2, 3)]
+        cls.entered = Score.objects.create(
+            round_archer=RoundMembership.objects.create(round=cls.round, archer=cls.archers[0]),
+            score=250, tens=5, xs=1, number_of_arrows=30,
+        )
+
+    def results(self, *rows):
+        return ["Bib;Round;Total;10s;X\n", *(f"{row}\n" for row in rows)]
+
+    def test_dry_run_reports_differences_without_writing(self):
+        lines = self.results(
+            "1;Indoor 18 meter Round 1;260;6;2",
+            "2;indoor 18 meter round 1;280;10;3",
+            "3;Unknown Round;280;10;3",
+            "4;Indoor 18 meter Round 1;999;10;3",
+        )
+        result = imports.import_scores(lines, dry_run=True)
+        self.assertEqual([(c.line, c.kind) for c in result.changes], [(2, '~'), (3, '+')])
+        self.assertEqual(str(result.changes[0]), "~ line 2: Indoor 18 meter Round 1 - Last1 First1 (1): 250/5/1 -> 260/6/2 in 30 arrows")
+        self.assertEqual([line for line, _ in result.errors], [4, 5])
+        self.assertIn("unknown round", result.errors[0][1])
+        self.assertIn("no archer", result.errors[1][1])
+        self.assertEqual(result.memberships, 1)
+        self.entered.refresh_from_db()
+        self.assertEqual(self.entered.score, 250)
+        self.assertEqual(Score.objects.count(), 1)
+
+    def test_import_writes_in_bulk_and_refreshes_leaderboard(self):
+        lines = self.results(
+            "1;Indoor 18 meter Round 1;260;6;2",
+            "2;Indoor 18 meter Round 1;280;10;3",
+            "3;Indoor 18 meter Round 1;270;8;3",
+        )
+        with self.assertNumQueries(22):
+            result = imports.import_scores(lines)
+        self.assertEqual((result.count('+'), result.count('~'), result.memberships), (2, 1, 2))
+        self.assertEqual(
+            [(entry.archer.union_number, entry.total) for entry in leaderboard.round_leaderboard(self.round)],
+            [(2, 280), (3, 270), (1, 260)],
+        )
+        # The same file again changes nothing
+        result = imports.import_scores(lines)
+        self.assertEqual(result.count('='), 3)
+
+    def test_score_kept_by_ends_is_not_overwritten(self):
+        score = self.create_score(9)
+        record_end(score, 1, ['X', '10', '9'])
+        result = imports.import_scores(["union_number,score\n", "9,100\n"], round_name=self.round.name)
+        self.assertIn("kept by its ends", result.errors[0][1])
+        score.refresh_from_db()
+        self.assertEqual(score.score, 29)
+
+    def test_command(self):
+        stdout = StringIO()
+        with tempfile.NamedTemporaryFile('w', suffix='.csv') as file:
+            file.writelines(self.results("2;Indoor 18 meter Round 1;280;10;3"))
+            file.flush()
+            call_command('import_scores', file.name, dry_run=True, stdout=stdout)
+        self.assertIn("+ line 2", stdout.getvalue())
+        self.assertIn("dry run: nothing written", stdout.getvalue())
+
+
+class StatisticsTests(ModelingTestCase):
+
+    def test_round_statistics(self):
+        from . import statistics
+
+        first = self.create_score(1)
+        record_end(first, 1, ['X', '10', '9'])
+        record_end(first, 2, ['9', '9', 'M'])
+        second = self.create_score(2)
+        record_end(second, 1, ['10', '10', '10'])
+        record_end(second, 3, ['X', '8'])
+        stats = statistics.round_statistics(self.round)
+
+        self.assertEqual(stats.codes.shape, (2, 3, 3))
+        rows = {row['score_id']: row for row in stats.rows()}
+        self.assertEqual(
+            [rows[first.pk][key] for key in ('total', 'tens', 'xs', 'nines', 'misses', 'arrows')],
+            [47, 2, 1, 3, 1, 6],
+        )
+        self.assertEqual(rows[first.pk]['running_totals'], [29, 47, 47])
+        self.assertEqual(rows[second.pk]['running_totals'], [30, 30, 48])
+        self.assertEqual([row['score_id'] for row in stats.rows()], [second.pk, first.pk])
+        self.assertAlmostEqual(rows[second.pk]['average'], 9.6)
+        self.assertAlmostEqual(rows[second.pk]['deviation'], 0.8)
+        self.assertEqual(rows[first.pk]['end_range'], 11)
+        self.assertAlmostEqual(rows[first.pk]['end_deviation'], 5.5)
+        self.assertEqual(stats.field_end_averages.tolist(), [29.5, 18.0, 18.0])
+        # The leaderboard keeps the same totals
+        self.assertEqual(leaderboard.round_leaderboard(self.round)[0].total, 48)
+
+    def test_competition_sums_per_archer(self):
+        from . import statistics
+
+        other_round = Round.objects.create(name="Indoor 18 meter Round 2", scoringsheet=self.sheet)
+        competition = Competition.objects.create(name="Winter League")
+        for round in (self.round, other_round):
+            CompetitionMembership.objects.create(competition=competition, round=round)
+        score = self.create_score(1)
+        record_end(score, 1, ['X', '10', '9'])
+        membership = RoundMembership.objects.create(round=other_round, archer=score.round_archer.archer)
+        record_end(Score.objects.create(round_archer=membership), 1, ['X', 'X', 'X'])
+
+        stats = statistics.competition_statistics(competition)
+        ids, totals, tens, xs, arrows = stats.archer_totals()
+        self.assertEqual(ids, [score.round_archer.archer_id])
+        self.assertEqual((totals.tolist(), tens.tolist(), xs.tolist(), arrows.tolist()), ([59], [5], [4], [6]))
+        self.assertEqual(len(statistics.round_statistics(Round.objects.create(name="Empty"))), 0)
+
+
+class PersonalBestTests(ModelingTestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        cls.archer = cls.create_archer(1)
+        cls.recurve = Discipline.objects.create(name="Recurve")
+        cls.barebow = Discipline.objects.create(name="Barebow")
+
+    def shoot(self, round, total, discipline=None):
+        membership = RoundMembership.objects.create(round=round, archer=self.archer, discipline=discipline)
+        return Score.objects.create(round_archer=membership, score=total, number_of_arrows=30)
+
+    def bests(self):
+        return {
+            (best.discipline.name if best.discipline else None, best.season): (best.total, best.round.name)
+            for best in personal_bests.for_archer(self.archer)
+        }
+
+    def test_bests_follow_score_writes(self):
+        self.round.start_date = date(2025, 11, 1)
+        self.round.save()
+        later = Round.objects.create(name="Indoor 18 meter Round 2", scoringsheet=self.sheet, start_date=date(2026, 1, 10))
+        first = self.shoot(self.round, 270, self.recurve)
+        second = self.shoot(later, 260, self.recurve)
+        self.shoot(Round.objects.create(name="Barebow Round", scoringsheet=self.sheet), 200, self.barebow)
+        self.assertEqual(self.bests(), {
+            ("Recurve", None): (270, "Indoor 18 meter Round 1"),
+            ("Recurve", 2025): (270, "Indoor 18 meter Round 1"),
+            ("Recurve", 2026): (260, "Indoor 18 meter Round 2"),
+            ("Barebow", None): (200, "Barebow Round"),
+        })
+
+        second.score = 280
+        second.save()
+        self.assertEqual(self.bests()[("Recurve", None)], (280, "Indoor 18 meter Round 2"))
+        # The best got worse, the other round holds it again
+        second.score = 265
+        second.save()
+        self.assertEqual(self.bests()[("Recurve", None)], (270, "Indoor 18 meter Round 1"))
+        first.is_active = False
+        first.save()
+        self.assertNotIn(("Recurve", 2025), self.bests())
+        # A round moved to another season takes its best along
+        later.start_date = date(2027, 1, 10)
+        later.save()
+        self.assertEqual(set(self.bests()), {("Recurve", None), ("Recurve", 2027), ("Barebow", None)})
+
+    def test_rebuild_command(self):
+        self.shoot(self.round, 250)
+        PersonalBest.objects.all().delete()
+        out = StringIO()
+        call_command('rebuild_personal_bests', stdout=out)
+        self.assertIn("1 personal bests written", out.getvalue())
+        self.assertEqual(self.bests(), {(None, None): (250, self.round.name)})
+
+    def test_profile_pages_read_bests_in_one_query(self):
+        for number in range(1, 6):
+            round = Round.objects.create(name=f"Round {number}", scoringsheet=self.sheet, start_date=date(2020 + number, 1, 1))
+            self.shoot(round, 200 + number, self.recurve)
+        with self.assertNumQueries(1):
+            rows = [(best.scoringsheet.name, best.discipline.name, best.round.name) for best in personal_bests.for_archer(self.archer)]
+        self.assertEqual(len(rows), 6)
+
+        self.client.force_login(self.user)
+        for url in (
+            f'/django-admin/modeling/archer/{self.archer.pk}/change/',
+            f'/admin/snippets/modeling/archer/inspect/{self.archer.pk}/',
+        ):
+            response = self.client.get(url)
+            self.assertContains(response, "Round 5", msg_prefix=url)
+            self.assertContains(response, "205", msg_prefix=url)
+
+
+class HandicapTests(ModelingTestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        choice = TargetFaceNameChoice.objects.create(
+            name="Indoor Target Archery 40 cm 10-Zone",
+            environment="Indoor", discipline="Target Archery", targetsize="40 cm", keyfeature="10-Zone",
+        )
+        cls.sheet.distance = 18
+        cls.sheet.save()
+        cls.round.targetface = TargetFace.objects.create(name=choice.name)
+        cls.round.save()
+        for number, total in enumerate((298, 270, 100), start=1):
+            score = cls.create_score(number)
+            score.score, score.number_of_arrows = total, 30
+            score.save()
+
+    def test_table_lookup_inverts_the_score(self):
+        table = handicaps.round_table(self.round)
+        self.assertIs(table, handicaps.round_table(Round.objects.get(pk=self.round.pk)))
+        scores = [table.score(handicap, 60) for handicap in range(0, 151, 10)]
+        self.assertEqual(scores, sorted(scores, reverse=True))
+        for handicap in (0, 25, 50, 100):
+            score = table.score(handicap, 60)
+            self.assertLessEqual(table.handicap(score, 60), handicap)
+            self.assertGreater(table.handicap(score - 1, 60), handicap)
+        self.assertIsNone(table.handicap(0, 0))
+
+    def test_round_handicaps_and_adjusted_ranking(self):
+        results = handicaps.round_handicaps(self.round)
+        self.assertEqual([result.total for result in results], [298, 270, 100])
+        numbers = [result.handicap for result in results]
+        self.assertEqual(numbers, sorted(numbers))
+        self.assertEqual(results[0].classification, "Elite Master Bowman")
+        self.assertIsNone(results[2].classification)
+
+        archers = {result.archer_id: result.handicap for result in results}
+        ranking = handicaps.adjusted_ranking(self.round, archers)
+        # Shooting to handicap gives about the maximum score
+        for adjusted, entry in ranking:
+            self.assertAlmostEqual(adjusted, 300, delta=5)
+
+    def test_round_without_distance(self):
+        self.sheet.distance = None
+        self.sheet.save()
+        with self.assertRaises(handicaps.HandicapError):
+            handicaps.round_handicaps(Round.objects.get(pk=self.round.pk))
+
+
+class TeamTests(ModelingTestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        cls.men = Category.objects.create(name="Men")
+        cls.women = Category.objects.create(name="Women")
+        cls.teams = {}
+        number = 0
+        for name, results in (
+            ("Club A", [(280, cls.men), (270, cls.women), (260, cls.men), (100, cls.women)]),
+            ("Club B", [(275, cls.women), (275, cls.men), (250, cls.men)]),
+            ("Club C", [(290, cls.men), (280, cls.men)]),
+        ):
+            team = cls.teams[name] = Team.objects.create(name=name)
+            for total, category in results:
+                number += 1
+                archer = cls.create_archer(number)
+                TeamMembership.objects.create(team=team, archer=archer)
+                CategoryMembership.objects.create(archer=archer, category=category)
+                membership = RoundMembership.objects.create(round=cls.round, archer=archer, category=category)
+                Score.objects.create(round_archer=membership, score=total, number_of_arrows=30)
+
+    def summary(self, results):
+        return [(rank, result.team, result.total) for rank, result in teams.ranked(results)]
+
+    def test_best_three_count(self):
+        with self.assertNumQueries(1):
+            results = teams.round_teams(self.round)
+        self.assertEqual(self.summary(results), [(1, "Club A", 810), (2, "Club B", 800), (None, "Club C", 570)])
+        self.assertEqual(len(results[0].archer_ids), 3)
+        self.assertEqual(self.summary(teams.round_teams(self.round, size=2))[0], (1, "Club C", 570))
+
+    def test_inactive_members_and_teams_do_not_count(self):
+        TeamMembership.objects.filter(team=self.teams["Club A"], archer__union_number=1).update(is_active=False)
+        Team.objects.filter(name="Club C").update(is_active=False)
+        self.assertEqual(self.summary(teams.round_teams(self.round)), [(1, "Club B", 800), (2, "Club A", 630)])
+
+    def test_mixed_teams(self):
+        results = teams.round_teams(self.round, categories=[self.men.pk, self.women.pk])
+        self.assertEqual(self.summary(results), [(1, "Club A", 550), (1, "Club B", 550), (None, "Club C", 290)])
+
+    def test_competition_teams(self):
+        competition = Competition.objects.create(name="Indoor League")
+        CompetitionMembership.objects.create(competition=competition, round=self.round)
+        self.assertEqual(
+            self.summary(teams.competition_teams(competition, categories=[self.women.pk], per_category=2)),
+            [(1, "Club A", 370), (None, "Club B", 275)],
+        )
+
+    def test_competition_teams_count_an_archer_once(self):
+        competition = Competition.objects.create(name="Indoor League")
+        CompetitionMembership.objects.create(competition=competition, round=self.round)
+        # The 280 of Club A counts in Men, the category joined last, not in Women as well
+        archer = Archer.objects.get(union_number=1)
+        CategoryMembership.objects.create(archer=archer, category=self.women, created_at=timezone.now() - timedelta(days=1))
+        with self.assertNumQueries(1):
+            results = teams.competition_teams(competition, categories=[self.men.pk, self.women.pk])
+        self.assertEqual(self.summary(results), [(1, "Club A", 550), (1, "Club B", 550), (None, "Club C", 290)])
+        # Without the active Men membership it counts in Women
+        CategoryMembership.objects.filter(archer=archer, category=self.men).update(is_active=False)
+        self.assertEqual(
+            self.summary(teams.competition_teams(competition, categories=[self.women.pk], per_category=2)),
+            [(1, "Club A", 550), (None, "Club B", 275)],
+        )
+
+
+class BracketTests(ModelingTestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        cls.competition = Competition.objects.create(name="Indoor Championship")
+        CompetitionMembership.objects.create(competition=cls.competition, round=cls.round)
+        cls.seeds = {}
+        for seed in range(1, 7):
+            score = cls.create_score(seed)
+            score.score = 300 - seed
+            score.save()
+            cls.seeds[seed] = score.round_archer.archer_id
+
+    def setUp(self):
+        brackets.create_bracket(self.competition)
+
+    def match(self, slot):
+        return Match.objects.get(competition=self.competition, slot=slot)
+
+    def seeds_of(self, slot):
+        match = self.match(slot)
+        return (match.seed_a, match.seed_b)
+
+    def test_seeding_and_byes(self):
+        self.assertEqual(brackets.seed_order(8), [1, 8, 4, 5, 2, 7, 3, 6])
+        self.assertEqual(Match.objects.filter(competition=self.competition).count(), 8)
+        self.assertEqual(self.seeds_of(4), (1, None))
+        self.assertEqual(self.match(4).winner_id, self.seeds[1])
+        self.assertEqual(self.seeds_of(5), (4, 5))
+        # Seeds 1 and 2 go through to the semifinals on their byes
+        self.assertEqual(self.seeds_of(2), (1, None))
+        self.assertEqual(self.seeds_of(3), (2, None))
+        with self.assertRaises(brackets.BracketError):
+            brackets.create_bracket(self.competition, size=16)
+
+    def test_set_points_and_shoot_off(self):
+        match = self.match(5)
+        brackets.record_match(match, [(28, 27), (29, 29), (27, 28)])
+        self.assertEqual((match.set_points_a, match.set_points_b, match.winner_id), (3, 3, None))
+        brackets.record_match(match, [(28, 27), (29, 29), (27, 28), (26, 26), (29, 29)], shoot_off='a')
+        self.assertEqual((match.set_points_a, match.set_points_b, match.winner_id), (6, 5, self.seeds[4]))
+        with self.assertRaises(brackets.BracketError):
+            brackets.record_match(match, [(28, 27), (29, 27), (30, 28), (27, 26)])
+        with self.assertRaises(brackets.BracketError):
+            brackets.record_match(match, [(28, 27)], shoot_off='b')
+        with self.assertRaises(brackets.BracketError):
+            brackets.parse_sets("28-31")
+        self.assertEqual(brackets.format_sets(brackets.parse_sets("28-27, 29:29")), "28-27 29-29")
+
+    def test_winners_advance_along_their_path(self):
+        match = self.match(5)
+        with self.assertNumQueries(5):
+            brackets.record_match(match, [(28, 27), (29, 27), (30, 28)])
+        self.assertEqual(self.seeds_of(2), (1, 4))
+        brackets.record_match(self.match(7), [(20, 27), (21, 27), (22, 28)])
+        brackets.record_match(self.match(2), [(28, 27), (29, 27), (30, 28)])
+        brackets.record_match(self.match(3), [(28, 27), (29, 27), (30, 28)])
+        self.assertEqual(self.seeds_of(1), (1, 2))
+        self.assertEqual(self.seeds_of(0), (4, 6))
+
+        # A corrected quarterfinal clears the semifinal and what followed it
+        brackets.record_match(self.match(5), [(20, 27), (21, 27), (22, 28)])
+        self.assertEqual(self.seeds_of(2), (1, 5))
+        self.assertIsNone(self.match(2).winner_id)
+        self.assertEqual(self.seeds_of(1), (None, 2))
+        self.assertEqual(self.seeds_of(0), (None, 6))
+        self.assertEqual(self.match(3).winner_id, self.seeds[2])
+
+    def test_admin_saves_a_match_waiting_for_an_archer(self):
+        self.client.force_login(self.user)
+        match = self.match(2)
+        response = self.client.post(
+            f'/django-admin/modeling/match/{match.pk}/change/', {'set_values': '', 'shoot_off': 'a'},
+        )
+        self.assertEqual(response.status_code, 302)
+        self.assertEqual(self.match(2).shoot_off, 'a')
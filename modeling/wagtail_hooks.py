@@ -1,5 +1,6 @@
 from wagtail.admin.views.bulk_action import BulkAction
 from wagtail import hooks
+from wagtail.snippets.models import register_snippet
 from wagtail_modeladmin.options import ModelAdmin, ModelAdminGroup, modeladmin_register
 from django.utils.translation import gettext_lazy as _
 
@@ -17,3 +18,9 @@ from .models import (
     ScoringSheet,
 )
 
+from .admin import ModelingSnippetViewSetGroup
+
+# Registered with the Wagtail hooks rather than by the admin autodiscovery:
+# the snippet views are then built when the Wagtail admin is first loaded,
+# not by every django.setup() (manage.py commands, see "manage.py importtime").
+register_snippet(ModelingSnippetViewSetGroup)
@@ -11,8 +11,11 @@ https://docs.djangoproject.com/en/5.2/ref/settings/
 """
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
+import os
 from pathlib import Path
 
+from utils.db_utils import databases_from_env
+
 PROJECT_DIR = Path(__file__).resolve().parent.parent
 BASE_DIR = PROJECT_DIR.parent
 
@@ -70,6 +73,8 @@ INSTALLED_APPS = [
 SITE_ID = 1
 
 MIDDLEWARE = [
+    # Outermost, to measure everything below; off unless INSTRUMENTATION
+    "utils.instrumentation.InstrumentationMiddleware",
     "django.middleware.security.SecurityMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
     "django.middleware.common.CommonMiddleware",
@@ -104,17 +109,68 @@ TEMPLATES = [
 ]
 
 WSGI_APPLICATION = "scoring.wsgi.application"
+ASGI_APPLICATION = "scoring.asgi.application"
 
+# Live leaderboard push, see api.live
+# Use "api.live.RedisBroker" with OPTIONS {"url": ...} when running several workers
+LIVE_BROKER = {
+    "BACKEND": "api.live.InProcessBroker",
+}
 
-# Database
-# https://docs.djangoproject.com/en/5.2/ref/settings/#databases
-
-DATABASES = {
+# Rendered results pages, see api.cache. LocMemCache is per process; with
+# several workers use a shared backend so that every worker sees a write:
+#     "BACKEND": "django.core.cache.backends.redis.RedisCache",
+#     "LOCATION": "redis://localhost:6379/1",
+CACHES = {
     "default": {
-        "ENGINE": "django.db.backends.sqlite3",
-        "NAME": BASE_DIR / "db.sqlite3",
+        "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+        "LOCATION": "scoring",
+        "OPTIONS": {"MAX_ENTRIES": 10_000},
     }
 }
+RESULTS_CACHE = "default"
+RESULTS_CACHE_TIMEOUT = 300
+
+# Worker processes of the server, set by gunicorn.conf.py. With more than
+# one, the results cache and LIVE_BROKER must be shared, see api.checks.
+SERVER_WORKERS = int(os.environ.get("SERVER_WORKERS", 1))
+
+# Query count, SQL, template and total time per URL name in a Server-Timing
+# header and at /instrumentation/ (staff), see utils.instrumentation.
+# INSTRUMENTATION=1 turns it on. QUERY_BUDGETS are the most SQL queries a
+# request of the URL name may make; over budget is logged, or raised with
+# QUERY_BUDGETS_STRICT (the tests).
+INSTRUMENTATION = os.environ.get("INSTRUMENTATION") == "1"
+INSTRUMENTATION_SAMPLES = 1000
+QUERY_BUDGETS = {
+    "admin:modeling_score_changelist": 8,
+    "admin:modeling_score_change": 12,
+    "admin:modeling_roundmembership_changelist": 8,
+    "admin:modeling_leaderboardentry_changelist": 8,
+    "admin:modeling_competitionleaderboardentry_changelist": 8,
+    "admin:modeling_personalbest_changelist": 10,
+    "admin:modeling_archer_changelist": 8,
+    "api_round_leaderboard": 3,
+    "api_competition_leaderboard": 3,
+    "api_archer_profile": 3,
+}
+QUERY_BUDGETS_STRICT = False
+
+# New primary keys of the modeling and archery_materials tables are
+# time-ordered UUIDs (version 7) instead of random ones (version 4).
+# Keys then reveal their creation time. Existing rows can be rekeyed with
+# "manage.py rekey_uuids", see utils.uuid_utils.
+TIME_ORDERED_PRIMARY_KEYS = False
+
+
+# Database
+# https://docs.djangoproject.com/en/5.2/ref/settings/#databases
+
+# DATABASE_URL replaces the SQLite file, DATABASE_REPLICA_URL adds a read
+# replica for the results, see utils.db_utils
+DEFAULT_DATABASE_URL = f"sqlite:///{BASE_DIR / 'db.sqlite3'}"
+DATABASES = databases_from_env(DEFAULT_DATABASE_URL)
+DATABASE_ROUTERS = ["utils.db_utils.PrimaryReplicaRouter"]
 
 
 # Password validation
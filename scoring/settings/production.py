@@ -1,13 +1,46 @@
+import os
+
 from .base import *
 
 DEBUG = False
 
+# Left empty here, Django refuses to start until DJANGO_SECRET_KEY or local.py sets it
+SECRET_KEY = os.environ.get("DJANGO_SECRET_KEY", "")
+ALLOWED_HOSTS = [host for host in os.environ.get("DJANGO_ALLOWED_HOSTS", "").split(",") if host]
+
+# Development tools are not loaded by the servers and production commands,
+# see "manage.py importtime". AutoSlugField is imported from
+# django_extensions without the app.
+DEV_APPS = ["django_extensions", "fill_db"]
+INSTALLED_APPS = [app for app in INSTALLED_APPS if app not in DEV_APPS]
+
 # ManifestStaticFilesStorage is recommended in production, to prevent
 # outdated JavaScript / CSS assets being served from cache
 # (e.g. after a Wagtail upgrade).
 # See https://docs.djangoproject.com/en/5.2/ref/contrib/staticfiles/#manifeststaticfilesstorage
 STORAGES["staticfiles"]["BACKEND"] = "django.contrib.staticfiles.storage.ManifestStaticFilesStorage"
 
+# Keep database connections open for a minute instead of connecting on every
+# request; DATABASE_CONN_MAX_AGE or a DATABASE_POOL_MAX_SIZE override this.
+# SQLite runs in the tuned mode (write-ahead log, see utils.db_utils) unless
+# SQLITE_TUNED=0.
+DATABASES = databases_from_env(DEFAULT_DATABASE_URL, conn_max_age=60, tuned_sqlite=True)
+
+# The server workers share the results cache and the live leaderboard
+# broker through Redis. Without REDIS_URL both are per process and
+# gunicorn.conf.py starts a single worker.
+REDIS_URL = os.environ.get("REDIS_URL", "")
+if REDIS_URL:
+    CACHES["default"] = {
+        "BACKEND": "django.core.cache.backends.redis.RedisCache",
+        "LOCATION": REDIS_URL,
+        "KEY_PREFIX": "scoring",
+    }
+    LIVE_BROKER = {
+        "BACKEND": "api.live.RedisBroker",
+        "OPTIONS": {"url": REDIS_URL},
+    }
+
 try:
     from .local import *
 except ImportError:
@@ -7,17 +7,20 @@ from wagtail import urls as wagtail_urls
 from wagtail.documents import urls as wagtaildocs_urls
 
 from search import views as search_views
+from utils.views import instrumentation_stats
 
 urlpatterns = [
     path("django-admin/", admin.site.urls),
     path("admin/", include(wagtailadmin_urls)),
     path("documents/", include(wagtaildocs_urls)),
     path("search/", search_views.search, name="search"),
+    path("instrumentation/", instrumentation_stats, name="instrumentation_stats"),
 ]
 
 urlpatterns = urlpatterns + [
     path('accounts/', include('allauth.urls')),
     path('accounts/', include('userauth.urls')),
+    path('api/', include('api.urls')),
 ]
 
 if settings.DEBUG:
@@ -0,0 +1,163 @@
+"""
+Per-view request instrumentation: SQL queries, SQL time, template time and
+total latency, by URL name.
+
+``InstrumentationMiddleware`` is in MIDDLEWARE and only runs with
+``INSTRUMENTATION = True`` (environment variable INSTRUMENTATION=1). Every
+response then carries a Server-Timing header, which the network panel of
+the browser shows, and the request is added to ``stats``: the last
+INSTRUMENTATION_SAMPLES requests per URL name of this process. Staff read
+them as JSON at /instrumentation/.
+
+QUERY_BUDGETS maps URL names to the most SQL queries their requests may
+make, e.g. ``{"admin:modeling_score_changelist": 12}``. A request over
+budget is logged, and raises QueryBudgetExceeded with
+``QUERY_BUDGETS_STRICT = True``, so that the tests requesting the page
+fail.
+
+The SQL time is the time spent executing the queries; fetching the rows
+afterwards counts as view time. The template time is the rendering of a
+TemplateResponse, e.g. the admin pages; a template rendered inside a view
+counts as view time.
+"""
+import logging
+import statistics
+import threading
+import time
+from collections import defaultdict, deque
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_SAMPLES = 1000
+
+
+class QueryBudgetExceeded(AssertionError):
+    """A request made more SQL queries than the budget of its view."""
+
+
+class QueryRecorder:
+    """Database execute wrapper counting the queries and their time."""
+
+    def __init__(self):
+        self.queries = 0
+        self.seconds = 0.0
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.seconds += time.perf_counter() - start
+            self.queries += 1
+
+
+class ViewStats:
+    """Rolling samples per URL name, shared by the threads of the process.
+
+    A sample is (total ms, queries, SQL ms, template ms).
+    """
+
+    def __init__(self, samples=DEFAULT_SAMPLES):
+        self.samples = samples
+        self.lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self.lock:
+            self.views = defaultdict(lambda: deque(maxlen=self.samples))
+            self.requests = defaultdict(int)
+            self.over_budget = defaultdict(int)
+
+    def add(self, name, sample, over_budget=False):
+        with self.lock:
+            self.views[name].append(sample)
+            self.requests[name] += 1
+            self.over_budget[name] += over_budget
+
+    def summary(self):
+        """Statistics per URL name over its samples, slowest median first."""
+        with self.lock:
+            views = {name: list(samples) for name, samples in self.views.items()}
+            requests, over_budget = dict(self.requests), dict(self.over_budget)
+        result = []
+        for name, samples in views.items():
+            totals = sorted(sample[0] for sample in samples)
+            queries = [sample[1] for sample in samples]
+            result.append({
+                'view': name,
+                'requests': requests[name],
+                'samples': len(samples),
+                'median_ms': round(statistics.median(totals), 2),
+                'p95_ms': round(totals[min(int(len(totals) * 0.95), len(totals) - 1)], 2),
+                'queries_mean': round(statistics.fmean(queries), 1),
+                'queries_max': max(queries),
+                'sql_ms_mean': round(statistics.fmean(sample[2] for sample in samples), 2),
+                'template_ms_mean': round(statistics.fmean(sample[3] for sample in samples), 2),
+                'budget': budget_of(name),
+                'over_budget': over_budget[name],
+            })
+        return sorted(result, key=lambda row: -row['median_ms'])
+
+
+stats = ViewStats(getattr(settings, 'INSTRUMENTATION_SAMPLES', DEFAULT_SAMPLES))
+
+
+def budget_of(name):
+    return getattr(settings, 'QUERY_BUDGETS', {}).get(name)
+
+
+def server_timing(queries, sql_ms, template_ms, total_ms):
+    return (
+        f'sql;dur={sql_ms:.1f};desc="{queries} queries", '
+        f'template;dur={template_ms:.1f}, '
+        f'total;dur={total_ms:.1f}'
+    )
+
+
+class InstrumentationMiddleware:
+    """Measure every request, see the module docstring. Put it first in MIDDLEWARE."""
+
+    def __init__(self, get_response):
+        if not getattr(settings, 'INSTRUMENTATION', False):
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+
+    def __call__(self, request):
+        recorder = QueryRecorder()
+        request._template_seconds = 0.0
+        start = time.perf_counter()
+        with ExitStack() as stack:
+            for connection in connections.all():
+                stack.enter_context(connection.execute_wrapper(recorder))
+            response = self.get_response(request)
+        total_ms = (time.perf_counter() - start) * 1000
+        sql_ms = recorder.seconds * 1000
+        template_ms = request._template_seconds * 1000
+
+        match = request.resolver_match
+        name = match.view_name if match else '(unresolved)'
+        budget = budget_of(name)
+        over_budget = budget is not None and recorder.queries > budget
+        stats.add(name, (total_ms, recorder.queries, sql_ms, template_ms), over_budget)
+        response.headers['Server-Timing'] = server_timing(recorder.queries, sql_ms, template_ms, total_ms)
+        if over_budget:
+            message = f"{name} made {recorder.queries} SQL queries, its budget is {budget}"
+            if getattr(settings, 'QUERY_BUDGETS_STRICT', False):
+                raise QueryBudgetExceeded(message)
+            logger.warning(message)
+        return response
+
+    def process_template_response(self, request, response):
+        # Called right before the response is rendered, the callback right after
+        start = time.perf_counter()
+
+        def rendered(response):
+            request._template_seconds += time.perf_counter() - start
+
+        response.add_post_render_callback(rendered)
+        return response
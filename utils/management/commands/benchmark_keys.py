@@ -0,0 +1,120 @@
+"""
+Compare random (version 4) and time-ordered (version 7) primary keys.
+
+    python manage.py benchmark_keys --rows 1000000
+
+For each key scheme a scratch table shaped like ``scores`` is created,
+filled with synthetic scores in batches and measured: insert throughput
+and the size of the table and its indexes. The scratch tables are dropped
+afterwards.
+"""
+import random
+import time
+import uuid
+
+from django.apps.registry import Apps
+from django.core.management.base import BaseCommand
+from django.db import DEFAULT_DB_ALIAS, DatabaseError, connections, models, transaction
+from django.utils import timezone
+
+from utils.uuid_utils import uuid7
+
+SCHEMES = {
+    'uuid4': uuid.uuid4,
+    'uuid7': uuid7,
+}
+
+
+def synthetic_score_model(scheme):
+    class Meta:
+        apps = Apps()
+        app_label = 'utils'
+        db_table = f'benchmark_scores_{scheme}'
+        indexes = [
+            models.Index(fields=['round_archer', 'is_active'], name=f'benchmark_{scheme}_idx'),
+        ]
+
+    return type(f'BenchmarkScore{scheme}', (models.Model,), {
+        '__module__': __name__,
+        'Meta': Meta,
+        'id': models.UUIDField(primary_key=True),
+        'round_archer': models.UUIDField(),
+        'score': models.PositiveIntegerField(),
+        'is_active': models.BooleanField(default=True),
+        'created_at': models.DateTimeField(),
+    })
+
+
+def storage_size(connection, table):
+    """Return (table bytes, index bytes), None when the backend cannot tell."""
+    with connection.cursor() as cursor:
+        try:
+            if connection.vendor == 'postgresql':
+                cursor.execute("SELECT pg_table_size(%s), pg_indexes_size(%s)", [table, table])
+                return tuple(cursor.fetchone())
+            if connection.vendor == 'sqlite':
+                cursor.execute(
+                    "SELECT SUM(CASE WHEN name = %s THEN pgsize ELSE 0 END), "
+                    "SUM(CASE WHEN name != %s THEN pgsize ELSE 0 END) FROM dbstat "
+                    "WHERE name = %s OR name IN (SELECT name FROM sqlite_master WHERE type = 'index' AND tbl_name = %s)",
+                    [table, table, table, table],
+                )
+                return tuple(cursor.fetchone())
+        except DatabaseError:
+            pass
+    return None
+
+
+def megabytes(size):
+    return f"{size / 1024 / 1024:.1f} MB"
+
+
+class Command(BaseCommand):
+    help = 'Benchmark inserts and index size of random against time-ordered primary keys'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=1_000_000)
+        parser.add_argument('--batch-size', type=int, default=5000)
+        parser.add_argument('--memberships', type=int, default=100_000, help='Distinct round_archer values')
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument('--database', default=DEFAULT_DB_ALIAS)
+
+    def handle(self, *args, **options):
+        connection = connections[options['database']]
+        rng = random.Random(options['seed'])
+        memberships = [uuid.UUID(int=rng.getrandbits(128), version=4) for _ in range(options['memberships'])]
+        for scheme, make_key in SCHEMES.items():
+            model = synthetic_score_model(scheme)
+            with connection.schema_editor() as editor:
+                editor.create_model(model)
+            try:
+                elapsed = self.fill(model, make_key, memberships, rng, options)
+                self.report(connection, model, scheme, options['rows'], elapsed)
+            finally:
+                with connection.schema_editor() as editor:
+                    editor.delete_model(model)
+
+    def fill(self, model, make_key, memberships, rng, options):
+        rows, batch_size, using = options['rows'], options['batch_size'], options['database']
+        now = timezone.now()
+        start = time.perf_counter()
+        for offset in range(0, rows, batch_size):
+            batch = [
+                model(
+                    id=make_key(),
+                    round_archer=rng.choice(memberships),
+                    score=rng.randint(0, 300),
+                    created_at=now,
+                )
+                for _ in range(min(batch_size, rows - offset))
+            ]
+            with transaction.atomic(using=using):
+                model.objects.using(using).bulk_create(batch)
+        return time.perf_counter() - start
+
+    def report(self, connection, model, scheme, rows, elapsed):
+        line = f"{scheme}: {rows} rows in {elapsed:.1f} s ({rows / elapsed:.0f} rows/s)"
+        size = storage_size(connection, model._meta.db_table)
+        if size and None not in size:
+            line += f", table {megabytes(size[0])}, indexes {megabytes(size[1])}"
+        self.stdout.write(self.style.SUCCESS(line))
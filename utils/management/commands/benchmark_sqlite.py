@@ -0,0 +1,171 @@
+"""
+Concurrent score entry and leaderboard reads on SQLite, shipped against tuned.
+
+    python manage.py benchmark_sqlite --writers 4 --readers 8 --seconds 10
+
+For each mode the SQLite file of the default alias is copied with the
+backup API and opened under its own alias:
+
+* shipped: Django's defaults, a rollback journal, deferred transactions
+  and the 5 second timeout of the sqlite3 module;
+* tuned: utils.db_utils.sqlite_options, the write-ahead log and pragmas.
+
+Writer threads add an end to a random score of the busiest round, the
+score and its leaderboard entry in one transaction, like the end entry of
+a tablet. Reader threads read the top 50 scores of that round. The copies
+are removed afterwards.
+"""
+import random
+import shutil
+import sqlite3
+import statistics
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DEFAULT_DB_ALIAS, OperationalError, connections, transaction
+from django.db.models import Count, F
+
+from modeling.models import LeaderboardEntry, RoundMembership, Score
+from utils.db_utils import sqlite_options
+
+MODES = {
+    'shipped': {},
+    'tuned': sqlite_options(),
+}
+
+
+def copy_database(source, target, journal_mode):
+    db, copy = sqlite3.connect(source), sqlite3.connect(target)
+    try:
+        db.backup(copy)
+        copy.execute(f"PRAGMA journal_mode={journal_mode}")
+    finally:
+        db.close()
+        copy.close()
+
+
+def percentile(values, fraction):
+    if not values:
+        return float('nan')
+    values = sorted(values)
+    return values[min(int(len(values) * fraction), len(values) - 1)]
+
+
+class Worker(threading.Thread):
+
+    def __init__(self, alias, operation, stop, seed):
+        super().__init__(daemon=True)
+        self.alias = alias
+        self.operation = operation
+        self.stop = stop
+        self.rng = random.Random(seed)
+        self.latencies = []
+        self.locked = 0
+
+    def run(self):
+        try:
+            while not self.stop.is_set():
+                start = time.perf_counter()
+                try:
+                    self.operation(self.alias, self.rng)
+                except OperationalError:
+                    # database is locked: the timeout ran out waiting for another connection
+                    self.locked += 1
+                else:
+                    self.latencies.append(time.perf_counter() - start)
+        finally:
+            connections[self.alias].close()
+
+
+class Command(BaseCommand):
+    help = 'Benchmark concurrent score writes and reads on SQLite with and without the tuned mode'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--writers', type=int, default=4)
+        parser.add_argument('--readers', type=int, default=8)
+        parser.add_argument('--seconds', type=float, default=10)
+        parser.add_argument('--mode', choices=sorted(MODES), action='append', help='Default: every mode')
+        parser.add_argument('--seed', type=int, default=0)
+
+    def handle(self, *args, **options):
+        settings_dict = connections[DEFAULT_DB_ALIAS].settings_dict
+        if connections[DEFAULT_DB_ALIAS].vendor != 'sqlite':
+            raise CommandError("The default database is not SQLite.")
+        busiest = (
+            RoundMembership.objects
+            .filter(score_round_archer__isnull=False)
+            .values('round_id')
+            .annotate(scores=Count('score_round_archer'))
+            .order_by('-scores')
+            .first()
+        )
+        if busiest is None:
+            raise CommandError("There are no scores to write to.")
+        round_id = busiest['round_id']
+        memberships = list(
+            Score.objects.filter(round_archer__round_id=round_id).values_list('id', 'round_archer_id')
+        )
+        self.stdout.write(
+            f"{options['writers']} writers, {options['readers']} readers, {options['seconds']:.0f} s per mode, "
+            f"round with {len(memberships)} scores"
+        )
+
+        def write(alias, rng):
+            score_id, membership_id = rng.choice(memberships)
+            points = rng.randint(0, 30)
+            with transaction.atomic(using=alias):
+                Score.objects.using(alias).filter(pk=score_id).update(
+                    score=F('score') + points, number_of_arrows=F('number_of_arrows') + 3,
+                )
+                LeaderboardEntry.objects.using(alias).filter(round_archer_id=membership_id).update(
+                    total=F('total') + points, arrows=F('arrows') + 3,
+                )
+
+        def read(alias, rng):
+            list(
+                Score.objects.using(alias)
+                .filter(round_archer__round_id=round_id, is_active=True)
+                .order_by('-score', '-tens', '-xs')
+                .values_list('round_archer__archer__last_name', 'score')[:50]
+            )
+
+        directory = Path(tempfile.mkdtemp(prefix='benchmark_sqlite_'))
+        try:
+            for mode in options['mode'] or list(MODES):
+                alias = f'benchmark_{mode}'
+                name = directory / f'{mode}.sqlite3'
+                copy_database(settings_dict['NAME'], name, 'WAL' if mode == 'tuned' else 'DELETE')
+                connections.settings[alias] = {**settings_dict, 'NAME': str(name), 'OPTIONS': MODES[mode]}
+                try:
+                    self.run_mode(mode, alias, write, read, options)
+                finally:
+                    del connections.settings[alias]
+        finally:
+            shutil.rmtree(directory, ignore_errors=True)
+
+    def run_mode(self, mode, alias, write, read, options):
+        stop = threading.Event()
+        seed = options['seed']
+        writers = [Worker(alias, write, stop, seed + i) for i in range(options['writers'])]
+        readers = [Worker(alias, read, stop, seed + 1000 + i) for i in range(options['readers'])]
+        for worker in writers + readers:
+            worker.start()
+        time.sleep(options['seconds'])
+        stop.set()
+        for worker in writers + readers:
+            worker.join()
+
+        seconds = options['seconds']
+        lines = [mode]
+        for kind, workers in (('writes', writers), ('reads', readers)):
+            latencies = [latency for worker in workers for latency in worker.latencies]
+            locked = sum(worker.locked for worker in workers)
+            lines.append(
+                f"  {kind}: {len(latencies) / seconds:8.0f}/s, "
+                f"median {statistics.median(latencies) * 1000 if latencies else float('nan'):7.2f} ms, "
+                f"p99 {percentile(latencies, 0.99) * 1000:8.2f} ms, locked {locked}"
+            )
+        self.stdout.write(self.style.SUCCESS('\n'.join(lines)))
@@ -0,0 +1,114 @@
+"""
+Import time of the project, from ``python -X importtime``, as a ranked report.
+
+    python manage.py importtime --target wsgi --by package
+    python manage.py importtime --settings scoring.settings.production --target manage
+
+The target runs in a fresh interpreter with the settings of this command:
+
+* setup: django.setup(), what every manage.py command pays;
+* wsgi: the WSGI application and its URLconf, what a worker loads before
+  its first request;
+* manage: "manage.py help", which also loads every management command.
+
+The report ranks modules by their own import time (--by self), by the
+time including what they import (--by cumulative) or sums the own time
+per top-level package (--by package). The wall time is the median of
+--repeat runs, so that settings can be compared by it.
+"""
+import os
+import re
+import statistics
+import subprocess
+import sys
+import time
+from collections import defaultdict, namedtuple
+from pathlib import Path
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+Import = namedtuple('Import', ['module', 'self', 'cumulative', 'depth'])
+
+# import time:       232 |        232 |     django_extensions.db
+LINE = re.compile(r'^import time:\s+(\d+) \|\s+(\d+) \|( +)(\S+)$')
+
+TARGETS = {
+    'setup': ['-c', 'import django; django.setup()'],
+    'wsgi': [
+        '-c',
+        'from django.core.wsgi import get_wsgi_application; get_wsgi_application(); '
+        'from django.urls import get_resolver; get_resolver().url_patterns',
+    ],
+    'manage': ['manage.py', 'help'],
+}
+
+
+def parse_importtime(text):
+    """Imports of the stderr of ``python -X importtime``, times in microseconds."""
+    imports = []
+    for line in text.splitlines():
+        match = LINE.match(line)
+        if match:
+            imports.append(Import(match[4], int(match[1]), int(match[2]), (len(match[3]) - 1) // 2))
+    return imports
+
+
+def by_package(imports):
+    """(package, own time, modules) per top-level package, slowest first."""
+    totals, modules = defaultdict(int), defaultdict(int)
+    for item in imports:
+        package = item.module.split('.')[0]
+        totals[package] += item.self
+        modules[package] += 1
+    return sorted(((package, totals[package], modules[package]) for package in totals), key=lambda row: -row[1])
+
+
+class Command(BaseCommand):
+    help = 'Report the import time of django.setup(), the WSGI application or manage.py'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--target', choices=sorted(TARGETS), default='wsgi')
+        parser.add_argument('--by', choices=['self', 'cumulative', 'package'], default='cumulative')
+        parser.add_argument('--limit', type=int, default=25)
+        parser.add_argument('--repeat', type=int, default=5, help='Runs for the wall time; the report is of the last')
+
+    def run(self, target):
+        environ = {**os.environ, 'DJANGO_SETTINGS_MODULE': settings.SETTINGS_MODULE}
+        start = time.perf_counter()
+        process = subprocess.run(
+            [sys.executable, '-X', 'importtime', *TARGETS[target]],
+            cwd=Path(settings.BASE_DIR),
+            env=environ,
+            capture_output=True,
+            text=True,
+        )
+        elapsed = time.perf_counter() - start
+        if process.returncode:
+            raise CommandError(f"The {target} target failed:\n{process.stderr[-2000:]}")
+        return elapsed, parse_importtime(process.stderr)
+
+    def handle(self, *args, **options):
+        walls = []
+        for _ in range(max(options['repeat'], 1)):
+            wall, imports = self.run(options['target'])
+            walls.append(wall)
+        total = sum(item.self for item in imports)
+        self.stdout.write(
+            f"{settings.SETTINGS_MODULE}, {options['target']}: wall {statistics.median(walls) * 1000:.0f} ms "
+            f"(median of {len(walls)}), imports {total / 1000:.0f} ms in {len(imports)} modules"
+        )
+
+        limit = options['limit']
+        if options['by'] == 'package':
+            rows = [
+                f"{own / 1000:9.1f} ms {own / max(total, 1):6.1%} {count:5d} modules  {package}"
+                for package, own, count in by_package(imports)[:limit]
+            ]
+        else:
+            ranked = sorted(imports, key=lambda item: -getattr(item, options['by']))[:limit]
+            rows = [
+                f"{item.self / 1000:9.1f} ms self {item.cumulative / 1000:9.1f} ms cumulative  {item.module}"
+                for item in ranked
+            ]
+        self.stdout.write('\n'.join(rows))
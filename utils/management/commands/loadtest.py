@@ -0,0 +1,151 @@
+"""
+Load test of a running server: the results API and the admin changelists.
+
+    gunicorn &
+    python manage.py loadtest --url http://127.0.0.1:8000 --concurrency 16 --seconds 20
+
+The pages are picked from the database the command is configured with,
+which must be the one the server uses: the round with the most scores, its
+competition and the best archer of that round. The admin pages are read as
+the first active superuser, logged in through a session created here.
+
+Every thread keeps one HTTP/1.1 connection open, so the keep-alive and
+worker settings of the server (gunicorn.conf.py) are what is measured.
+Requests per second, median and p99 latency and errors are printed per
+page.
+"""
+import http.client
+import statistics
+import threading
+import time
+from collections import defaultdict
+from urllib.parse import urlsplit
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db.models import Count
+from django.test import Client
+from django.urls import reverse
+
+from modeling.models import CompetitionMembership, LeaderboardEntry, RoundMembership
+
+from .benchmark_sqlite import percentile
+
+ADMIN_PAGES = (
+    'admin:modeling_leaderboardentry_changelist',
+    'admin:modeling_score_changelist',
+    'admin:modeling_archer_changelist',
+)
+
+
+def session_cookie():
+    """Session cookie of the first active superuser, None without one."""
+    user = get_user_model().objects.filter(is_superuser=True, is_active=True).order_by('pk').first()
+    if user is None:
+        return None
+    client = Client()
+    client.force_login(user)
+    return f"{settings.SESSION_COOKIE_NAME}={client.cookies[settings.SESSION_COOKIE_NAME].value}"
+
+
+class Worker(threading.Thread):
+
+    def __init__(self, url, pages, stop, offset):
+        super().__init__(daemon=True)
+        parts = urlsplit(url)
+        self.connection_class = http.client.HTTPSConnection if parts.scheme == 'https' else http.client.HTTPConnection
+        self.netloc = parts.netloc
+        self.pages = pages
+        self.stop = stop
+        self.offset = offset
+        self.latencies = defaultdict(list)
+        self.errors = defaultdict(int)
+
+    def run(self):
+        connection = self.connection_class(self.netloc, timeout=30)
+        number = self.offset
+        try:
+            while not self.stop.is_set():
+                name, path, headers = self.pages[number % len(self.pages)]
+                number += 1
+                start = time.perf_counter()
+                try:
+                    connection.request('GET', path, headers=headers)
+                    response = connection.getresponse()
+                    response.read()
+                except (OSError, http.client.HTTPException):
+                    # The server closed the connection (worker restart, keep-alive timeout)
+                    self.errors[name] += 1
+                    connection.close()
+                    continue
+                if response.status == 200:
+                    self.latencies[name].append(time.perf_counter() - start)
+                else:
+                    self.errors[name] += 1
+        finally:
+            connection.close()
+
+
+class Command(BaseCommand):
+    help = 'Load test the results API and the admin changelists of a running server'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--url', default='http://127.0.0.1:8000')
+        parser.add_argument('--concurrency', type=int, default=8)
+        parser.add_argument('--seconds', type=float, default=10)
+        parser.add_argument('--no-admin', action='store_true', help='Only load the API')
+
+    def pages(self, with_admin):
+        busiest = (
+            RoundMembership.objects
+            .filter(score_round_archer__isnull=False)
+            .values('round_id')
+            .annotate(scores=Count('score_round_archer'))
+            .order_by('-scores')
+            .first()
+        )
+        if busiest is None:
+            raise CommandError("There are no scores to load.")
+        competition_id = (
+            CompetitionMembership.objects.filter(round_id=busiest['round_id']).values_list('competition_id', flat=True).first()
+        )
+        best = LeaderboardEntry.objects.filter(round_id=busiest['round_id']).order_by('-total').first()
+        pages = [('round leaderboard', reverse('api_round_leaderboard', args=[busiest['round_id']]), {})]
+        if competition_id:
+            pages.append(('competition leaderboard', reverse('api_competition_leaderboard', args=[competition_id]), {}))
+        if best is not None:
+            pages.append(('archer profile', reverse('api_archer_profile', args=[best.archer_id]), {}))
+        if with_admin:
+            cookie = session_cookie()
+            if cookie is None:
+                self.stderr.write("No active superuser, the admin pages are left out.")
+            else:
+                pages += [(f"admin {name.split('_')[1]}", reverse(name), {'Cookie': cookie}) for name in ADMIN_PAGES]
+        return pages
+
+    def handle(self, *args, **options):
+        pages = self.pages(not options['no_admin'])
+        seconds = options['seconds']
+        self.stdout.write(
+            f"{options['concurrency']} connections to {options['url']} for {seconds:.0f} s, {len(pages)} pages"
+        )
+        stop = threading.Event()
+        workers = [Worker(options['url'], pages, stop, offset) for offset in range(options['concurrency'])]
+        for worker in workers:
+            worker.start()
+        time.sleep(seconds)
+        stop.set()
+        for worker in workers:
+            worker.join()
+
+        lines = []
+        for name, _, _ in pages:
+            latencies = [latency for worker in workers for latency in worker.latencies[name]]
+            errors = sum(worker.errors[name] for worker in workers)
+            lines.append(
+                f"{name:>24}: {len(latencies) / seconds:8.1f}/s, "
+                f"median {statistics.median(latencies) * 1000 if latencies else float('nan'):7.1f} ms, "
+                f"p99 {percentile(latencies, 0.99) * 1000:8.1f} ms, errors {errors}"
+            )
+        self.stdout.write(self.style.SUCCESS('\n'.join(lines)))
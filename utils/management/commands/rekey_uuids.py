@@ -0,0 +1,129 @@
+"""
+Give existing rows time-ordered primary keys.
+
+    python manage.py rekey_uuids modeling.Score modeling.RoundMembership
+    python manage.py rekey_uuids --all
+
+The new key of a row is a version 7 UUID built from its created_at, so the
+rows keep their insertion order in the primary key index. Foreign keys to
+the rows, and the object ids of Wagtail revisions, log entries and
+references, are updated in the same transaction. Rows that already have a
+version 7 key are skipped.
+
+PersonalBest.key holds the primary keys of archers, round types and
+classes as text, so the personal bests are rebuilt when one of these
+models was rekeyed.
+
+Foreign keys are switched before the rows themselves, which relies on
+deferred constraint checks (SQLite and PostgreSQL). Stop writes to the
+tables while the command runs.
+"""
+from django.apps import apps
+from django.contrib.contenttypes.models import ContentType
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DEFAULT_DB_ALIAS, models, transaction
+from django.db.models import Case, Value, When
+
+from modeling import personal_bests
+from utils.uuid_utils import default_uuid, uuid7
+
+# (model, content type field, object id field) of generic references by string id
+GENERIC_REFERENCES = (
+    ('wagtailcore.Revision', 'content_type', 'object_id'),
+    ('wagtailcore.ModelLogEntry', 'content_type', 'object_id'),
+    ('wagtailcore.ReferenceIndex', 'content_type', 'object_id'),
+    ('wagtailcore.ReferenceIndex', 'to_content_type', 'to_object_id'),
+)
+
+
+def rekeyable_models():
+    return [
+        model for model in apps.get_models()
+        if isinstance(model._meta.pk, models.UUIDField) and model._meta.pk.default is default_uuid
+    ]
+
+
+def incoming_relations(model):
+    """Concrete foreign keys and one to one fields that point at the primary key of ``model``."""
+    return [
+        field.remote_field for field in model._meta.get_fields(include_hidden=True)
+        if (field.one_to_many or field.one_to_one)
+        and field.auto_created
+        and not field.concrete
+        and field.remote_field.target_field == model._meta.pk
+    ]
+
+
+def switch(queryset, field_name, mapping, output_field):
+    """Update ``field_name`` of the rows in ``queryset`` from old to new value."""
+    return queryset.filter(**{f'{field_name}__in': list(mapping)}).update(**{
+        field_name: Case(
+            *(When(**{field_name: old}, then=Value(new)) for old, new in mapping.items()),
+            output_field=output_field,
+        )
+    })
+
+
+class Command(BaseCommand):
+    help = 'Replace random primary keys by time-ordered (version 7) UUIDs'
+
+    def add_arguments(self, parser):
+        parser.add_argument('args', nargs='*', metavar='app_label.ModelName')
+        parser.add_argument('--all', action='store_true', help='Rekey every model with a default_uuid primary key')
+        parser.add_argument('--batch-size', type=int, default=500)
+        parser.add_argument('--database', default=DEFAULT_DB_ALIAS)
+
+    def handle(self, *labels, **options):
+        candidates = rekeyable_models()
+        if options['all']:
+            selected = candidates
+        else:
+            if not labels:
+                raise CommandError("Give the models to rekey or use --all.")
+            try:
+                selected = [apps.get_model(label) for label in labels]
+            except (LookupError, ValueError) as e:
+                raise CommandError(str(e))
+            for model in selected:
+                if model not in candidates:
+                    raise CommandError(f"{model._meta.label} does not use default_uuid primary keys.")
+        rebuild_bests = bool(personal_bests.key_models().intersection(selected))
+        if rebuild_bests and options['database'] != DEFAULT_DB_ALIAS:
+            raise CommandError(
+                f"The personal bests can only be rebuilt on {DEFAULT_DB_ALIAS}, "
+                f"leave out {', '.join(sorted(model._meta.label for model in personal_bests.key_models()))}."
+            )
+        for model in selected:
+            count = self.rekey(model, options['batch_size'], options['database'])
+            self.stdout.write(self.style.SUCCESS(f"{model._meta.label}: {count} rows rekeyed"))
+        if rebuild_bests:
+            count = personal_bests.rebuild()
+            self.stdout.write(self.style.SUCCESS(f"Personal bests: {count} rows rebuilt"))
+
+    def rekey(self, model, batch_size, using):
+        rows = [
+            (pk, created_at) for pk, created_at in model._base_manager.using(using)
+            .order_by('created_at', 'pk')
+            .values_list('pk', 'created_at')
+            if pk.version != 7
+        ]
+        foreign_keys = incoming_relations(model)
+        content_type = ContentType.objects.db_manager(using).get_for_model(model)
+        pk_name = model._meta.pk.name
+        for start in range(0, len(rows), batch_size):
+            mapping = {
+                old: uuid7(int(created_at.timestamp() * 1000))
+                for old, created_at in rows[start:start + batch_size]
+            }
+            with transaction.atomic(using=using):
+                for field in foreign_keys:
+                    switch(field.model._base_manager.using(using), field.name, mapping, models.UUIDField())
+                for label, type_field, id_field in GENERIC_REFERENCES:
+                    switch(
+                        apps.get_model(label)._base_manager.using(using).filter(**{type_field: content_type}),
+                        id_field,
+                        {str(old): str(new) for old, new in mapping.items()},
+                        models.CharField(),
+                    )
+                switch(model._base_manager.using(using), pk_name, mapping, models.UUIDField())
+        return len(rows)
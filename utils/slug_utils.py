@@ -0,0 +1,29 @@
+"""
+Slug helpers for bulk writes.
+
+AutoSlugField makes a slug unique by querying the table for every new row,
+which bulk_create of thousands of rows cannot afford. Bulk writers set a
+slug that is unique by construction and keep it with ``given_slugs``.
+"""
+from contextlib import contextmanager
+
+from django.utils.text import slugify
+from django_extensions.db.fields import AutoSlugField
+
+
+@contextmanager
+def given_slugs(model):
+    """Keep the slugs set on new ``model`` instances instead of generating unique ones."""
+    fields = [field for field in model._meta.fields if isinstance(field, AutoSlugField)]
+    for field in fields:
+        field.overwrite_on_add = False
+    try:
+        yield
+    finally:
+        for field in fields:
+            field.overwrite_on_add = True
+
+
+def suffixed_slug(*parts, suffix):
+    base = slugify(' '.join(str(part) for part in parts))[:40].strip('-')
+    return f"{base}-{suffix}"
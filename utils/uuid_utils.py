@@ -0,0 +1,59 @@
+"""
+Primary key helpers.
+
+``uuid7`` builds a time-ordered UUID (RFC 9562 version 7): 48 bits of Unix
+time in milliseconds followed by random bits. Keys created one after the
+other sort next to each other, so inserts append to the right edge of the
+primary key index instead of landing on a random page.
+
+``default_uuid`` is the default of every BaseModel primary key. It returns
+uuid4 unless the TIME_ORDERED_PRIMARY_KEYS setting is enabled.
+"""
+import os
+import threading
+import time
+import uuid
+
+from django.conf import settings
+
+_lock = threading.Lock()
+_last = (0, 0)
+
+
+def uuid7(timestamp_ms=None):
+    """Return a version 7 UUID for ``timestamp_ms`` (now by default).
+
+    Within one process the 12 ``rand_a`` bits are a counter when several
+    keys share a millisecond, so keys generated here are strictly increasing.
+    """
+    global _last
+    if timestamp_ms is None:
+        with _lock:
+            timestamp_ms = time.time_ns() // 1_000_000
+            last_ms, counter = _last
+            if timestamp_ms <= last_ms:
+                timestamp_ms, counter = last_ms, counter + 1
+                if counter > 0xFFF:
+                    timestamp_ms, counter = last_ms + 1, 0
+            else:
+                counter = int.from_bytes(os.urandom(2), 'big') & 0x7FF
+            _last = (timestamp_ms, counter)
+    else:
+        counter = int.from_bytes(os.urandom(2), 'big') & 0xFFF
+    value = (timestamp_ms & 0xFFFFFFFFFFFF) << 80
+    value |= 0x7 << 76
+    value |= counter << 64
+    value |= 0b10 << 62
+    value |= int.from_bytes(os.urandom(8), 'big') & 0x3FFFFFFFFFFFFFFF
+    return uuid.UUID(int=value)
+
+
+def uuid7_timestamp(value):
+    """Unix time in milliseconds stored in a version 7 UUID."""
+    return value.int >> 80
+
+
+def default_uuid():
+    if getattr(settings, 'TIME_ORDERED_PRIMARY_KEYS', False):
+        return uuid7()
+    return uuid.uuid4()
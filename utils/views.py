@@ -1,3 +1,15 @@
-from django.shortcuts import render
+from django.conf import settings
+from django.contrib.admin.views.decorators import staff_member_required
+from django.http import JsonResponse
+from django.views.decorators.http import require_http_methods
 
-# Create your views here.
+from .instrumentation import stats
+
+
+@staff_member_required
+@require_http_methods(['GET', 'DELETE'])
+def instrumentation_stats(request):
+    """Request statistics per URL name of this process; DELETE starts over."""
+    if request.method == 'DELETE':
+        stats.reset()
+    return JsonResponse({'enabled': getattr(settings, 'INSTRUMENTATION', False), 'views': stats.summary()})